@@ -1,3 +1,4 @@
+import click
 from flask import Flask, render_template, jsonify
 from flask_cors import CORS
 from config import Config, get_mongo_client, ensure_folders
@@ -6,7 +7,15 @@ from routes.doctor import doctor_bp
 from routes.official import official_bp
 from routes.health_admin import health_admin_bp
 from routes.authorities import authorities_bp
-from models import require_role, seed_doctors
+from models import require_role, seed_doctors, backfill_aadhar_last4, backfill_health_warnings
+from indexes import ensure_indexes, check_indexes
+from intake import import_applications, read_rows
+from outbox import OutboxWorker, start_outbox_worker
+from events import ensure_event_log
+from scan_cache import VerificationCache
+from blobs import migrate_legacy_uploads
+from storage import make_storage
+from bulk_issue import parse_filters, start_job, issue_warnings, job_progress
 
 
 def create_app():
@@ -18,7 +27,15 @@ def create_app():
     app.mongo_client = get_mongo_client(app.config["MONGO_URI"])
     app.immigrants_db = app.mongo_client[app.config["IMMIGRANTS_DB_NAME"]]
     app.officials_db = app.mongo_client[app.config["OFFICIALS_DB_NAME"]]
+    if app.config["AUTO_CREATE_INDEXES"]:
+        ensure_indexes(app)
+    check_indexes(app)
     seed_doctors(app.officials_db, app.config["DOCTOR_ACCOUNTS"])
+    ensure_event_log(app.officials_db, app.config["EVENT_LOG_SIZE"])
+    app.scan_cache = VerificationCache(app.config["SCAN_CACHE_SIZE"])
+    app.storage = make_storage(app)
+
+    start_outbox_worker(app)
 
     app.register_blueprint(migrant_bp, url_prefix="/migrant")
     app.register_blueprint(doctor_bp, url_prefix="/doctor")
@@ -58,6 +75,76 @@ def create_app():
     def authorities_dashboard():
         return render_template("authorities_dashboard.html")
 
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_command():
+        """Create the registered MongoDB indexes and report any still missing."""
+        failed = ensure_indexes(app)
+        missing = check_indexes(app)
+        for name in failed:
+            click.echo(f"failed: {name}", err=True)
+        if missing:
+            raise SystemExit(1)
+        click.echo("All indexes present.")
+
+    @app.cli.command("backfill-aadhar-last4")
+    def backfill_aadhar_last4_command():
+        """Add the last-4 search field to existing applications."""
+        count = backfill_aadhar_last4(app.immigrants_db)
+        click.echo(f"Updated {count} applications.")
+
+    @app.cli.command("backfill-health-warnings")
+    def backfill_health_warnings_command():
+        """Link issued warning letters to applications for the status endpoint."""
+        count = backfill_health_warnings(app.immigrants_db, app.officials_db)
+        click.echo(f"Updated {count} applications.")
+
+    @app.cli.command("migrate-uploads")
+    def migrate_uploads_command():
+        """Move uuid-named uploads into the deduplicating blob store."""
+        result = migrate_legacy_uploads(app)
+        click.echo(
+            f"Moved {result['moved']} uploads, copied {result['copied']} blobs to "
+            f"{app.config['STORAGE_BACKEND']} storage, freed {result['freed']} local bytes."
+        )
+
+    @app.cli.command("import-applications")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    def import_applications_command(path):
+        """Register applications from a CSV or NDJSON file."""
+        with open(path, "rb") as fh:
+            try:
+                summary = import_applications(app, read_rows(fh, path))
+            except ValueError as exc:
+                raise click.ClickException(str(exc))
+        for error in summary["errors"]:
+            click.echo(f"row {error['row']}: {error['error']}", err=True)
+        click.echo(f"Inserted {summary['inserted']}, updated {summary['updated']}, rejected {len(summary['errors'])} rows.")
+        if summary["errors"]:
+            raise SystemExit(1)
+
+    @app.cli.command("outbox-worker")
+    def outbox_worker_command():
+        """Run the email outbox sender in the foreground."""
+        OutboxWorker(app.officials_db, app.config, app.logger, app.storage).run()
+
+    @app.cli.command("issue-warnings")
+    @click.option("--tier", type=int, multiple=True, help="Only travelers of this tier (repeatable).")
+    @click.option("--output", type=click.Path(dir_okay=False, writable=True), required=True, help="ZIP file to write.")
+    @click.option("--no-email", is_flag=True, help="Mark and render only; do not queue emails.")
+    def issue_warnings_command(tier, output, no_email):
+        """Bulk-issue health warning letters to travelers without one."""
+        db = app.officials_db
+        query = parse_filters({"tier": list(tier)} if tier else {})
+        job_id = start_job(db, query, "cli")
+        total = job_progress(db, job_id)["total"]
+        with open(output, "wb") as fh:
+            for chunk in issue_warnings(
+                app, db, query, job_id, not no_email, on_progress=lambda n: click.echo(f"rendered {n}/{total}", err=True)
+            ):
+                fh.write(chunk)
+        job = job_progress(db, job_id)
+        click.echo(f"Issued {job['marked']} letters, queued {job['emails_queued']} emails -> {output}")
+
     @app.errorhandler(404)
     def not_found(_):
         return jsonify({"error": "Not found"}), 404
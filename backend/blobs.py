@@ -0,0 +1,234 @@
+import hashlib
+import mimetypes
+import os
+import time
+import unicodedata
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import quote
+from flask import current_app, request, send_file
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from werkzeug.wsgi import wrap_file
+from models import now_iso
+from storage import LocalStorage
+
+
+CHUNK_SIZE = 64 * 1024
+# Seconds after which a release that never finished deleting is abandoned.
+DELETE_TIMEOUT = 30
+
+
+def _write(stream) -> tuple:
+    """Copy `stream` into a local temp file, hashing as it goes."""
+    folder = Path(current_app.config["UPLOAD_TMP_FOLDER"])
+    folder.mkdir(parents=True, exist_ok=True)
+    tmp = folder / f".{uuid.uuid4().hex}.tmp"
+    sha = hashlib.sha256()
+    size = 0
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            sha.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return tmp, sha.hexdigest(), size
+
+
+def _take_reference(blobs, digest: str, size: int, filename: str):
+    """Add a reference; returns the blob doc as it was before (None if new).
+
+    A blob whose last reference is being released is marked `deleting`
+    while its file is removed; new references wait for that to finish
+    (their upsert hits the existing _id) and then start a fresh blob. A
+    mark older than DELETE_TIMEOUT is from a crashed release and is taken
+    over.
+    """
+    while True:
+        stale = datetime.utcnow() - timedelta(seconds=DELETE_TIMEOUT)
+        try:
+            return blobs.find_one_and_update(
+                {"_id": digest, "$or": [{"deleting": {"$exists": False}}, {"deleting": {"$lt": stale}}]},
+                {
+                    "$inc": {"refs": 1},
+                    "$unset": {"deleting": ""},
+                    "$setOnInsert": {"size": size, "filename": filename, "created_at": now_iso()},
+                },
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            time.sleep(0.05)
+
+
+def store_blob(stream, filename: str) -> str:
+    """Store an upload once under its SHA-256 and take a reference to it.
+
+    The upload is hashed while it streams to a temp file; if the content is
+    already in the store the temp copy is dropped, so duplicates cost no
+    extra space. Returns the digest, which is also the storage key.
+    """
+    tmp, digest, size = _write(stream)
+    previous = _take_reference(current_app.officials_db.blobs, digest, size, filename)
+    storage = current_app.storage
+    # A new or taken-over blob may have had its file deleted; always write it.
+    if previous is not None and not previous.get("deleting") and storage.exists(digest):
+        tmp.unlink()
+    else:
+        storage.put_file(digest, str(tmp))
+    return digest
+
+
+def store_upload(file_storage) -> str:
+    """Digest of a werkzeug FileStorage saved into the blob store."""
+    return store_blob(file_storage.stream, file_storage.filename)
+
+
+def release_blob(digest: str | None):
+    """Drop one reference; the file is deleted with the last one."""
+    if not digest:
+        return
+    blobs = current_app.officials_db.blobs
+    blobs.update_one({"_id": digest}, {"$inc": {"refs": -1}})
+    # Mark the blob so no store reuses the file while it is being deleted.
+    stamp = datetime.utcnow()
+    claimed = blobs.update_one(
+        {"_id": digest, "refs": {"$lte": 0}, "deleting": {"$exists": False}}, {"$set": {"deleting": stamp}}
+    ).modified_count
+    if claimed:
+        current_app.storage.delete(digest)
+        blobs.delete_one({"_id": digest, "deleting": stamp})
+
+
+def _disposition(name: str) -> dict:
+    """Content-Disposition options for `name`, as Flask's send_file builds them."""
+    try:
+        name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+        return {"filename": simple, "filename*": f"UTF-8''{quote(name, safe='!#$&+-.^_`|~')}"}
+    return {"filename": name}
+
+
+def _deliver(digest: str, size: int, name: str):
+    """Serve a stored blob with a strong ETag, conditional and range support.
+
+    The digest names the exact bytes, so it is a strong validator: clients
+    revalidate with If-None-Match and resume with Range/If-Range against it.
+    With FILE_DELIVERY set to x-accel-redirect or x-sendfile and local
+    storage, the app only authorizes and answers conditionals; the front-end
+    proxy reads the file and handles ranges itself.
+    """
+    storage = current_app.storage
+    mode = current_app.config["FILE_DELIVERY"]
+    response = current_app.response_class(
+        mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream", direct_passthrough=True
+    )
+    response.headers.set("Content-Disposition", "attachment", **_disposition(name))
+    response.set_etag(digest)
+    # Uploads can be replaced behind the same URL, so always revalidate.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+    if mode != "app" and isinstance(storage, LocalStorage):
+        response.automatically_set_content_length = False  # the proxy sets it
+        response.make_conditional(request)
+        if response.status_code == 200:
+            if mode == "x-accel-redirect":
+                response.headers["X-Accel-Redirect"] = f"{current_app.config['X_ACCEL_PREFIX'].rstrip('/')}/{digest[:2]}/{digest}"
+            else:
+                response.headers["X-Sendfile"] = str(storage.path(digest).resolve())
+        return response
+
+    fh = storage.open(digest)
+    if fh is None:
+        return None
+    # Seekable, so a range request reads only the bytes it asks for.
+    response.response = wrap_file(request.environ, fh, CHUNK_SIZE)
+    response.content_length = size
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+
+def send_upload(record: dict, field: str):
+    """Download response for the `<field>_blob` upload on `record`, or None.
+
+    Records stored before the blob store only carry `<field>_path` and are
+    served from that local file until `flask migrate-uploads` moves them.
+    """
+    name = record.get(f"{field}_name")
+    digest = record.get(f"{field}_blob")
+    if not digest:
+        path = record.get(f"{field}_path")
+        if not path or not os.path.exists(path):
+            return None
+        return send_file(path, as_attachment=True, download_name=name, conditional=True)
+    blob = current_app.officials_db.blobs.find_one({"_id": digest}, {"size": 1})
+    if blob is None:
+        return None
+    return _deliver(digest, blob["size"], name or digest)
+
+
+def _adopt(path: str, filename: str) -> str:
+    with open(path, "rb") as fh:
+        return store_blob(fh, filename)
+
+
+def migrate_legacy_uploads(app) -> dict:
+    """Move uuid-named uploads into the blob store and repoint their records.
+
+    Originals are removed once every record using them has been moved. With
+    a non-local STORAGE_BACKEND, blobs still held in BLOB_FOLDER are copied
+    to the backend as well. Returns counts of records moved, blobs copied
+    and local bytes freed.
+    """
+    moved = 0
+    originals = set()
+    new_blobs = {}  # digest -> size, for blobs this run created
+    targets = [
+        (app.immigrants_db.immigrants, "medical_report"),
+        (app.officials_db.approved_migrants, "approval_letter"),
+    ]
+    for collection, field in targets:
+        path_field, blob_field, name_field = f"{field}_path", f"{field}_blob", f"{field}_name"
+        query = {path_field: {"$nin": [None, ""]}, blob_field: {"$exists": False}}
+        for doc in collection.find(query, {path_field: 1}):
+            path = doc[path_field]
+            if not os.path.exists(path):
+                continue
+            # Drop the uuid prefix the old naming scheme added.
+            filename = Path(path).name.split("_", 1)[-1]
+            size = os.path.getsize(path)
+            digest = _adopt(path, filename)
+            # A blob with a single reference was created by this adoption.
+            if digest not in new_blobs and app.officials_db.blobs.find_one({"_id": digest, "refs": 1}):
+                new_blobs[digest] = size
+            collection.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {blob_field: digest, name_field: filename}, "$unset": {path_field: ""}},
+            )
+            originals.add(path)
+            moved += 1
+        # Records moved into the local blob store before storage backends
+        # existed still carry that path; the digest alone locates them now.
+        collection.update_many({blob_field: {"$exists": True}, path_field: {"$exists": True}}, {"$unset": {path_field: ""}})
+
+    freed = 0
+    if isinstance(app.storage, LocalStorage):
+        freed -= sum(new_blobs.values())
+    for path in originals:
+        freed += os.path.getsize(path)
+        os.remove(path)
+
+    copied = 0
+    if not isinstance(app.storage, LocalStorage):
+        local = LocalStorage(app.config["BLOB_FOLDER"])
+        for blob in app.officials_db.blobs.find({}, {"_id": 1}):
+            path = local.path(blob["_id"])
+            if path.exists() and not app.storage.exists(blob["_id"]):
+                freed += path.stat().st_size
+                app.storage.put_file(blob["_id"], str(path))  # moves the file
+                copied += 1
+    return {"moved": moved, "copied": copied, "freed": freed}
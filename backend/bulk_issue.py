@@ -0,0 +1,233 @@
+import json
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pymongo import UpdateOne
+from events import publish_many
+from versions import bump, DISAPPROVED
+from documents import (
+    warning_key,
+    load_document,
+    save_document,
+    discard_document,
+    warning_qr,
+    warning_email_body,
+    warning_filename,
+    WARNING_EMAIL_SUBJECT,
+)
+from models import now_iso, mark_warning_issued
+from outbox import enqueue_emails, smtp_configured
+from pdf_templates import HEALTH_WARNING
+
+
+_pool = None
+
+
+def render_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared process pool for letter rendering.
+
+    Uses spawn so the children never inherit the parent's Mongo client or
+    outbox thread.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def render_warning_letter(traveler: dict):
+    """Pool task: (traveler _id, document key, qr_text, pdf bytes)."""
+    qr_text = warning_qr(traveler)
+    key = warning_key(traveler, qr_text)
+    return traveler["_id"], key, qr_text, HEALTH_WARNING.render(traveler, qr_text)
+
+
+def parse_filters(data: dict) -> dict:
+    """Build a disapproved_travelers query from a bulk-issue request.
+
+    Accepts `tier` (int or list of ints), `qr_generated` (default False so
+    only travelers without a letter are picked) and `disease_name`.
+    """
+    if data.get("qr_generated", False):
+        query = {"qr_generated": True}
+    else:
+        # Older records may not carry the flag at all.
+        query = {"qr_generated": {"$ne": True}}
+    tier = data.get("tier")
+    if tier is not None:
+        tiers = tier if isinstance(tier, list) else [tier]
+        try:
+            tiers = [int(t) for t in tiers]
+        except (TypeError, ValueError):
+            raise ValueError("tier must be an integer or a list of integers")
+        query["tier"] = {"$in": tiers}
+    if data.get("disease_name"):
+        query["disease_name"] = data["disease_name"]
+    return query
+
+
+def start_job(db, query: dict, issued_by: str):
+    total = db.disapproved_travelers.count_documents(query)
+    return db.bulk_jobs.insert_one(
+        {
+            "kind": "health_warning",
+            "filters": json.dumps(query, default=str),
+            "total": total,
+            "rendered": 0,
+            "status": "running",
+            "issued_by": issued_by,
+            "started_at": now_iso(),
+        }
+    ).inserted_id
+
+
+def job_progress(db, job_id):
+    job = db.bulk_jobs.find_one({"_id": job_id})
+    if not job:
+        return None
+    return {
+        "id": str(job["_id"]),
+        "status": job.get("status"),
+        "total": job.get("total"),
+        "rendered": job.get("rendered"),
+        "marked": job.get("marked"),
+        "emails_queued": job.get("emails_queued"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+    }
+
+
+class _ZipSink:
+    """Write-only file object that hands zipfile's output back in chunks."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+LETTER_FIELDS = {
+    "migrant_id": 1,
+    "name": 1,
+    "aadhar": 1,
+    "phone_number": 1,
+    "email": 1,
+    "current_address": 1,
+    "expected_recovery_date": 1,
+    "tier": 1,
+    "disease_name": 1,
+    "warning_document": 1,
+    "created_at": 1,
+}
+
+
+def issue_warnings(app, db, query: dict, job_id, send_emails: bool = True, on_progress=None):
+    """Render letters for every matching traveler and yield a ZIP as it grows.
+
+    Letters are rendered across the process pool in batches and stored in the
+    document store. Once every letter has been written the travelers are
+    marked with a single bulk_write and the emails are queued, so an aborted
+    download leaves no traveler marked without a letter.
+    Must run inside an app context; `on_progress(rendered)` is called after
+    each batch.
+    """
+    cfg = app.config
+    coll = db.disapproved_travelers
+    pool = render_pool(cfg["RENDER_WORKERS"])
+    batch_size = cfg["BULK_ISSUE_BATCH_SIZE"]
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+    issued = []  # (traveler, key, qr_text) for marking and email
+    rendered = 0
+    try:
+        cursor = coll.find(query, LETTER_FIELDS).batch_size(batch_size)
+        while True:
+            batch = [doc for _, doc in zip(range(batch_size), cursor)]
+            if not batch:
+                break
+            by_id = {doc["_id"]: doc for doc in batch}
+            issued_at = now_iso()
+            for doc in batch:
+                doc["warning_issued_at"] = issued_at  # the QR is valid from issue, not rejection
+            for traveler_id, key, qr_text, pdf in pool.map(render_warning_letter, batch, chunksize=16):
+                traveler = by_id[traveler_id]
+                if load_document(key) is None:
+                    save_document(key, pdf)
+                if traveler.get("warning_document") not in (None, key):
+                    discard_document(traveler["warning_document"])
+                archive.writestr(f"{warning_filename(traveler)[:-4]}_{traveler_id}.pdf", pdf)
+                issued.append((traveler, key, qr_text))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            rendered += len(batch)
+            db.bulk_jobs.update_one({"_id": job_id}, {"$set": {"rendered": rendered}})
+            if on_progress:
+                on_progress(rendered)
+
+        stamp = now_iso()
+        ops = [
+            UpdateOne(
+                {"_id": traveler["_id"]},
+                {
+                    "$set": {
+                        "qr_generated": True,
+                        "qr_data": qr_text,
+                        "warning_document": key,
+                        "warning_issued_at": traveler["warning_issued_at"],
+                        "updated_at": stamp,
+                    }
+                },
+            )
+            for traveler, key, qr_text in issued
+        ]
+        marked = coll.bulk_write(ops, ordered=False).modified_count if ops else 0
+        mark_warning_issued(app.immigrants_db, [traveler for traveler, _, _ in issued])
+        bump(DISAPPROVED)
+        # One summary event for the admin dashboards, one per affected migrant.
+        publish_many(
+            [("warnings_issued", ["health_admin"], None, {"count": marked})]
+            + [("warning_issued", ["migrant"], traveler.get("migrant_id"), {}) for traveler, _, _ in issued]
+        )
+
+        queued = 0
+        if send_emails and smtp_configured(cfg):
+            # Attachments are reloaded from the store batch by batch to keep memory flat.
+            for start in range(0, len(issued), batch_size):
+                queued += enqueue_emails(
+                    db,
+                    [
+                        (
+                            traveler.get("email"),
+                            WARNING_EMAIL_SUBJECT,
+                            warning_email_body(traveler),
+                            (warning_filename(traveler), load_document(key)),
+                        )
+                        for traveler, key, _ in issued[start:start + batch_size]
+                    ],
+                )
+        archive.close()
+        db.bulk_jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "done", "marked": marked, "emails_queued": queued, "finished_at": now_iso()}},
+        )
+        yield sink.drain()
+    except GeneratorExit:
+        db.bulk_jobs.update_one({"_id": job_id}, {"$set": {"status": "aborted", "finished_at": now_iso()}})
+        raise
+    except Exception as exc:
+        app.logger.exception("Bulk warning issuance failed")
+        db.bulk_jobs.update_one(
+            {"_id": job_id}, {"$set": {"status": "failed", "error": str(exc), "finished_at": now_iso()}}
+        )
+        raise
@@ -0,0 +1,92 @@
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from models import now_iso
+
+
+DUPLICATE_KEY = 11000
+
+
+def _penalty(item: dict, authority_id: str, received_at: str) -> dict:
+    amount = item.get("penalty_amount")
+    if not item.get("aadhar") or isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount <= 0:
+        raise ValueError("aadhar and a positive penalty_amount are required")
+    return {
+        "aadhar": item["aadhar"],
+        "penalty_amount": float(amount),
+        "reason": item.get("reason", "Violation of health protocols"),
+        "authority_id": authority_id,
+        "levied_at": item.get("levied_at") or received_at,
+        "synced_at": received_at,
+    }
+
+
+def _scan(item: dict, authority_id: str, received_at: str) -> dict:
+    if not item.get("aadhar") or not item.get("flag"):
+        raise ValueError("aadhar and flag are required")
+    return {
+        "aadhar": item["aadhar"],
+        "flag": item["flag"],
+        "status": item.get("status"),
+        "checkpoint": item.get("checkpoint"),
+        "authority_id": authority_id,
+        "scanned_at": item.get("scanned_at") or received_at,
+        "synced_at": received_at,
+    }
+
+
+BUILDERS = {"penalty": ("penalties", _penalty), "scan": ("scan_events", _scan)}
+
+
+def sync_events(db, events: list, authority_id: str):
+    """Store queued checkpoint events; safe to replay.
+
+    Each event carries a client-generated `key`. The collections have a unique
+    index on `idempotency_key`, so a replayed event is rejected by the
+    database and acknowledged as a duplicate. Each collection is written with
+    one unordered bulk_write. Returns (per-event acks in input order, counts).
+    """
+    received_at = now_iso()
+    acks = [None] * len(events)
+    ops = {collection: [] for collection, _ in BUILDERS.values()}
+    positions = {collection: [] for collection in ops}  # op index -> event index
+
+    for i, item in enumerate(events):
+        key = item.get("key") if isinstance(item, dict) else None
+        if not isinstance(key, str) or not key or len(key) > 128:
+            acks[i] = {"key": key, "status": "rejected", "error": "key must be a string of at most 128 characters"}
+            continue
+        if item.get("type") not in BUILDERS:
+            acks[i] = {"key": key, "status": "rejected", "error": "type must be penalty or scan"}
+            continue
+        collection, build = BUILDERS[item["type"]]
+        try:
+            doc = build(item, authority_id, received_at)
+        except ValueError as exc:
+            acks[i] = {"key": key, "status": "rejected", "error": str(exc)}
+            continue
+        doc["idempotency_key"] = key
+        ops[collection].append(InsertOne(doc))
+        positions[collection].append(i)
+
+    for collection, batch in ops.items():
+        if not batch:
+            continue
+        errors = {}
+        try:
+            db[collection].bulk_write(batch, ordered=False)
+        except BulkWriteError as exc:
+            errors = {err["index"]: err for err in exc.details.get("writeErrors", [])}
+        for op_index, i in enumerate(positions[collection]):
+            err = errors.get(op_index)
+            key = events[i]["key"]
+            if err is None:
+                acks[i] = {"key": key, "status": "stored"}
+            elif err.get("code") == DUPLICATE_KEY:
+                acks[i] = {"key": key, "status": "duplicate"}
+            else:
+                acks[i] = {"key": key, "status": "rejected", "error": err.get("errmsg", "write failed")}
+
+    counts = {"stored": 0, "duplicate": 0, "rejected": 0}
+    for ack in acks:
+        counts[ack["status"]] += 1
+    return acks, counts
@@ -19,10 +19,48 @@ class Config:
     IMMIGRANTS_DB_NAME = os.getenv("IMMIGRANTS_DB_NAME", "immigrants_db")
     OFFICIALS_DB_NAME = os.getenv("OFFICIALS_DB_NAME", "officials_db")
 
+    # Create missing indexes on startup; disable to manage them via `flask ensure-indexes`.
+    AUTO_CREATE_INDEXES = os.getenv("AUTO_CREATE_INDEXES", "true").lower() == "true"
+
     MEDICAL_REPORT_FOLDER = str(UPLOAD_ROOT / "medical_reports")
     APPROVAL_LETTER_FOLDER = str(UPLOAD_ROOT / "approval_letters")
     DOCTOR_VERIFICATION_FOLDER = str(UPLOAD_ROOT / "doctor_verifications")
     OFFICIAL_VERIFICATION_FOLDER = str(UPLOAD_ROOT / "official_verifications")
+    RENDERED_DOCUMENT_FOLDER = str(UPLOAD_ROOT / "rendered_documents")
+    # Content-addressed uploads (see blobs.py). STORAGE_BACKEND picks where
+    # they live: local (BLOB_FOLDER), gridfs or s3; use gridfs or s3 when
+    # running more than one app node (see storage.py).
+    BLOB_FOLDER = str(UPLOAD_ROOT / "blobs")
+    UPLOAD_TMP_FOLDER = str(UPLOAD_ROOT / "tmp")
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    GRIDFS_BUCKET = os.getenv("GRIDFS_BUCKET", "uploads")
+    S3_BUCKET = os.getenv("S3_BUCKET", "")
+    S3_PREFIX = os.getenv("S3_PREFIX", "uploads/")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # e.g. a MinIO server
+    S3_REGION = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    # How report and letter downloads are sent: "app" streams them from the
+    # worker; with local storage, "x-accel-redirect" (nginx) or "x-sendfile"
+    # (Apache/lighttpd) hand the transfer to the front-end proxy. For nginx,
+    # map X_ACCEL_PREFIX to BLOB_FOLDER in an `internal` location.
+    FILE_DELIVERY = os.getenv("FILE_DELIVERY", "app")
+    # Report previews for doctor triage (see previews.py).
+    PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+    PREVIEW_MAX_PX = int(os.getenv("PREVIEW_MAX_PX", "480"))
+    PREVIEW_MAX_CHARS = int(os.getenv("PREVIEW_MAX_CHARS", "2000"))
+    PREVIEW_MAX_SOURCE = int(os.getenv("PREVIEW_MAX_SOURCE", str(20 * 1024 * 1024)))
+    PREVIEW_TIMEOUT = int(os.getenv("PREVIEW_TIMEOUT", "300"))
+    X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/protected-blobs/")
+
+    PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+    # Records fetched and encoded per chunk of a streamed (?stream=) list.
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+    # Bulk health-warning issuance (see bulk_issue.py)
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))
+    BULK_ISSUE_BATCH_SIZE = int(os.getenv("BULK_ISSUE_BATCH_SIZE", "200"))
 
     ALLOWED_REPORT_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
     ALLOWED_LETTER_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
@@ -33,6 +71,61 @@ class Config:
     SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
     SMTP_SENDER = os.getenv("SMTP_SENDER", SMTP_USERNAME)
+    SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() == "true"
+    # Set to false for a local relay/sink that accepts unauthenticated mail.
+    SMTP_AUTH = os.getenv("SMTP_AUTH", "true").lower() == "true"
+    SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+    # Background email outbox (see outbox.py)
+    OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+    OUTBOX_LEASE = int(os.getenv("OUTBOX_LEASE", "300"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+    OUTBOX_RETRY_BASE = int(os.getenv("OUTBOX_RETRY_BASE", "30"))
+    OUTBOX_RETRY_MAX = int(os.getenv("OUTBOX_RETRY_MAX", "3600"))
+    OUTBOX_IDLE_NOOP = int(os.getenv("OUTBOX_IDLE_NOOP", "60"))
+
+    # Dashboard push updates (see events.py). Streams are recycled after
+    # SSE_MAX_DURATION seconds; browsers reconnect and resume automatically.
+    EVENT_LOG_SIZE = int(os.getenv("EVENT_LOG_SIZE", str(16 * 1024 * 1024)))
+    SSE_HEARTBEAT = int(os.getenv("SSE_HEARTBEAT", "15"))
+    SSE_MAX_DURATION = int(os.getenv("SSE_MAX_DURATION", "300"))
+
+    # How long list ETags may trust in-memory version counters (see versions.py).
+    VERSION_CACHE_TTL = float(os.getenv("VERSION_CACHE_TTL", "1"))
+
+    # Records kept in the checkpoint verification LRU (see scan_cache.py).
+    SCAN_CACHE_SIZE = int(os.getenv("SCAN_CACHE_SIZE", "10000"))
+    SCAN_BATCH_MAX = int(os.getenv("SCAN_BATCH_MAX", "500"))
+    # Doctor review queue: claims last REVIEW_LEASE seconds (see review_queue.py).
+    REVIEW_LEASE = int(os.getenv("REVIEW_LEASE", "900"))
+    QUEUE_CLAIM_DEFAULT = int(os.getenv("QUEUE_CLAIM_DEFAULT", "10"))
+    QUEUE_CLAIM_MAX = int(os.getenv("QUEUE_CLAIM_MAX", "50"))
+    # Decisions accepted by one /doctor/decisions or /official/decisions call.
+    DECISION_BATCH_MAX = int(os.getenv("DECISION_BATCH_MAX", "500"))
+    # Seconds a browser may reuse a /migrant/status response.
+    STATUS_CACHE_TTL = int(os.getenv("STATUS_CACHE_TTL", "5"))
+    # Rows written per bulk_write by application imports (see intake.py).
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    # Events accepted by one /authorities/sync call.
+    SYNC_MAX_EVENTS = int(os.getenv("SYNC_MAX_EVENTS", "50000"))
+
+    # Signed QR codes (see qr_codec.py). QR_SIGNING_KEY is a base64 Ed25519
+    # seed; otherwise it is read from QR_SIGNING_KEY_FILE, which should live
+    # outside the checkout in production. QR_GENERATE_KEY lets a development
+    # install create a missing key file; set it to false in production so a
+    # misconfigured node fails instead of signing with a throwaway key.
+    # QR_TRUSTED_KEYS lists base64 public keys of rotated-out signing keys.
+    QR_SIGNING_KEY = os.getenv("QR_SIGNING_KEY", "")
+    QR_SIGNING_KEY_FILE = os.getenv("QR_SIGNING_KEY_FILE", str(BASE_DIR / "instance" / "qr_signing.key"))
+    QR_GENERATE_KEY = os.getenv("QR_GENERATE_KEY", "true").lower() == "true"
+    QR_TRUSTED_KEYS = json.loads(os.getenv("QR_TRUSTED_KEYS", "[]"))
+    QR_CLEARANCE_TTL_DAYS = int(os.getenv("QR_CLEARANCE_TTL_DAYS", "30"))
+    QR_WARNING_TTL_DAYS = int(os.getenv("QR_WARNING_TTL_DAYS", "30"))
+    # Salt for the hashed Aadhar numbers in checkpoint snapshots; changing it
+    # forces devices to download a full snapshot.
+    SNAPSHOT_SALT = os.getenv("SNAPSHOT_SALT", "aarogya-check-1")
 
     # Simple credential stores for hackathon demo; move to DB for production.
     DOCTOR_ACCOUNTS = json.loads(
@@ -49,6 +142,9 @@ def ensure_folders():
     Path(Config.APPROVAL_LETTER_FOLDER).mkdir(parents=True, exist_ok=True)
     Path(Config.DOCTOR_VERIFICATION_FOLDER).mkdir(parents=True, exist_ok=True)
     Path(Config.OFFICIAL_VERIFICATION_FOLDER).mkdir(parents=True, exist_ok=True)
+    Path(Config.RENDERED_DOCUMENT_FOLDER).mkdir(parents=True, exist_ok=True)
+    Path(Config.BLOB_FOLDER).mkdir(parents=True, exist_ok=True)
+    Path(Config.UPLOAD_TMP_FOLDER).mkdir(parents=True, exist_ok=True)
 
 
 def allowed_file(filename: str, allowed_extensions: set) -> bool:
@@ -0,0 +1,184 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne, InsertOne
+from pymongo.errors import BulkWriteError
+from events import publish_many
+from versions import bump, next_seqs, PENDING_REVIEW, DOCTOR_APPROVED, DISAPPROVED
+from models import now_iso
+from documents import withdraw_clearance
+from outbox import enqueue_emails, smtp_configured
+from review_queue import reviewable_by
+
+
+DECISIONS = ("APPROVED", "REJECTED")
+REJECTION_SUBJECT = "Aarogya Check - Doctor Rejection"
+MIGRANT_FIELDS = {
+    "name": 1,
+    "email": 1,
+    "aadhar": 1,
+    "doctor_approval": 1,
+    "official_approval": 1,
+    "clearance_document": 1,
+    "claimed_by": 1,
+    "claim_until": 1,
+}
+
+
+def rejection_body(doc: dict) -> str:
+    return (
+        f"Dear {doc.get('name')},\n\n"
+        "Your application has been rejected by the medical reviewer.\n"
+        "Reason: medical fitness not approved.\n\n"
+        "Regards,\nAarogya Check"
+    )
+
+
+def traveler_record(doc: dict, health_data: dict, doctor_id, seq: int) -> dict:
+    """Disapproved-traveler record from a doctor's health form."""
+    return {
+        "migrant_id": str(doc["_id"]),
+        "name": health_data.get("name", doc.get("name")),
+        "age": health_data.get("age"),
+        "current_address": health_data.get("current_address"),
+        "email": health_data.get("email", doc.get("email")),
+        "phone_number": health_data.get("phone_number"),
+        "aadhar": doc.get("aadhar"),
+        "disease_name": health_data.get("disease_name"),
+        "tier": int(health_data.get("tier", 1)),
+        "expected_recovery_date": health_data.get("expected_recovery_date"),
+        "doctor_id": doctor_id,
+        "created_at": now_iso(),
+        "qr_generated": False,
+        "seq": seq,
+    }
+
+
+def _validate(item):
+    """(ObjectId, decision, health_data) for a request item; raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("each decision must be an object")
+    try:
+        migrant_id = ObjectId(item.get("migrant_id"))
+    except (InvalidId, TypeError):
+        raise ValueError("invalid migrant_id")
+    if item.get("decision") not in DECISIONS:
+        raise ValueError("decision must be APPROVED or REJECTED")
+    health_data = item.get("health_data")
+    if health_data is not None and not isinstance(health_data, dict):
+        raise ValueError("health_data must be an object")
+    if health_data:
+        if item["decision"] != "REJECTED":
+            raise ValueError("health_data only applies to rejections")
+        try:
+            int(health_data.get("tier", 1))
+        except (TypeError, ValueError):
+            raise ValueError("tier must be a number")
+    return migrant_id, item["decision"], health_data
+
+
+def apply_decisions(app, items: list, doctor_id) -> list:
+    """Apply a batch of doctor decisions and return per-item results.
+
+    Decisions are written with one unordered bulk_write on immigrants and,
+    for rejections with a health form, one on disapproved_travelers;
+    rejection emails are queued with one insert. Items that fail validation
+    or are not found get an error result without affecting the rest.
+    """
+    immigrants = app.immigrants_db.immigrants
+    officials = app.officials_db
+    results = [None] * len(items)
+    valid = {}  # item index -> (migrant_id, decision, health_data)
+    seen = set()
+    for i, item in enumerate(items):
+        try:
+            migrant_id, decision, health_data = _validate(item)
+        except ValueError as exc:
+            results[i] = {"migrant_id": item.get("migrant_id") if isinstance(item, dict) else None, "status": "error", "error": str(exc)}
+            continue
+        if migrant_id in seen:
+            results[i] = {"migrant_id": str(migrant_id), "status": "error", "error": "duplicate migrant_id in batch"}
+            continue
+        seen.add(migrant_id)
+        valid[i] = (migrant_id, decision, health_data)
+
+    docs = {doc["_id"]: doc for doc in immigrants.find({"_id": {"$in": list(seen)}}, MIGRANT_FIELDS)}
+    # Each write re-checks the claim in its filter; the batch tag shows which
+    # ones matched when some did not.
+    batch = ObjectId()
+    open_filter = reviewable_by(doctor_id)
+    ops, op_items = [], []
+    for i, (migrant_id, decision, _) in valid.items():
+        if migrant_id not in docs:
+            results[i] = {"migrant_id": str(migrant_id), "status": "error", "error": "Migrant not found"}
+            continue
+        ops.append(
+            UpdateOne(
+                dict(open_filter, _id=migrant_id),
+                {
+                    "$set": {"doctor_approval": decision, "doctor_id": doctor_id, "decision_batch": batch},
+                    "$unset": {"claimed_by": "", "claim_until": "", "health_warning_id": ""},
+                },
+            )
+        )
+        op_items.append(i)
+
+    failed = {}
+    matched = len(ops)
+    if ops:
+        try:
+            matched = immigrants.bulk_write(ops, ordered=False).matched_count
+        except BulkWriteError as exc:
+            failed = {err["index"]: err.get("errmsg", "write failed") for err in exc.details.get("writeErrors", [])}
+            matched = exc.details.get("nMatched", 0)
+    if matched < len(ops) - len(failed):
+        written = {
+            doc["_id"]
+            for doc in immigrants.find({"_id": {"$in": [valid[i][0] for i in op_items]}, "decision_batch": batch}, {"_id": 1})
+        }
+        for op_index, i in enumerate(op_items):
+            if op_index not in failed and valid[i][0] not in written:
+                failed[op_index] = "Application is being reviewed by another doctor"
+
+    applied = []  # item indexes whose decision was stored
+    for op_index, i in enumerate(op_items):
+        migrant_id = valid[i][0]
+        if op_index in failed:
+            results[i] = {"migrant_id": str(migrant_id), "status": "error", "error": failed[op_index]}
+        else:
+            applied.append(i)
+
+    # Health forms are recorded only for decisions that were stored.
+    forms = [i for i in applied if valid[i][2]]
+    travelers = {}
+    for i, seq in zip(forms, next_seqs(officials, len(forms)) if forms else []):
+        migrant_id, _, health_data = valid[i]
+        travelers[i] = traveler_record(docs[migrant_id], health_data, doctor_id, seq)
+    if travelers:
+        officials.disapproved_travelers.bulk_write([InsertOne(doc) for doc in travelers.values()], ordered=False)
+
+    scopes, events, emails = set(), [], []
+    for i in applied:
+        migrant_id, decision, _ = valid[i]
+        doc = docs[migrant_id]
+        results[i] = {"migrant_id": str(migrant_id), "status": decision.lower()}
+        scopes.add(PENDING_REVIEW)
+        roles = ["doctor", "migrant"]
+        # Overturning an approval changes the official's list and scan verdicts too.
+        if decision == "APPROVED" or doc.get("doctor_approval") == "APPROVED":
+            scopes.add(DOCTOR_APPROVED)
+            roles.append("official")
+        if decision == "REJECTED":
+            if doc.get("official_approval") == "APPROVED":
+                withdraw_clearance(immigrants, officials, doc)
+            emails.append((doc.get("email"), REJECTION_SUBJECT, rejection_body(doc), None))
+            if i in travelers:
+                scopes.add(DISAPPROVED)
+                roles.extend(["health_admin", "authority"])
+        events.append(("doctor_decision", roles, str(migrant_id), {"decision": decision}))
+
+    if emails and smtp_configured(app.config):
+        enqueue_emails(officials, emails)
+    if scopes:
+        bump(*scopes)
+    publish_many(events)
+    return results
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from flask import current_app
+from config import Config
+from pdf_templates import CLEARANCE, HEALTH_WARNING
+import qr_codec
+
+
+# Bump a version whenever its layout changes so stored PDFs are re-rendered.
+TEMPLATE_VERSIONS = {"clearance": 3, "health_warning": 3}
+
+
+def clearance_qr_payload(doc: dict) -> dict:
+    return {
+        "migrant_id": str(doc["_id"]),
+        "name": doc.get("name"),
+        "aadhar": doc.get("aadhar"),
+        "status": "APPROVED",
+        "doctor_approval": doc.get("doctor_approval"),
+        "official_approval": doc.get("official_approval"),
+        "source": doc.get("source"),
+        "destination": doc.get("destination"),
+        "created_at": doc.get("created_at"),
+    }
+
+
+def warning_qr_payload(traveler: dict) -> dict:
+    return {
+        "migrant_id": traveler.get("migrant_id"),
+        "name": traveler.get("name"),
+        "aadhar": traveler.get("aadhar"),
+        "phone_number": traveler.get("phone_number"),
+        "email": traveler.get("email"),
+        "address": traveler.get("current_address"),
+        "recovery_date": traveler.get("expected_recovery_date"),
+        "status": "DISAPPROVED",
+        "tier": traveler.get("tier"),
+        "disease_name": traveler.get("disease_name"),
+    }
+
+
+def clearance_qr(doc: dict) -> str:
+    """QR text for a clearance: a signed compact code, or the legacy JSON
+    payload when the signing dependencies are not installed."""
+    if not qr_codec.available():
+        return json.dumps(clearance_qr_payload(doc), sort_keys=True)
+    return qr_codec.sign(
+        doc["_id"],
+        "APPROVED",
+        doc.get("aadhar"),
+        doc.get("name"),
+        qr_codec.to_millis(doc.get("official_decided_at") or doc.get("created_at")),
+        Config.QR_CLEARANCE_TTL_DAYS,
+    )
+
+
+def warning_qr(traveler: dict) -> str:
+    """QR text for a health warning letter (see clearance_qr).
+
+    The code is issued when the letter is (`warning_issued_at`), which can be
+    long after the rejection; letters not yet issued fall back to created_at.
+    """
+    if not qr_codec.available():
+        return json.dumps(warning_qr_payload(traveler), sort_keys=True)
+    return qr_codec.sign(
+        traveler["_id"],
+        "DISAPPROVED",
+        traveler.get("aadhar"),
+        traveler.get("name"),
+        qr_codec.to_millis(traveler.get("warning_issued_at") or traveler.get("created_at")),
+        Config.QR_WARNING_TTL_DAYS,
+        tier=traveler.get("tier"),
+    )
+
+
+WARNING_EMAIL_SUBJECT = "Health Warning Notice - Government Health Administration"
+
+
+def warning_email_body(traveler: dict) -> str:
+    return (
+        f"Dear {traveler.get('name')},\n\n"
+        "You have been issued a Health Warning Notice due to medical disapproval.\n"
+        "Please find attached your health warning letter with QR code.\n\n"
+        "IMPORTANT: You are required to stay at home and follow all health guidelines.\n"
+        "A fine of ₹5,000 will be levied if you are found violating the safety protocols.\n\n"
+        "Please scan the QR code to view your health status details.\n\n"
+        "Regards,\nGovernment Health Administration"
+    )
+
+
+def warning_filename(traveler: dict) -> str:
+    return f"health_warning_{traveler.get('aadhar')}.pdf"
+
+
+def document_key(kind: str, qr_text: str, extra: dict | None = None) -> str:
+    """Content address of a rendered document.
+
+    Hashes the template version, the QR payload and any other field printed
+    on the page, so a change to any of them yields a new key.
+    """
+    material = json.dumps(
+        {"kind": kind, "version": TEMPLATE_VERSIONS[kind], "qr": qr_text, "extra": extra or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _document_path(key: str) -> Path:
+    return Path(current_app.config["RENDERED_DOCUMENT_FOLDER"]) / key[:2] / f"{key}.pdf"
+
+
+def load_document(key: str) -> bytes | None:
+    path = _document_path(key)
+    return path.read_bytes() if path.exists() else None
+
+
+def save_document(key: str, data: bytes):
+    path = _document_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def discard_document(key: str | None):
+    if key:
+        _document_path(key).unlink(missing_ok=True)
+
+
+def track_document(collection, record: dict, field: str, key: str):
+    """Point `record.field` at `key`, dropping the document it replaces."""
+    previous = record.get(field)
+    if previous != key:
+        discard_document(previous)
+        collection.update_one({"_id": record["_id"]}, {"$set": {field: key}})
+
+
+def withdraw_clearance(collection, officials_db, record: dict):
+    """Revoke the signed clearance codes of `record` and drop its PDF.
+
+    Signed clearances verify offline, so every path that takes an approval
+    back must call this.
+    """
+    qr_codec.revoke(officials_db, record["_id"])
+    if record.get("clearance_document"):
+        discard_document(record["clearance_document"])
+        collection.update_one({"_id": record["_id"]}, {"$unset": {"clearance_document": ""}})
+
+
+def clearance_key(doc: dict, qr_text: str) -> str:
+    # The signed code omits most printed fields, so hash those separately.
+    return document_key(
+        "clearance", qr_text, {"fields": clearance_qr_payload(doc), "medium_of_travel": doc.get("medium_of_travel")}
+    )
+
+
+def warning_key(traveler: dict, qr_text: str) -> str:
+    return document_key("health_warning", qr_text, {"fields": warning_qr_payload(traveler)})
+
+
+def render_clearance_pdf(doc: dict, qr_text: str) -> bytes:
+    return CLEARANCE.render(doc, qr_text)
+
+
+def render_warning_pdf(traveler: dict, qr_text: str) -> bytes:
+    return HEALTH_WARNING.render(traveler, qr_text)
+
+
+def clearance_document(doc: dict):
+    """Return (key, qr_text, pdf bytes) for a cleared migrant, rendering at most once."""
+    qr_text = clearance_qr(doc)
+    key = clearance_key(doc, qr_text)
+    data = load_document(key)
+    if data is None:
+        data = render_clearance_pdf(doc, qr_text)
+        save_document(key, data)
+    return key, qr_text, data
+
+
+def warning_document(traveler: dict):
+    """Return (key, qr_text, pdf bytes) for a disapproved traveler's warning letter."""
+    qr_text = warning_qr(traveler)
+    key = warning_key(traveler, qr_text)
+    data = load_document(key)
+    if data is None:
+        data = render_warning_pdf(traveler, qr_text)
+        save_document(key, data)
+    return key, qr_text, data
@@ -0,0 +1,186 @@
+import json
+import queue
+import threading
+import time
+from bson import ObjectId
+from flask import Response, current_app, request, stream_with_context
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+from models import decode_cursor, now_iso
+
+
+def ensure_event_log(db, size: int):
+    """Create the capped `events` collection the SSE streams tail."""
+    try:
+        db.create_collection("events", capped=True, size=size)
+    except CollectionInvalid:
+        pass  # already exists
+
+
+def _event(kind: str, roles: list, migrant_id: str | None, data: dict) -> dict:
+    return {"kind": kind, "roles": roles, "migrant_id": migrant_id, "data": data, "at": now_iso()}
+
+
+def publish(kind: str, roles: list, migrant_id: str | None = None, **data):
+    """Record a change for the dashboards of `roles`.
+
+    Events for the "migrant" role are only delivered to the migrant whose
+    id matches `migrant_id`.
+    """
+    current_app.officials_db.events.insert_one(_event(kind, roles, migrant_id, data))
+
+
+def publish_many(events: list):
+    """Record several (kind, roles, migrant_id, data) events with one insert."""
+    if events:
+        current_app.officials_db.events.insert_many([_event(*event) for event in events], ordered=False)
+
+
+def _format(doc: dict) -> str:
+    payload = dict(doc.get("data") or {}, kind=doc["kind"], migrant_id=doc.get("migrant_id"), at=doc.get("at"))
+    return f"id: {doc['_id']}\ndata: {json.dumps(payload)}\n\n"
+
+
+class EventHub:
+    """One tailer per process fanning new events out to the open streams.
+
+    A single tailable cursor follows the capped events collection from its
+    newest document, so the collection is scanned once per process rather
+    than once per connected tab. Each stream subscribes with a queue and
+    waits on it. The tailer thread starts with the first subscriber, after
+    any pre-fork.
+    """
+
+    QUEUE_SIZE = 1000
+
+    def __init__(self, db, logger):
+        self.db = db
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+
+    def subscribe(self, role: str, migrant_id: str | None) -> "Subscription":
+        subscription = Subscription(role, migrant_id, self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-hub", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: "Subscription"):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def dispatch(self, doc: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.wants(doc):
+                subscription.put(doc)
+
+    def _run(self):
+        # Everything before the hub started is the streams' backlog to send.
+        last_id = ObjectId()
+        while True:
+            try:
+                cursor = self.db.events.find(
+                    {"_id": {"$gt": last_id}}, cursor_type=CursorType.TAILABLE_AWAIT
+                ).max_await_time_ms(5000)
+                while cursor.alive:
+                    doc = cursor.try_next()
+                    if doc is not None:
+                        last_id = doc["_id"]
+                        self.dispatch(doc)
+                # The cursor dies on an empty capped collection, or if the log
+                # wrapped past it; resume after the last event dispatched.
+                cursor.close()
+                time.sleep(1)
+            except PyMongoError as exc:
+                self.logger.warning("Event tailer restarting: %s", exc)
+                time.sleep(1)
+
+
+class Subscription:
+    def __init__(self, role: str, migrant_id: str | None, size: int):
+        self.role = role
+        self.migrant_id = migrant_id
+        self.queue = queue.Queue(size)
+        self.overflowed = False
+
+    def wants(self, doc: dict) -> bool:
+        return self.role in doc.get("roles", ()) and (self.migrant_id is None or doc.get("migrant_id") == self.migrant_id)
+
+    def put(self, doc: dict):
+        try:
+            self.queue.put_nowait(doc)
+        except queue.Full:
+            # A stalled client; its stream ends and it resumes from the log.
+            self.overflowed = True
+
+
+def event_hub() -> EventHub:
+    app = current_app._get_current_object()
+    hub = getattr(app, "event_hub", None)
+    if hub is None:
+        hub = app.event_hub = EventHub(app.officials_db, app.logger)
+    return hub
+
+
+def _stream(subscription: Subscription, backlog: list, cfg):
+    heartbeat = cfg["SSE_HEARTBEAT"]
+    deadline = time.monotonic() + cfg["SSE_MAX_DURATION"]
+    yield "retry: 3000\n\n"
+    seen = set()
+    for doc in backlog:
+        seen.add(doc["_id"])
+        yield _format(doc)
+    while not subscription.overflowed:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            doc = subscription.queue.get(timeout=min(heartbeat, remaining))
+        except queue.Empty:
+            yield ": keep-alive\n\n"
+            continue
+        if doc["_id"] not in seen:
+            yield _format(doc)
+
+
+def event_response(role: str, migrant_id: str | None = None) -> Response:
+    """SSE response with the changes relevant to `role` since Last-Event-ID.
+
+    Events missed since Last-Event-ID are read once from the log; after that
+    the stream waits on its EventHub queue. Each open stream holds one worker
+    thread, so streams end after SSE_MAX_DURATION seconds and the browser
+    reconnects, resuming from the last event it saw.
+    """
+    db = current_app.officials_db
+    last_id = None
+    header = request.headers.get("Last-Event-ID", "").strip()
+    if ObjectId.is_valid(header):
+        last_id = ObjectId(header)
+    elif request.args.get("since"):
+        last_id = decode_cursor(request.args["since"])
+
+    hub = event_hub()
+    # Subscribe before reading the backlog so nothing falls in between;
+    # events delivered by both are sent once.
+    subscription = hub.subscribe(role, migrant_id)
+    backlog = []
+    if last_id is not None:
+        query = {"roles": role, "_id": {"$gt": last_id}}
+        if migrant_id is not None:
+            query["migrant_id"] = migrant_id
+        backlog = list(db.events.find(query).sort("$natural", 1))
+
+    response = Response(
+        stream_with_context(_stream(subscription, backlog, current_app.config)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Runs even if the client goes away before the stream starts.
+    response.call_on_close(lambda: hub.unsubscribe(subscription))
+    return response
@@ -0,0 +1,88 @@
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+
+# Declarative registry of the indexes the hot queries rely on. Each entry names
+# the app attribute holding the database, the collection and the key spec.
+INDEXES = [
+    # migrant login and the atomic application upsert; replaces the older
+    # non-unique (email, aadhar) index once it can be built
+    {"db": "immigrants_db", "collection": "immigrants", "keys": [("aadhar", ASCENDING), ("email", ASCENDING)], "name": "aadhar_email_unique", "unique": True, "replaces": "email_aadhar"},
+    # doctor/official queues, paged on _id
+    {"db": "immigrants_db", "collection": "immigrants", "keys": [("doctor_approval", ASCENDING), ("_id", ASCENDING)], "name": "doctor_approval_id"},
+    # doctor Aadhar search: anchored prefix range and last-4 lookup
+    {"db": "immigrants_db", "collection": "immigrants", "keys": [("doctor_approval", ASCENDING), ("aadhar", ASCENDING), ("_id", ASCENDING)], "name": "doctor_approval_aadhar_id"},
+    {"db": "immigrants_db", "collection": "immigrants", "keys": [("doctor_approval", ASCENDING), ("aadhar_last4", ASCENDING), ("_id", ASCENDING)], "name": "doctor_approval_aadhar_last4_id"},
+    # doctor review queue: region-routed claims and each doctor's held claims
+    {"db": "immigrants_db", "collection": "immigrants", "keys": [("doctor_approval", ASCENDING), ("source", ASCENDING), ("destination", ASCENDING), ("_id", ASCENDING)], "name": "doctor_approval_region_id"},
+    {"db": "immigrants_db", "collection": "immigrants", "keys": [("claimed_by", ASCENDING), ("claim_until", ASCENDING)], "name": "claimed_by_until", "sparse": True},
+    # approved-traveler lookup in scan_qr
+    {"db": "immigrants_db", "collection": "immigrants", "keys": [("aadhar", ASCENDING)], "name": "aadhar"},
+    {"db": "officials_db", "collection": "doctor_accounts", "keys": [("doctor_id", ASCENDING)], "name": "doctor_id_unique", "unique": True},
+    # scan_qr for disapproved travelers
+    {"db": "officials_db", "collection": "disapproved_travelers", "keys": [("aadhar", ASCENDING)], "name": "aadhar"},
+    # bulk health-warning selection
+    {"db": "officials_db", "collection": "disapproved_travelers", "keys": [("tier", ASCENDING), ("qr_generated", ASCENDING)], "name": "tier_qr_generated"},
+    # /migrant/status and the health-warning download
+    {"db": "officials_db", "collection": "disapproved_travelers", "keys": [("migrant_id", ASCENDING)], "name": "migrant_id"},
+    {"db": "officials_db", "collection": "approved_migrants", "keys": [("migrant_id", ASCENDING)], "name": "migrant_id"},
+    # checkpoint snapshot deltas
+    {"db": "officials_db", "collection": "disapproved_travelers", "keys": [("seq", ASCENDING)], "name": "seq"},
+    {"db": "officials_db", "collection": "qr_revocations", "keys": [("seq", ASCENDING)], "name": "seq"},
+    {"db": "officials_db", "collection": "penalties", "keys": [("aadhar", ASCENDING)], "name": "aadhar"},
+    # replay protection for checkpoint sync and levy-penalty retries
+    {"db": "officials_db", "collection": "penalties", "keys": [("idempotency_key", ASCENDING)], "name": "idempotency_key_unique", "unique": True, "sparse": True},
+    {"db": "officials_db", "collection": "scan_events", "keys": [("idempotency_key", ASCENDING)], "name": "idempotency_key_unique", "unique": True, "sparse": True},
+    # outbox sender claims
+    {"db": "officials_db", "collection": "email_outbox", "keys": [("status", ASCENDING), ("next_attempt_at", ASCENDING)], "name": "status_next_attempt"},
+]
+
+
+def _collection(app, spec):
+    return getattr(app, spec["db"])[spec["collection"]]
+
+
+def _matches(info: dict, spec: dict) -> bool:
+    return [tuple(k) for k in info.get("key", [])] == [tuple(k) for k in spec["keys"]] and bool(
+        info.get("unique", False)
+    ) == bool(spec.get("unique", False))
+
+
+def ensure_indexes(app):
+    """Create every registered index; safe to run repeatedly.
+
+    Returns the names of specs that could not be created (e.g. duplicate data
+    blocking a unique index) so callers can report them.
+    """
+    failed = []
+    for spec in INDEXES:
+        options = {k: v for k, v in spec.items() if k not in ("db", "collection", "keys", "replaces")}
+        collection = _collection(app, spec)
+        try:
+            collection.create_index(spec["keys"], **options)
+        except OperationFailure as exc:
+            app.logger.error("Could not create index %s.%s: %s", spec["collection"], spec["name"], exc)
+            failed.append(f"{spec['collection']}.{spec['name']}")
+            continue
+        # The superseded index is dropped only once its replacement exists.
+        if spec.get("replaces") in collection.index_information():
+            collection.drop_index(spec["replaces"])
+    return failed
+
+
+def missing_indexes(app):
+    """Registered specs that have no equivalent index in the database."""
+    missing = []
+    for spec in INDEXES:
+        existing = _collection(app, spec).index_information().values()
+        if not any(_matches(info, spec) for info in existing):
+            missing.append(f"{spec['collection']}.{spec['name']}")
+    return missing
+
+
+def check_indexes(app):
+    """Log a warning for each registered index that is not present."""
+    missing = missing_indexes(app)
+    for name in missing:
+        app.logger.warning("Required index missing: %s (run `flask --app app ensure-indexes`)", name)
+    return missing
@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from blobs import release_blob
+from documents import discard_document
+from events import publish
+from models import now_iso
+from qr_codec import revoke
+from versions import bump, PENDING_REVIEW, DOCTOR_APPROVED
+
+
+REQUIRED = ("name", "aadhar", "source", "destination", "medium_of_travel", "email")
+IMPORT_FORMATS = {"csv", "ndjson", "jsonl"}
+# A resubmission starts review over: drop what belonged to the old one.
+RESUBMIT_UNSET = {
+    "clearance_document": "",
+    "medical_report_path": "",
+    "claimed_by": "",
+    "claim_until": "",
+    "health_warning_id": "",
+}
+PREVIOUS_FIELDS = {"email": 1, "aadhar": 1, "clearance_document": 1, "medical_report_blob": 1, "official_approval": 1}
+
+
+def application_payload(fields) -> dict:
+    """Validated application record from submitted fields; raises ValueError."""
+    if not isinstance(fields, dict):
+        raise ValueError("Application must be an object")
+    values = {k: str(fields.get(k) or "").strip() for k in REQUIRED}
+    if not all(values.values()):
+        raise ValueError("All fields are required")
+    # Aadhar: only numbers, exactly 12 digits
+    aadhar = values["aadhar"]
+    if not aadhar.isdigit() or len(aadhar) != 12:
+        raise ValueError("Aadhar must be exactly 12 digits (numbers only)")
+    return dict(
+        values,
+        aadhar_last4=aadhar[-4:],
+        medical_report_blob=None,
+        medical_report_name=None,
+        doctor_approval="PENDING",
+        official_approval="PENDING",
+        doctor_id="",
+        created_at=now_iso(),
+    )
+
+
+def _key(payload: dict) -> dict:
+    return {"email": payload["email"], "aadhar": payload["aadhar"]}
+
+
+def void_previous(db, previous: dict):
+    """Retire what a replaced application had been issued."""
+    discard_document(previous.get("clearance_document"))
+    release_blob(previous.get("medical_report_blob"))
+    # Clearance QR codes are only issued once an official has approved.
+    if previous.get("official_approval") == "APPROVED":
+        revoke(db, previous["_id"])
+
+
+def upsert_application(coll, payload: dict):
+    """Insert or replace the application for (email, aadhar) in one write.
+
+    Returns (migrant _id, previous record or None). The unique
+    aadhar_email_unique index makes the upsert atomic: if a concurrent
+    submission inserts first, ours fails with a duplicate key and is retried
+    as a plain update of that record.
+    """
+    new_id = ObjectId()
+    update = {"$set": payload, "$unset": RESUBMIT_UNSET}
+    try:
+        previous = coll.find_one_and_update(
+            _key(payload),
+            dict(update, **{"$setOnInsert": {"_id": new_id}}),
+            projection=PREVIOUS_FIELDS,
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        previous = coll.find_one_and_update(_key(payload), update, projection=PREVIOUS_FIELDS)
+    return (previous["_id"] if previous else new_id), previous
+
+
+def _parse(text, extension: str):
+    if extension == "csv":
+        reader = csv.DictReader(text)
+        missing = [k for k in REQUIRED if k not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"CSV header is missing: {', '.join(missing)}")
+        for fields in reader:
+            yield reader.line_num, fields, None
+        return
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError:
+            yield number, None, "Invalid JSON"
+
+
+def read_rows(stream, filename: str):
+    """Yield (row number, fields, error) from a CSV or NDJSON upload.
+
+    CSV needs a header row naming the application fields; NDJSON holds one
+    JSON object per line. Row numbers are file line numbers. Raises
+    ValueError for an unsupported file or CSV header; undecodable text ends
+    the import with a row error, keeping the rows already read.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension not in IMPORT_FORMATS:
+        raise ValueError("Import file must be .csv, .ndjson or .jsonl")
+    rows = _parse(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""), extension)
+    number = 0
+    while True:
+        try:
+            number, fields, error = next(rows)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            yield number + 1, None, "File is not valid UTF-8 text"
+            return
+        yield number, fields, error
+
+
+def _write_chunk(app, chunk: list, summary: dict):
+    """Upsert one chunk of (row number, payload) with a single bulk_write."""
+    coll = app.immigrants_db.immigrants
+    existing = {
+        (doc["email"], doc["aadhar"]): doc
+        for doc in coll.find({"aadhar": {"$in": [p["aadhar"] for _, p in chunk]}}, PREVIOUS_FIELDS)
+    }
+    ops = [UpdateOne(_key(p), {"$set": p, "$unset": RESUBMIT_UNSET}, upsert=True) for _, p in chunk]
+    failed = {}
+    try:
+        coll.bulk_write(ops, ordered=False)
+    except BulkWriteError as exc:
+        failed = {err["index"]: err.get("errmsg", "write failed") for err in exc.details.get("writeErrors", [])}
+    for index, (row, payload) in enumerate(chunk):
+        if index in failed:
+            summary["errors"].append({"row": row, "error": failed[index]})
+            continue
+        previous = existing.get((payload["email"], payload["aadhar"]))
+        if previous is None:
+            summary["inserted"] += 1
+        else:
+            summary["updated"] += 1
+            void_previous(app.officials_db, previous)
+
+
+def import_applications(app, rows) -> dict:
+    """Validate and upsert applications from read_rows(); per-row errors.
+
+    Rows are validated exactly like /migrant/apply and written in chunks of
+    IMPORT_CHUNK_SIZE with one unordered bulk_write each, so a bad row never
+    blocks the rest. A row matching an existing (email, aadhar) is a
+    resubmission and resets that application's review. Must run in an
+    application context.
+    """
+    summary = {"inserted": 0, "updated": 0, "errors": []}
+    size = app.config["IMPORT_CHUNK_SIZE"]
+    seen, chunk = set(), []
+    for row, fields, error in rows:
+        if error is None:
+            try:
+                payload = application_payload(fields)
+            except ValueError as exc:
+                error = str(exc)
+        if error is None and (payload["email"], payload["aadhar"]) in seen:
+            error = "Duplicate application in import"
+        if error is not None:
+            summary["errors"].append({"row": row, "error": error})
+            continue
+        seen.add((payload["email"], payload["aadhar"]))
+        chunk.append((row, payload))
+        if len(chunk) >= size:
+            _write_chunk(app, chunk, summary)
+            chunk = []
+    if chunk:
+        _write_chunk(app, chunk, summary)
+
+    if summary["inserted"] or summary["updated"]:
+        # One refresh for the whole import rather than an event per row.
+        roles = ["doctor", "official"] if summary["updated"] else ["doctor"]
+        bump(*([PENDING_REVIEW, DOCTOR_APPROVED] if summary["updated"] else [PENDING_REVIEW]))
+        publish("applications_imported", roles, inserted=summary["inserted"], updated=summary["updated"])
+    return summary
@@ -1,10 +1,21 @@
+import base64
+import binascii
+import json
+from itertools import islice
 from datetime import datetime
 from functools import wraps
 from pathlib import Path
-import smtplib
-from email.message import EmailMessage
-from flask import current_app, jsonify, session
+from flask import current_app, jsonify, request, session
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from outbox import enqueue_email, smtp_configured
+from schemas import MIGRANT, MIGRANT_FOR_DOCTOR
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
 
 
 def require_role(role: str):
@@ -29,51 +40,187 @@ def to_object_id(id_str: str):
         return None
 
 
-def serialize_migrant(doc: dict, include_sensitive: bool = False):
-    """Shape migrant data for responses with privacy controls."""
-    if not doc:
+def encode_cursor(object_id: ObjectId, key: str | None = None) -> str:
+    """Opaque page token for the last `_id` a client has seen.
+
+    Pages ordered on (field, _id) prefix the token with that field's value.
+    """
+    raw = (key.encode() if key is not None else b"") + object_id.binary
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _token_bytes(token: str):
+    try:
+        return base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+
+
+def decode_cursor(token: str):
+    raw = _token_bytes(token)
+    if raw is None or len(raw) != 12:
+        return None
+    return ObjectId(raw)
+
+
+def decode_keyed_cursor(token: str):
+    """(field value, _id) from an encode_cursor(..., key) token, or None."""
+    raw = _token_bytes(token)
+    if raw is None or len(raw) <= 12:
+        return None
+    try:
+        return raw[:-12].decode(), ObjectId(raw[-12:])
+    except UnicodeDecodeError:
         return None
-    base = {
-        "id": str(doc["_id"]),
-        "name": doc.get("name"),
-        "aadhar": doc.get("aadhar"),
-        "source": doc.get("source"),
-        "destination": doc.get("destination"),
-        "medium_of_travel": doc.get("medium_of_travel"),
-        "email": doc.get("email"),
-        "doctor_approval": doc.get("doctor_approval"),
-        "official_approval": doc.get("official_approval"),
-        "created_at": doc.get("created_at"),
-        "doctor_id": doc.get("doctor_id"),
-    }
-    if include_sensitive:
-        base["medical_report_path"] = doc.get("medical_report_path")
-    return base
-
-
-def send_email(to_email: str, subject: str, body: str, attachment_path: str | None = None):
-    """Send email via SMTP; silently skip if credentials are absent."""
+
+
+def page_args(keyed: bool = False):
+    """Read `limit`, `cursor` and `count` from the query string.
+
+    Returns (limit, after, with_total) or raises ValueError on a bad cursor.
+    `after` is the last `_id`, or a (field value, _id) pair when `keyed`.
+    """
+    cfg = current_app.config
+    try:
+        limit = int(request.args.get("limit", cfg["PAGE_SIZE_DEFAULT"]))
+    except ValueError:
+        limit = cfg["PAGE_SIZE_DEFAULT"]
+    limit = max(1, min(limit, cfg["PAGE_SIZE_MAX"]))
+
+    after = None
+    token = request.args.get("cursor", "").strip()
+    if token:
+        after = decode_keyed_cursor(token) if keyed else decode_cursor(token)
+        if after is None:
+            raise ValueError("Invalid cursor")
+    with_total = request.args.get("count", "").lower() in ("1", "true", "yes")
+    return limit, after, with_total
+
+
+def paginate(collection, query: dict, limit: int, after=None, with_total: bool = False, projection=None, key=None):
+    """Keyset pagination ordered by `_id`, or by (`key`, `_id`) when given.
+
+    ObjectIds are monotonic per insert, so this also pages in creation order
+    without the cost of skip(). Ordering on an indexed field first lets a
+    range query on it walk the index in order instead of sorting every
+    match. Returns (docs, next_cursor, total).
+    """
+    page_query = dict(query)
+    if key is None:
+        order = [("_id", 1)]
+        if after is not None:
+            page_query["_id"] = {"$gt": after}
+    else:
+        order = [(key, 1), ("_id", 1)]
+        if after is not None:
+            value, last_id = after
+            page_query = {"$and": [query, {"$or": [{key: {"$gt": value}}, {key: value, "_id": {"$gt": last_id}}]}]}
+    docs = list(collection.find(page_query, projection).sort(order).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last["_id"], last[key] if key else None)
+    total = collection.count_documents(query) if with_total else None
+    return docs, next_cursor, total
+
+
+def encode_json(body) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def decode_json(data):
+    """Parse JSON text; raises json.JSONDecodeError (orjson's error subclasses it)."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def json_response(body, status: int = 200):
+    """Encode with orjson when installed; it is several times faster than jsonify."""
+    return current_app.response_class(encode_json(body), status=status, mimetype="application/json")
+
+
+STREAM_MODES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def stream_mode():
+    """Streaming mode requested via `?stream=json|ndjson` or an NDJSON Accept header.
+
+    Returns None for a normal paged response; raises ValueError on an unknown mode.
+    """
+    mode = request.args.get("stream", "").strip().lower()
+    if not mode:
+        return "ndjson" if request.accept_mimetypes.best == "application/x-ndjson" else None
+    if mode not in STREAM_MODES:
+        raise ValueError("stream must be json or ndjson")
+    return mode
+
+
+def stream_response(key: str, collection, query: dict, schema, mode: str):
+    """Encode every matching record straight off the cursor.
+
+    Documents are fetched and encoded STREAM_BATCH_SIZE at a time, so memory
+    stays flat however large the collection is. "json" yields the same
+    `{key: [...]}` envelope as the paged response, "ndjson" one record per line.
+    """
+    batch_size = current_app.config["STREAM_BATCH_SIZE"]
+    cursor = collection.find(query, schema.projection).sort("_id", 1).batch_size(batch_size)
+
+    def generate():
+        first = True
+        if mode == "json":
+            yield b'{"' + key.encode() + b'":['
+        while True:
+            batch = list(islice(cursor, batch_size))
+            if not batch:
+                break
+            if mode == "ndjson":
+                yield b"".join(encode_json(schema.dump(doc)) + b"\n" for doc in batch)
+            else:
+                chunk = b",".join(encode_json(schema.dump(doc)) for doc in batch)
+                yield chunk if first else b"," + chunk
+            first = False
+        if mode == "json":
+            yield b"]}"
+
+    return current_app.response_class(generate(), mimetype=STREAM_MODES[mode])
+
+
+def page_response(key: str, items: list, next_cursor, total):
+    body = {key: items, "next": next_cursor}
+    if total is not None:
+        body["total"] = total
+    return json_response(body)
+
+
+def serialize_migrant(doc: dict, include_sensitive: bool = False):
+    """Shape migrant data for responses with privacy controls (see schemas.py)."""
+    return (MIGRANT_FOR_DOCTOR if include_sensitive else MIGRANT).dump(doc)
+
+
+def send_email(
+    to_email: str, subject: str, body: str, attachment_path: str | None = None, attachment: tuple | None = None
+):
+    """Queue an email in the outbox; silently skip if SMTP is not configured.
+
+    Delivery happens on the background sender (see outbox.py), so callers no
+    longer wait on the SMTP handshake. In-memory files can be passed as an
+    `attachment` (filename, bytes) pair instead of a path, and stored uploads
+    as (filename, {"blob": digest}), which the sender reads from storage.
+    """
     cfg = current_app.config
-    if not cfg.get("SMTP_USERNAME") or not cfg.get("SMTP_PASSWORD"):
+    if not smtp_configured(cfg):
         # Development fallback to avoid hard failures without credentials.
         current_app.logger.warning("SMTP credentials not configured; skipping email send.")
         return False
 
-    msg = EmailMessage()
-    msg["From"] = cfg.get("SMTP_SENDER") or cfg.get("SMTP_USERNAME")
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    if attachment_path:
+    if attachment_path and attachment is None:
         path = Path(attachment_path)
         if path.exists():
-            data = path.read_bytes()
-            msg.add_attachment(data, maintype="application", subtype="octet-stream", filename=path.name)
+            attachment = (path.name, path.read_bytes())
 
-    with smtplib.SMTP_SSL(cfg.get("SMTP_HOST"), cfg.get("SMTP_PORT")) as smtp:
-        smtp.login(cfg.get("SMTP_USERNAME"), cfg.get("SMTP_PASSWORD"))
-        smtp.send_message(msg)
+    enqueue_email(current_app.officials_db, to_email, subject, body, attachment)
     return True
 
 
@@ -99,6 +246,31 @@ def verify_card(file_path: str):
     return True, "Verified"
 
 
+def backfill_aadhar_last4(db):
+    """Populate `aadhar_last4` on applications stored before the field existed."""
+    result = db.immigrants.update_many(
+        {"aadhar_last4": {"$exists": False}, "aadhar": {"$type": "string"}},
+        [{"$set": {"aadhar_last4": {"$substrCP": ["$aadhar", {"$subtract": [{"$strLenCP": "$aadhar"}, 4]}, 4]}}}],
+    )
+    return result.modified_count
+
+
+def mark_warning_issued(db, travelers: list) -> int:
+    """Point each traveler's application at their issued warning letter."""
+    ops = [
+        UpdateOne({"_id": ObjectId(t["migrant_id"])}, {"$set": {"health_warning_id": str(t["_id"])}})
+        for t in travelers
+        if ObjectId.is_valid(t.get("migrant_id"))
+    ]
+    return db.immigrants.bulk_write(ops, ordered=False).modified_count if ops else 0
+
+
+def backfill_health_warnings(immigrants_db, officials_db):
+    """Populate `health_warning_id` for warnings issued before the field existed."""
+    issued = officials_db.disapproved_travelers.find({"qr_generated": True}, {"migrant_id": 1})
+    return mark_warning_issued(immigrants_db, list(issued))
+
+
 def seed_doctors(db, defaults: dict):
     """Ensure default doctor accounts exist in the database-backed store."""
     if not defaults:
@@ -0,0 +1,189 @@
+from io import BytesIO
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from config import allowed_file
+from blobs import release_blob, store_blob, store_upload
+from bulk_issue import render_pool
+from documents import clearance_qr, clearance_key, load_document, save_document, discard_document
+from events import publish_many
+from versions import bump, DOCTOR_APPROVED
+from models import now_iso
+from outbox import enqueue_emails, smtp_configured
+from pdf_templates import APPROVAL_LETTER, CLEARANCE
+
+
+APPROVAL_SUBJECT = "Aarogya Check Approval Letter"
+MIGRANT_FIELDS = {
+    "name": 1,
+    "aadhar": 1,
+    "email": 1,
+    "source": 1,
+    "destination": 1,
+    "medium_of_travel": 1,
+    "doctor_approval": 1,
+    "official_approval": 1,
+    "created_at": 1,
+    "clearance_document": 1,
+}
+
+
+def approval_body(doc: dict, official_id) -> str:
+    return (
+        f"Dear {doc.get('name')},\n\n"
+        "Your travel clearance has been approved by a Government Official.\n"
+        f"Issued by Official ID: {official_id}\n\n"
+        "You can download your clearance PDF from the migrant dashboard.\n"
+        "Your official approval letter is attached with this email.\n\n"
+        "Regards,\nAarogya Check (Government Mailbox)"
+    )
+
+
+def save_approvals(officials, records: list):
+    """Upsert one approved_migrants row per migrant, with one bulk_write.
+
+    The approval letters of the rows replaced (and of any duplicates left by
+    older releases, which are deleted) lose their blob reference.
+    """
+    previous = {}
+    for row in officials.approved_migrants.find(
+        {"migrant_id": {"$in": [r["migrant_id"] for r in records]}}, {"migrant_id": 1, "approval_letter_blob": 1}
+    ).sort("_id", 1):
+        previous.setdefault(row["migrant_id"], []).append(row)
+    ops = []
+    for record in records:
+        rows = previous.get(record["migrant_id"], [])
+        if rows:
+            ops.append(ReplaceOne({"_id": rows[0]["_id"]}, record))
+            ops.extend(DeleteOne({"_id": row["_id"]}) for row in rows[1:])
+        else:
+            ops.append(ReplaceOne({"migrant_id": record["migrant_id"]}, record, upsert=True))
+    officials.approved_migrants.bulk_write(ops, ordered=False)
+    for rows in previous.values():
+        for row in rows:
+            release_blob(row.get("approval_letter_blob"))
+
+
+def drop_approval(officials, migrant_id: str):
+    """Delete a migrant's approved_migrants rows and release their letters."""
+    rows = list(officials.approved_migrants.find({"migrant_id": migrant_id}, {"approval_letter_blob": 1}))
+    if rows:
+        officials.approved_migrants.delete_many({"_id": {"$in": [row["_id"] for row in rows]}})
+    for row in rows:
+        release_blob(row.get("approval_letter_blob"))
+
+
+def render_approval(doc: dict, letter_fields: dict | None):
+    """Pool task: (migrant _id, letter pdf or None, clearance key, clearance pdf).
+
+    The letter is rendered only when the official did not upload one.
+    """
+    qr_text = clearance_qr(doc)
+    letter = None
+    if letter_fields is not None:
+        letter = APPROVAL_LETTER.render(dict(doc, **letter_fields), qr_text)
+    return doc["_id"], letter, clearance_key(doc, qr_text), CLEARANCE.render(doc, qr_text)
+
+
+def approve_many(app, migrant_ids: list, official_id, letters: dict | None = None, remarks: str = "") -> list:
+    """Approve many doctor-approved migrants in one pass; per-item results.
+
+    Approval letters come from `letters` ({migrant_id: FileStorage}) when
+    uploaded, otherwise they are generated from the APPROVAL_LETTER template
+    with the batch's shared `remarks`. Letters and clearances render across
+    the process pool; approved_migrants, immigrants and the outbox are each
+    written with one bulk call.
+    """
+    letters = letters or {}
+    immigrants = app.immigrants_db.immigrants
+    officials = app.officials_db
+    results = [None] * len(migrant_ids)
+    wanted = {}  # ObjectId -> item index
+    for i, raw in enumerate(migrant_ids):
+        try:
+            migrant_id = ObjectId(raw)
+        except (InvalidId, TypeError):
+            results[i] = {"migrant_id": raw, "status": "error", "error": "invalid migrant_id"}
+            continue
+        if migrant_id in wanted:
+            results[i] = {"migrant_id": raw, "status": "error", "error": "duplicate migrant_id in batch"}
+            continue
+        upload = letters.get(str(migrant_id))
+        if upload is not None and not allowed_file(upload.filename or "", app.config["ALLOWED_LETTER_EXTENSIONS"]):
+            results[i] = {"migrant_id": raw, "status": "error", "error": "Invalid approval letter format"}
+            continue
+        wanted[migrant_id] = i
+
+    docs, found = [], set()
+    for doc in immigrants.find({"_id": {"$in": list(wanted)}}, MIGRANT_FIELDS):
+        found.add(doc["_id"])
+        i = wanted[doc["_id"]]
+        if doc.get("doctor_approval") != "APPROVED":
+            results[i] = {"migrant_id": str(doc["_id"]), "status": "error", "error": "Doctor approval pending"}
+        elif doc.get("official_approval") == "APPROVED":
+            results[i] = {"migrant_id": str(doc["_id"]), "status": "error", "error": "Already approved"}
+        else:
+            docs.append(doc)
+    for migrant_id, i in wanted.items():
+        if migrant_id not in found:
+            results[i] = {"migrant_id": str(migrant_id), "status": "error", "error": "Migrant not found"}
+    if not docs:
+        return results
+
+    decided_at = now_iso()
+    for doc in docs:
+        # The clearance QR is issued at the decision time, as in decide().
+        doc.update(official_approval="APPROVED", official_decided_at=decided_at)
+    letter_fields = {"official_id": official_id, "approved_at": decided_at[:10], "remarks": remarks}
+    tasks = [
+        (doc, None if str(doc["_id"]) in letters else dict(letter_fields, reference=f"AC/{doc['_id']}"))
+        for doc in docs
+    ]
+    pool = render_pool(app.config["RENDER_WORKERS"])
+    rendered = pool.map(render_approval, *zip(*tasks), chunksize=8)
+
+    by_id = {doc["_id"]: doc for doc in docs}
+    approved, updates, emails, events = [], [], [], []
+    for migrant_id, letter_pdf, clearance, clearance_pdf in rendered:
+        doc = by_id[migrant_id]
+        upload = letters.get(str(migrant_id))
+        if upload is not None:
+            letter_blob, letter_name = store_upload(upload), upload.filename
+        else:
+            letter_name = f"approval_letter_{doc.get('aadhar')}.pdf"
+            letter_blob = store_blob(BytesIO(letter_pdf), letter_name)
+        if load_document(clearance) is None:
+            save_document(clearance, clearance_pdf)
+        if doc.get("clearance_document") not in (None, clearance):
+            discard_document(doc["clearance_document"])
+        approved.append(
+            {
+                "migrant_id": str(migrant_id),
+                "name": doc.get("name"),
+                "aadhar": doc.get("aadhar"),
+                "source": doc.get("source"),
+                "destination": doc.get("destination"),
+                "medium_of_travel": doc.get("medium_of_travel"),
+                "official_id": official_id,
+                "approval_letter_blob": letter_blob,
+                "approval_letter_name": letter_name,
+                "approved_at": decided_at,
+            }
+        )
+        updates.append(
+            UpdateOne(
+                {"_id": migrant_id},
+                {"$set": {"official_approval": "APPROVED", "official_decided_at": decided_at, "clearance_document": clearance}},
+            )
+        )
+        emails.append((doc.get("email"), APPROVAL_SUBJECT, approval_body(doc, official_id), (letter_name, {"blob": letter_blob})))
+        events.append(("official_decision", ["official", "migrant"], str(migrant_id), {"decision": "APPROVED"}))
+        results[wanted[migrant_id]] = {"migrant_id": str(migrant_id), "status": "approved"}
+
+    save_approvals(officials, approved)
+    immigrants.bulk_write(updates, ordered=False)
+    if smtp_configured(app.config):
+        enqueue_emails(officials, emails)
+    bump(DOCTOR_APPROVED)
+    publish_many(events)
+    return results
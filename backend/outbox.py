@@ -0,0 +1,237 @@
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pymongo import ReturnDocument
+
+
+def smtp_configured(cfg) -> bool:
+    """True when outgoing mail can be delivered with the current settings."""
+    if not cfg.get("SMTP_AUTH"):
+        return bool(cfg.get("SMTP_HOST"))
+    return bool(cfg.get("SMTP_USERNAME") and cfg.get("SMTP_PASSWORD"))
+
+
+def _outbox_doc(to_email: str, subject: str, body: str, attachment: tuple | None, now: datetime) -> dict:
+    doc = {
+        "to": to_email,
+        "subject": subject,
+        "body": body,
+        "status": "queued",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    }
+    if attachment:
+        filename, content = attachment
+        if isinstance(content, dict):  # {"blob": digest} in the upload store
+            doc["attachment"] = {"filename": filename, "blob": content["blob"]}
+        else:
+            doc["attachment"] = {"filename": filename, "data": content}
+    return doc
+
+
+def enqueue_email(db, to_email: str, subject: str, body: str, attachment: tuple | None = None):
+    """Persist a message in the outbox; the background sender delivers it.
+
+    `attachment` is an optional (filename, bytes) pair stored with the
+    message so callers may discard their temporary files straight away, or
+    (filename, {"blob": digest}) to attach a stored upload at send time.
+    """
+    return db.email_outbox.insert_one(_outbox_doc(to_email, subject, body, attachment, datetime.utcnow())).inserted_id
+
+
+def enqueue_emails(db, messages: list):
+    """Queue many (to, subject, body, attachment) tuples with one insert."""
+    if not messages:
+        return 0
+    now = datetime.utcnow()
+    db.email_outbox.insert_many([_outbox_doc(*message, now) for message in messages], ordered=False)
+    return len(messages)
+
+
+def queue_depth(db) -> dict:
+    coll = db.email_outbox
+    return {status: coll.count_documents({"status": status}) for status in ("queued", "sending", "failed")}
+
+
+def _attachment_bytes(attachment: dict, storage) -> bytes:
+    if "blob" not in attachment:
+        return bytes(attachment["data"])
+    fh = storage.open(attachment["blob"]) if storage is not None else None
+    if fh is None:
+        raise OSError(f"Attachment {attachment['blob']} is not in the upload store")
+    with fh:
+        return fh.read()
+
+
+def build_message(doc: dict, sender: str, storage=None) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = doc["to"]
+    msg["Subject"] = doc["subject"]
+    msg.set_content(doc["body"])
+    attachment = doc.get("attachment")
+    if attachment:
+        msg.add_attachment(
+            _attachment_bytes(attachment, storage), maintype="application", subtype="octet-stream", filename=attachment["filename"]
+        )
+    return msg
+
+
+class SMTPSession:
+    """A long-lived SMTP connection that reconnects and re-authenticates on demand."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.smtp = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        cfg = self.cfg
+        factory = smtplib.SMTP_SSL if cfg.get("SMTP_USE_SSL") else smtplib.SMTP
+        smtp = factory(cfg.get("SMTP_HOST"), cfg.get("SMTP_PORT"), timeout=cfg.get("SMTP_TIMEOUT"))
+        if cfg.get("SMTP_AUTH"):
+            smtp.login(cfg.get("SMTP_USERNAME"), cfg.get("SMTP_PASSWORD"))
+        self.smtp = smtp
+
+    def _alive(self) -> bool:
+        if self.smtp is None:
+            return False
+        # Servers drop idle sessions; probe before reusing one that sat around.
+        if time.monotonic() - self.last_used < self.cfg.get("OUTBOX_IDLE_NOOP"):
+            return True
+        try:
+            return self.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, msg: EmailMessage):
+        if not self._alive():
+            self.close()
+            self._connect()
+        try:
+            self.smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # One transparent retry on a fresh connection.
+            self.close()
+            self._connect()
+            self.smtp.send_message(msg)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self.smtp = None
+
+
+class OutboxWorker(threading.Thread):
+    """Drains `email_outbox` in batches over a persistent SMTP session.
+
+    Messages are claimed atomically, so several app processes may each run a
+    worker. A claim expires after OUTBOX_LEASE seconds, which returns messages
+    held by a crashed worker to the queue.
+    """
+
+    def __init__(self, db, cfg, logger, storage=None):
+        super().__init__(name="email-outbox", daemon=True)
+        self.db = db
+        self.storage = storage
+        self.cfg = cfg
+        self.logger = logger
+        self.session = SMTPSession(cfg)
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def claim(self):
+        now = datetime.utcnow()
+        return self.db.email_outbox.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued", "next_attempt_at": {"$lte": now}},
+                    {"status": "sending", "locked_until": {"$lt": now}},
+                ]
+            },
+            {"$set": {"status": "sending", "locked_until": now + timedelta(seconds=self.cfg.get("OUTBOX_LEASE"))}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def claim_batch(self):
+        batch = []
+        while len(batch) < self.cfg.get("OUTBOX_BATCH_SIZE"):
+            doc = self.claim()
+            if doc is None:
+                break
+            batch.append(doc)
+        return batch
+
+    def deliver(self, doc):
+        sender = self.cfg.get("SMTP_SENDER") or self.cfg.get("SMTP_USERNAME")
+        coll = self.db.email_outbox
+        try:
+            self.session.send(build_message(doc, sender, self.storage))
+        except (smtplib.SMTPException, OSError) as exc:
+            attempts = doc.get("attempts", 0) + 1
+            permanent = isinstance(exc, smtplib.SMTPRecipientsRefused)
+            if permanent or attempts >= self.cfg.get("OUTBOX_MAX_ATTEMPTS"):
+                coll.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {"status": "failed", "attempts": attempts, "last_error": str(exc)}, "$unset": {"locked_until": ""}},
+                )
+                self.logger.error("Email %s to %s failed permanently: %s", doc["_id"], doc["to"], exc)
+                return False
+            delay = min(self.cfg.get("OUTBOX_RETRY_BASE") * 2 ** (attempts - 1), self.cfg.get("OUTBOX_RETRY_MAX"))
+            coll.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "status": "queued",
+                        "attempts": attempts,
+                        "last_error": str(exc),
+                        "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+                    },
+                    "$unset": {"locked_until": ""},
+                },
+            )
+            self.logger.warning("Email %s to %s failed (attempt %s), retrying in %ss: %s", doc["_id"], doc["to"], attempts, delay, exc)
+            return False
+        # Delivered mail has no further use for the attachment bytes.
+        coll.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"status": "sent", "sent_at": datetime.utcnow()}, "$unset": {"locked_until": "", "attachment": ""}},
+        )
+        return True
+
+    def drain_once(self) -> int:
+        batch = self.claim_batch()
+        for doc in batch:
+            self.deliver(doc)
+        return len(batch)
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                sent = self.drain_once()
+            except Exception:  # keep the sender alive across Mongo hiccups
+                self.logger.exception("Email outbox worker error")
+                sent = 0
+            if not sent:
+                self._halt.wait(self.cfg.get("OUTBOX_POLL_INTERVAL"))
+        self.session.close()
+
+
+def start_outbox_worker(app):
+    """Start the in-process sender when mail is configured."""
+    if not app.config["OUTBOX_WORKER_ENABLED"] or not smtp_configured(app.config):
+        return None
+    worker = OutboxWorker(app.officials_db, app.config, app.logger, app.storage)
+    worker.start()
+    app.outbox_worker = worker
+    return worker
@@ -0,0 +1,188 @@
+from functools import cached_property
+from io import BytesIO
+from typing import NamedTuple
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.lib.utils import ImageReader
+from PIL import Image
+import qrcode
+
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+BLACK = (0, 0, 0)
+RED = (0.8, 0, 0)
+QR_SIZE = 120
+STATIC_FORM = "static"
+
+
+class Line(NamedTuple):
+    """One line of letter copy.
+
+    `text` is a str.format template; lines without placeholders are static
+    and go into the static form. `skip` is the vertical distance
+    from the previous line.
+    """
+
+    text: str
+    font: str
+    size: int
+    skip: float = 0
+    color: tuple = BLACK
+
+
+class _Fields(dict):
+    # Mirror `doc.get(...)` in the old f-strings: missing fields print as None.
+    def __missing__(self, key):
+        return None
+
+
+class LetterTemplate:
+    """A single-page A4 letter with a title, a QR code and a column of lines.
+
+    Compiling resolves every line to an absolute position once and splits
+    the static lines from the ones with fields. Rendering draws the static
+    lines as a form XObject (beginForm/doForm) and then stamps the variable
+    fields and the QR code.
+    """
+
+    def __init__(self, title: Line, qr_label: str, lines: list, top: float = PAGE_HEIGHT - 100):
+        self.title = title
+        self.qr_label = qr_label
+        self.lines = lines
+        self.top = top
+        self.qr_x = PAGE_WIDTH - 72 - QR_SIZE
+        self.qr_y = PAGE_HEIGHT - 50 - QR_SIZE
+
+    @cached_property
+    def layout(self):
+        """(static ops, field ops) as (font, size, color, x, y, text) tuples."""
+        static = [
+            (self.title.font, self.title.size, self.title.color, 72, PAGE_HEIGHT - 50, self.title.text),
+            ("Helvetica-Bold", 10, BLACK, self.qr_x, self.qr_y - 15, self.qr_label),
+        ]
+        fields = []
+        y = self.top
+        for line in self.lines:
+            y -= line.skip
+            op = (line.font, line.size, line.color, 72, y, line.text)
+            (fields if "{" in line.text else static).append(op)
+        return tuple(static), tuple(fields)
+
+    def _stamp_static(self, c):
+        # Form XObjects belong to one document, so the static lines are drawn
+        # into a form once per letter and placed with doForm.
+        c.beginForm(STATIC_FORM)
+        _draw(c, self.layout[0])
+        c.endForm()
+        c.doForm(STATIC_FORM)
+
+    def render(self, record: dict, qr_data: str) -> bytes:
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        self._stamp_static(c)
+        values = _Fields(record)
+        _draw(c, [(font, size, color, x, y, text.format_map(values)) for font, size, color, x, y, text in self.layout[1]])
+        draw_qr(c, qr_data, self.qr_x, self.qr_y, QR_SIZE)
+        c.showPage()
+        c.save()
+        return buffer.getvalue()
+
+
+def _draw(c, ops):
+    current = None
+    color = BLACK
+    for font, size, rgb, x, y, text in ops:
+        if (font, size) != current:
+            c.setFont(font, size)
+            current = (font, size)
+        if rgb != color:
+            c.setFillColorRGB(*rgb)
+            color = rgb
+        c.drawString(x, y, text)
+    if color != BLACK:
+        c.setFillColorRGB(*BLACK)
+
+
+def qr_matrix(data: str):
+    # A fixed mask skips qrcode's eight-way mask search, which is most of its cost.
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, border=4, mask_pattern=0)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def draw_qr(c, data: str, x: float, y: float, size: float):
+    """Draw the QR code as a one-pixel-per-module bitmap scaled to `size`.
+
+    The bitmap is a few hundred bytes instead of a 10px-per-module RGB image,
+    which is what made embedding the old PNG slow.
+    """
+    matrix = qr_matrix(data)
+    img = Image.new("1", (len(matrix), len(matrix)))
+    img.putdata([0 if cell else 255 for row in matrix for cell in row])
+    c.drawImage(ImageReader(img), x, y, width=size, height=size)
+
+
+CLEARANCE = LetterTemplate(
+    title=Line("Aarogya Check - Travel Clearance", "Helvetica-Bold", 18),
+    qr_label="Verification QR Code",
+    lines=[
+        Line("Name: {name}", "Helvetica", 12),
+        Line("Aadhar: {aadhar}", "Helvetica", 12, 20),
+        Line("Source: {source}", "Helvetica", 12, 20),
+        Line("Destination: {destination}", "Helvetica", 12, 20),
+        Line("Mode of Travel: {medium_of_travel}", "Helvetica", 12, 20),
+        Line("", "Helvetica", 12, 20),
+        Line("Doctor Approval: {doctor_approval}", "Helvetica", 12, 20),
+        Line("Official Approval: {official_approval}", "Helvetica", 12, 20),
+        Line("Approved On: {created_at}", "Helvetica", 12, 20),
+        Line("Note: Medical details are intentionally omitted.", "Helvetica-Oblique", 10, 40),
+        Line("Scan the QR code to verify this clearance certificate.", "Helvetica-Oblique", 10, 15),
+    ],
+)
+
+APPROVAL_LETTER = LetterTemplate(
+    title=Line("Aarogya Check - Official Approval Letter", "Helvetica-Bold", 18),
+    qr_label="Verification QR Code",
+    lines=[
+        Line("Reference: {reference}", "Helvetica", 11),
+        Line("Date: {approved_at}", "Helvetica", 11, 18),
+        Line("To: {name}", "Helvetica-Bold", 12, 40),
+        Line("Aadhar: {aadhar}", "Helvetica", 12, 20),
+        Line("This is to certify that the above traveler has been medically cleared and is", "Helvetica", 12, 40),
+        Line("approved by the Government to travel from {source} to {destination}", "Helvetica", 12, 18),
+        Line("by {medium_of_travel}.", "Helvetica", 12, 18),
+        Line("{remarks}", "Helvetica", 12, 30),
+        Line("Issued by Official ID: {official_id}", "Helvetica-Bold", 12, 40),
+        Line("Scan the QR code to verify this approval.", "Helvetica-Oblique", 10, 40),
+    ],
+)
+
+HEALTH_WARNING = LetterTemplate(
+    title=Line("HEALTH WARNING NOTICE", "Helvetica-Bold", 20, color=RED),
+    qr_label="Health Status QR Code",
+    lines=[
+        Line("Name: {name}", "Helvetica-Bold", 12),
+        Line("Aadhar Number: {aadhar}", "Helvetica-Bold", 12, 20),
+        Line("Phone Number: {phone_number}", "Helvetica-Bold", 12, 20),
+        Line("Email: {email}", "Helvetica-Bold", 12, 20),
+        Line("Address: {current_address}", "Helvetica-Bold", 12, 20),
+        Line("Disease: {disease_name}", "Helvetica-Bold", 12, 20),
+        Line("Tier: {tier}", "Helvetica-Bold", 12, 20),
+        Line("Expected Recovery Date: {expected_recovery_date}", "Helvetica-Bold", 12, 20),
+        Line("HEALTH GUIDELINES TO BE FOLLOWED:", "Helvetica-Bold", 14, 30),
+        Line("1. You are advised to stay at home and follow strict isolation protocols.", "Helvetica", 11, 25),
+        Line("2. Do not travel or visit public places until you have fully recovered.", "Helvetica", 11, 18),
+        Line("3. Follow all medical prescriptions and take medications as prescribed.", "Helvetica", 11, 18),
+        Line("4. Monitor your health condition regularly and report any deterioration immediately.", "Helvetica", 11, 18),
+        Line("5. Maintain proper hygiene and sanitization at all times.", "Helvetica", 11, 18),
+        Line("6. Avoid contact with family members and others to prevent spread of infection.", "Helvetica", 11, 18),
+        Line("7. Follow up with your healthcare provider as scheduled.", "Helvetica", 11, 18),
+        Line("⚠️ PENALTY WARNING ⚠️", "Helvetica-Bold", 14, 38, RED),
+        Line("A FINE AMOUNT OF ₹5,000 will be levied if you are caught", "Helvetica-Bold", 12, 20, RED),
+        Line("roaming in public places while you have been advised to", "Helvetica-Bold", 12, 18, RED),
+        Line("stay at home and follow safety protocols.", "Helvetica-Bold", 12, 18, RED),
+        Line("This is an official health warning notice from the Government Health Administration.", "Helvetica-Oblique", 10, 30),
+        Line("Scan the QR code to verify health status and details.", "Helvetica-Oblique", 10, 15),
+    ],
+)
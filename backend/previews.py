@@ -0,0 +1,141 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from bson import Binary
+from PIL import Image, ImageOps
+from storage import LocalStorage, open_storage, storage_settings
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional; PDF reports then get no preview
+    PdfReader = None
+
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
+
+_pool = None
+_storage = None
+
+
+def preview_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for preview generation, kept apart from letter rendering
+    so a bulk issue never delays triage previews (spawned, like render_pool)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _thumbnail(image, max_px: int) -> dict:
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_px, max_px))
+    out = io.BytesIO()
+    image.convert("RGB").save(out, "JPEG", quality=80, optimize=True)
+    return {"kind": "image", "mimetype": "image/jpeg", "data": out.getvalue(), "width": image.width, "height": image.height}
+
+
+def _pdf_preview(source, max_px: int, max_chars: int) -> dict:
+    reader = PdfReader(source)
+    first = reader.pages[0]
+    text = " ".join((first.extract_text() or "").split())
+    if not text:
+        # Scanned reports are a page-sized image; show that instead.
+        images = sorted(first.images, key=lambda img: len(img.data), reverse=True)
+        if images:
+            preview = _thumbnail(images[0].image, max_px)
+            preview["pages"] = len(reader.pages)
+            return preview
+    return {"kind": "text", "mimetype": "text/plain", "text": text[:max_chars], "pages": len(reader.pages)}
+
+
+def _worker_storage(settings: dict):
+    """The upload store for this pool process, opened once and reused."""
+    global _storage
+    if _storage is None:
+        _storage = open_storage(settings)
+    return _storage
+
+
+def _read_source(digest: str, settings: dict):
+    storage = _worker_storage(settings)
+    if isinstance(storage, LocalStorage):
+        return str(storage.path(digest))
+    fh = storage.open(digest)
+    if fh is None:
+        raise FileNotFoundError(f"Blob {digest} is missing from storage")
+    with fh:
+        return io.BytesIO(fh.read())
+
+
+def build_preview(digest: str, filename: str, settings: dict, max_px: int, max_chars: int) -> dict:
+    """Pool task: a downscaled JPEG for images, first-page text for PDFs.
+
+    The worker opens the blob itself from `settings` (see storage_settings),
+    so the request thread never reads the upload.
+    """
+    source = _read_source(digest, settings)
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension in IMAGE_EXTENSIONS:
+        with Image.open(source) as image:
+            return _thumbnail(image, max_px)
+    if extension == "pdf" and PdfReader is not None:
+        return _pdf_preview(source, max_px, max_chars)
+    return {"kind": None}
+
+
+def _store(db, digest: str, future):
+    try:
+        result = future.result()
+    except Exception as exc:  # unreadable or corrupt upload
+        update = {"status": "failed", "error": str(exc)[:200]}
+    else:
+        if result["kind"] is None:
+            update = {"status": "unsupported"}
+        else:
+            update = dict(result, status="ready")
+            if "data" in update:
+                update["data"] = Binary(update["data"])
+    update["finished_at"] = datetime.utcnow()
+    db.report_previews.update_one({"_id": digest}, {"$set": update})
+
+
+def queue_preview(app, digest: str | None, filename: str | None):
+    """Build the preview for an uploaded report in the background.
+
+    Previews are keyed by the blob digest, so a report uploaded twice is
+    previewed once. A preview stuck pending for PREVIEW_TIMEOUT seconds
+    (e.g. the node restarted) is queued again.
+    """
+    if not digest:
+        return
+    cfg = app.config
+    db = app.officials_db
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=cfg["PREVIEW_TIMEOUT"])
+    claimed = db.report_previews.update_one(
+        {"_id": digest, "status": "pending", "queued_at": {"$lt": stale}},
+        {"$set": {"queued_at": now}},
+    ).modified_count
+    if not claimed:
+        result = db.report_previews.update_one(
+            {"_id": digest}, {"$setOnInsert": {"status": "pending", "queued_at": now}}, upsert=True
+        )
+        if result.upserted_id is None:
+            return  # already built or being built
+
+    blob = db.blobs.find_one({"_id": digest}, {"size": 1})
+    if blob is None or blob["size"] > cfg["PREVIEW_MAX_SOURCE"]:
+        db.report_previews.update_one({"_id": digest}, {"$set": {"status": "unsupported", "finished_at": now}})
+        return
+    future = preview_pool(cfg["PREVIEW_WORKERS"]).submit(
+        build_preview, digest, filename or "", storage_settings(cfg), cfg["PREVIEW_MAX_PX"], cfg["PREVIEW_MAX_CHARS"]
+    )
+    future.add_done_callback(lambda done: _store(db, digest, done))
+
+
+def preview_url(doc: dict):
+    """Where a doctor fetches the report preview, if there is a report."""
+    if not doc.get("medical_report_blob"):
+        return None
+    return f"/doctor/medical-report/{doc['_id']}/preview"
@@ -0,0 +1,169 @@
+import base64
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from bson import ObjectId
+from config import Config
+from versions import next_seq
+
+try:
+    import base45
+    import cbor2
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+except ImportError:  # optional; QR codes fall back to the legacy JSON payload
+    cbor2 = None
+
+
+# Signed QR payloads: "AC1:" + base45(CBOR [key id, claims, Ed25519 signature]).
+# base45 stays inside the QR alphanumeric charset, and the claims carry only
+# what a checkpoint needs, so codes stay at small QR versions.
+PREFIX = "AC1:"
+STATUS_CODES = {"APPROVED": 1, "DISAPPROVED": 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+# CBOR map keys for the claims.
+SUBJECT, STATUS, AADHAR, NAME, TIER, ISSUED, EXPIRES = range(1, 8)
+
+_keys = None
+
+
+def available() -> bool:
+    return cbor2 is not None
+
+
+def is_signed(qr_text) -> bool:
+    return isinstance(qr_text, str) and qr_text.startswith(PREFIX)
+
+
+def _read_seed() -> bytes:
+    if Config.QR_SIGNING_KEY:
+        return base64.b64decode(Config.QR_SIGNING_KEY)
+    path = Path(Config.QR_SIGNING_KEY_FILE)
+    if not path.exists():
+        if not Config.QR_GENERATE_KEY:
+            raise RuntimeError("QR signing key missing: set QR_SIGNING_KEY or QR_SIGNING_KEY_FILE")
+        # First start without a configured key: create one for this install.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # another process won the race
+        else:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(os.urandom(32))
+    return path.read_bytes()
+
+
+def _key_id(public: bytes) -> bytes:
+    return hashlib.sha256(public).digest()[:4]
+
+
+def keys():
+    """(signing key, key id, {key id: public key}) for this process."""
+    global _keys
+    if _keys is None:
+        private = Ed25519PrivateKey.from_private_bytes(_read_seed())
+        public = private.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+        trusted = {_key_id(public): Ed25519PublicKey.from_public_bytes(public)}
+        # Keys retired by rotation stay trusted until their codes expire.
+        for encoded in Config.QR_TRUSTED_KEYS:
+            raw = base64.b64decode(encoded)
+            trusted[_key_id(raw)] = Ed25519PublicKey.from_public_bytes(raw)
+        _keys = (private, _key_id(public), trusted)
+    return _keys
+
+
+def public_keys() -> dict:
+    """Trusted verification keys as {hex key id: base64 raw public key}."""
+    _, _, trusted = keys()
+    return {
+        kid.hex(): base64.b64encode(key.public_bytes(Encoding.Raw, PublicFormat.Raw)).decode()
+        for kid, key in trusted.items()
+    }
+
+
+def to_millis(stamp: str | None) -> int:
+    """Epoch milliseconds of one of our naive-UTC ISO timestamps."""
+    if not stamp:
+        return 0
+    return int(datetime.fromisoformat(stamp).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def sign(subject, status: str, aadhar: str, name: str | None, issued: int, ttl_days: int, tier=None) -> str:
+    """Encode and sign a QR payload.
+
+    `issued` is taken from the record (epoch ms) rather than the clock, so the
+    same record always yields the same code and stored PDFs stay reusable.
+    """
+    private, kid, _ = keys()
+    claims = {
+        SUBJECT: ObjectId(subject).binary,
+        STATUS: STATUS_CODES[status],
+        AADHAR: aadhar,
+        NAME: name,
+        ISSUED: issued,
+        EXPIRES: issued + ttl_days * 86_400_000,
+    }
+    if tier is not None:
+        claims[TIER] = int(tier)
+    body = cbor2.dumps(claims)
+    envelope = cbor2.dumps([kid, body, private.sign(body)])
+    return PREFIX + base45.b45encode(envelope).decode()
+
+
+def verify(qr_text: str) -> dict:
+    """Check the signature and return the claims in the legacy payload's keys.
+
+    Raises ValueError for anything unreadable or not signed by a trusted key.
+    """
+    if not available():
+        raise ValueError("Signed QR codes are not supported on this server")
+    try:
+        kid, body, signature = cbor2.loads(base45.b45decode(qr_text[len(PREFIX):]))
+        _, _, trusted = keys()
+        trusted[kid].verify(signature, body)
+        claims = cbor2.loads(body)
+        return {
+            "subject": str(ObjectId(claims[SUBJECT])),
+            "status": STATUS_NAMES[claims[STATUS]],
+            "aadhar": claims[AADHAR],
+            "name": claims.get(NAME),
+            "tier": claims.get(TIER),
+            "issued": claims[ISSUED],
+            "expires": claims[EXPIRES],
+            "signed": True,
+        }
+    except InvalidSignature:
+        raise ValueError("Invalid QR code signature")
+    except (ValueError, TypeError, KeyError, cbor2.CBORDecodeError):
+        raise ValueError("Invalid QR code format")
+
+
+def expired(claims: dict) -> bool:
+    return claims["expires"] <= time.time() * 1000
+
+
+def revoke(db, subject, before_ms: int | None = None):
+    """Invalidate codes issued for `subject` before `before_ms` (default: now)."""
+    before = before_ms if before_ms is not None else int(time.time() * 1000)
+    db.qr_revocations.update_one(
+        {"_id": str(subject)}, {"$max": {"before": before}, "$set": {"seq": next_seq(db)}}, upsert=True
+    )
+
+
+def revoked(db, signed: list) -> set:
+    """(subject, issued) pairs among the verified `signed` claims that were revoked."""
+    if not signed:
+        return set()
+    cutoffs = {
+        doc["_id"]: doc["before"]
+        for doc in db.qr_revocations.find({"_id": {"$in": list({c["subject"] for c in signed})}})
+    }
+    return {
+        (c["subject"], c["issued"])
+        for c in signed
+        if c["subject"] in cutoffs and c["issued"] <= cutoffs[c["subject"]]
+    }
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+
+# Applications under review carry `claimed_by` and `claim_until`. A claim
+# whose lease has run out is simply ignored, so expired work returns to the
+# pool without a sweeper.
+
+
+def _unclaimed(now: datetime) -> dict:
+    # Matches a missing, null or expired claim_until.
+    return {"claim_until": {"$not": {"$gte": now}}}
+
+
+def reviewable_by(doctor_id, now: datetime | None = None) -> dict:
+    """Filter for applications with no live claim, or one held by `doctor_id`.
+
+    Decisions put it in their update filter, so a claim taken between reading
+    and writing an application still blocks the write.
+    """
+    now = now or datetime.utcnow()
+    return {"$or": [_unclaimed(now), {"claimed_by": doctor_id}]}
+
+
+def held(coll, doctor_id, projection: dict, now: datetime | None = None) -> list:
+    """The doctor's live claims, oldest application first."""
+    now = now or datetime.utcnow()
+    query = {"claimed_by": doctor_id, "claim_until": {"$gte": now}, "doctor_approval": "PENDING"}
+    return list(coll.find(query, projection).sort("_id", 1))
+
+
+def claim(coll, doctor_id, count: int, lease: int, projection: dict, source=None, destination=None):
+    """Top the doctor's claims up to `count` applications; (docs, lease end).
+
+    Claims already held are renewed first. New ones are taken one at a time
+    with find_one_and_update, so two doctors never receive the same
+    application. `source`/`destination` restrict new claims to a region.
+    """
+    now = datetime.utcnow()
+    until = now + timedelta(seconds=lease)
+    coll.update_many(
+        {"claimed_by": doctor_id, "claim_until": {"$gte": now}, "doctor_approval": "PENDING"},
+        {"$set": {"claim_until": until}},
+    )
+    docs = held(coll, doctor_id, projection, now)
+    query = dict(_unclaimed(now), doctor_approval="PENDING")
+    if source:
+        query["source"] = source
+    if destination:
+        query["destination"] = destination
+    while len(docs) < count:
+        doc = coll.find_one_and_update(
+            query,
+            {"$set": {"claimed_by": doctor_id, "claim_until": until}},
+            sort=[("_id", 1)],
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            break
+        docs.append(doc)
+    return docs, until
+
+
+def release(coll, doctor_id, ids=None) -> int:
+    """Hand the doctor's claims (or just `ids`) back to the pool."""
+    query = {"claimed_by": doctor_id}
+    if ids is not None:
+        query["_id"] = {"$in": ids}
+    return coll.update_many(query, {"$unset": {"claimed_by": "", "claim_until": ""}}).modified_count
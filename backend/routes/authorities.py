@@ -1,7 +1,14 @@
 import json
 from flask import Blueprint, current_app, jsonify, request, session, render_template
 from bson import ObjectId
-from models import require_role, now_iso
+from events import event_response, publish
+from versions import conditional, DISAPPROVED
+from schemas import TRAVELER_FOR_AUTHORITY
+import qr_codec
+from snapshots import build_snapshot, snapshot_version
+from checkpoint_sync import sync_events
+from pymongo.errors import DuplicateKeyError
+from models import require_role, decode_json, json_response, now_iso, page_args, paginate, page_response, stream_mode, stream_response
 
 
 authorities_bp = Blueprint("authorities", __name__)
@@ -31,99 +38,233 @@ def login():
 
 @authorities_bp.route("/disapproved-travelers", methods=["GET"])
 @require_role("authority")
+@conditional(DISAPPROVED)
 def list_disapproved():
     # Authorities only see NAME, AADHAR, and Tier
-    travelers = list(current_app.officials_db.disapproved_travelers.find({}))
-    result = []
-    for t in travelers:
-        result.append({
-            "name": t.get("name"),
-            "aadhar": t.get("aadhar"),
-            "tier": t.get("tier"),
-        })
-    return jsonify({"travelers": result})
+    try:
+        mode = stream_mode()
+        limit, after, with_total = page_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if mode:
+        return stream_response(
+            "travelers", current_app.officials_db.disapproved_travelers, {}, TRAVELER_FOR_AUTHORITY, mode
+        )
+    travelers, next_cursor, total = paginate(
+        current_app.officials_db.disapproved_travelers, {}, limit, after, with_total, TRAVELER_FOR_AUTHORITY.projection
+    )
+    return page_response("travelers", TRAVELER_FOR_AUTHORITY.dump_many(travelers), next_cursor, total)
+
+
+PENALTY_AMOUNTS = {1: 5000, 2: 10000, 3: 20000}
+
+
+def parse_qr(qr_data_str):
+    """Decode a scanned payload; raises ValueError with the message to show."""
+    if not qr_data_str:
+        raise ValueError("QR data is required")
+    if qr_codec.is_signed(qr_data_str):
+        return qr_codec.verify(qr_data_str)
+    try:
+        qr_data = decode_json(qr_data_str)
+    except (json.JSONDecodeError, TypeError):
+        raise ValueError("Invalid QR code format")
+    if not isinstance(qr_data, dict):
+        raise ValueError("Invalid QR code format")
+    if not qr_data.get("aadhar") or not isinstance(qr_data["aadhar"], str):
+        raise ValueError("Invalid QR code: Aadhar not found")
+    if qr_data.get("status") not in ("DISAPPROVED", "APPROVED"):
+        raise ValueError("Unknown status in QR code")
+    return qr_data
+
+
+def scan_verdict(qr_data: dict, traveler: dict | None, migrant: dict | None) -> dict:
+    """Verdict for a parsed QR payload given the records found for its Aadhar."""
+    aadhar = qr_data["aadhar"]
+    if qr_data["status"] == "DISAPPROVED":
+        if not traveler:
+            return {
+                "status": "DISAPPROVED",
+                "flag": "RED",
+                "name": qr_data.get("name"),
+                "aadhar": aadhar,
+                "tier": qr_data.get("tier"),
+                "message": "Traveler found in disapproved database"
+            }
+
+        # Calculate penalty based on tier
+        tier = traveler.get("tier", 1)
+        penalty = PENALTY_AMOUNTS.get(tier, 5000)
+
+        return {
+            "status": "DISAPPROVED",
+            "flag": "RED",
+            "name": traveler.get("name"),
+            "aadhar": traveler.get("aadhar"),
+            "tier": tier,
+            "penalty_amount": penalty,
+            "disease_name": traveler.get("disease_name"),
+            "message": f"⚠️ DISAPPROVED TRAVELER DETECTED - Tier {tier}"
+        }
+
+    if migrant and migrant.get("doctor_approval") == "APPROVED" and migrant.get("official_approval") == "APPROVED":
+        return {
+            "status": "APPROVED",
+            "flag": "GREEN",
+            "name": qr_data.get("name", migrant.get("name")),
+            "aadhar": aadhar,
+            "phone_number": qr_data.get("phone_number", migrant.get("email", "")),
+            "email": qr_data.get("email", migrant.get("email", "")),
+            "source": qr_data.get("source", migrant.get("source", "")),
+            "destination": qr_data.get("destination", migrant.get("destination", "")),
+            "message": "✓ APPROVED TRAVELER - Clear to travel"
+        }
+    return {
+        "status": "PENDING",
+        "flag": "YELLOW",
+        "name": qr_data.get("name"),
+        "aadhar": aadhar,
+        "message": "⚠️ Traveler status is pending approval"
+    }
+
+
+def signed_verdict(claims: dict) -> dict:
+    """Verdict for a verified, unexpired and unrevoked signed code; no lookups needed."""
+    if claims["status"] == "DISAPPROVED":
+        tier = claims.get("tier") or 1
+        return {
+            "status": "DISAPPROVED",
+            "flag": "RED",
+            "name": claims.get("name"),
+            "aadhar": claims["aadhar"],
+            "tier": tier,
+            "penalty_amount": PENALTY_AMOUNTS.get(tier, 5000),
+            "verified": "signature",
+            "message": f"⚠️ DISAPPROVED TRAVELER DETECTED - Tier {tier}"
+        }
+    return {
+        "status": "APPROVED",
+        "flag": "GREEN",
+        "name": claims.get("name"),
+        "aadhar": claims["aadhar"],
+        "verified": "signature",
+        "message": "✓ APPROVED TRAVELER - Clear to travel"
+    }
+
+
+def resolve_scans(scans: list) -> list:
+    """Verdicts for parsed payloads, in order.
+
+    Signed codes are trusted on their signature and only checked against
+    the revocation list; expired or revoked codes, and legacy JSON payloads,
+    fall back to the records (one $in lookup per collection).
+    """
+    signed = [qr for qr in scans if qr.get("signed")]
+    revoked = qr_codec.revoked(current_app.officials_db, signed)
+    stale = {}
+    live = []
+    for i, qr in enumerate(scans):
+        if not qr.get("signed"):
+            live.append(qr)
+        elif (qr["subject"], qr["issued"]) in revoked:
+            stale[i] = "revoked"
+        elif qr_codec.expired(qr):
+            stale[i] = "expired"
+    live.extend(scans[i] for i in stale)
+
+    cache = current_app.scan_cache
+    flagged = [qr["aadhar"] for qr in live if qr["status"] == "DISAPPROVED"]
+    cleared = [qr["aadhar"] for qr in live if qr["status"] == "APPROVED"]
+    travelers = cache.travelers(flagged) if flagged else {}
+    migrants = cache.migrants(cleared) if cleared else {}
+
+    verdicts = []
+    for i, qr in enumerate(scans):
+        if qr.get("signed") and i not in stale:
+            verdicts.append(signed_verdict(qr))
+            continue
+        verdict = scan_verdict(qr, travelers.get(qr["aadhar"]), migrants.get(qr["aadhar"]))
+        if i in stale:
+            verdict["token"] = stale[i]
+        verdicts.append(verdict)
+    return verdicts
 
 
 @authorities_bp.route("/scan-qr", methods=["POST"])
 @require_role("authority")
 def scan_qr():
     data = request.get_json() or {}
-    qr_data_str = data.get("qr_data")
-    
-    if not qr_data_str:
-        return jsonify({"error": "QR data is required"}), 400
-    
     try:
-        # Parse QR code data
-        qr_data = json.loads(qr_data_str)
-        status = qr_data.get("status")
-        aadhar = qr_data.get("aadhar")
-        
-        if not aadhar:
-            return jsonify({"error": "Invalid QR code: Aadhar not found"}), 400
-        
-        if status == "DISAPPROVED":
-            # Find traveler in database
-            traveler = current_app.officials_db.disapproved_travelers.find_one({"aadhar": aadhar})
-            if not traveler:
-                return jsonify({
-                    "status": "DISAPPROVED",
-                    "flag": "RED",
-                    "name": qr_data.get("name"),
-                    "aadhar": aadhar,
-                    "tier": qr_data.get("tier"),
-                    "message": "Traveler found in disapproved database"
-                })
-            
-            # Calculate penalty based on tier
-            tier = traveler.get("tier", 1)
-            penalty_amounts = {1: 5000, 2: 10000, 3: 20000}
-            penalty = penalty_amounts.get(tier, 5000)
-            
-            return jsonify({
-                "status": "DISAPPROVED",
-                "flag": "RED",
-                "name": traveler.get("name"),
-                "aadhar": traveler.get("aadhar"),
-                "tier": tier,
-                "penalty_amount": penalty,
-                "disease_name": traveler.get("disease_name"),
-                "message": f"⚠️ DISAPPROVED TRAVELER DETECTED - Tier {tier}"
-            })
-        
-        elif status == "APPROVED":
-            # Get from approved migrants or immigrants
-            migrant = current_app.immigrants_db.immigrants.find_one({"aadhar": aadhar})
-            if migrant and migrant.get("doctor_approval") == "APPROVED" and migrant.get("official_approval") == "APPROVED":
-                return jsonify({
-                    "status": "APPROVED",
-                    "flag": "GREEN",
-                    "name": qr_data.get("name", migrant.get("name")),
-                    "aadhar": aadhar,
-                    "phone_number": qr_data.get("phone_number", migrant.get("email", "")),
-                    "email": qr_data.get("email", migrant.get("email", "")),
-                    "source": qr_data.get("source", migrant.get("source", "")),
-                    "destination": qr_data.get("destination", migrant.get("destination", "")),
-                    "message": "✓ APPROVED TRAVELER - Clear to travel"
-                })
-            else:
-                return jsonify({
-                    "status": "PENDING",
-                    "flag": "YELLOW",
-                    "name": qr_data.get("name"),
-                    "aadhar": aadhar,
-                    "message": "⚠️ Traveler status is pending approval"
-                })
-        
-        else:
-            return jsonify({"error": "Unknown status in QR code"}), 400
-            
-    except json.JSONDecodeError:
-        return jsonify({"error": "Invalid QR code format"}), 400
+        qr_data = parse_qr(data.get("qr_data"))
+        return jsonify(resolve_scans([qr_data])[0])
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
     except Exception as e:
         return jsonify({"error": f"Error processing QR code: {str(e)}"}), 500
 
 
+@authorities_bp.route("/scan-qr/batch", methods=["POST"])
+@require_role("authority")
+def scan_qr_batch():
+    """Verify a burst of scans with one lookup per collection.
+
+    Takes {"qr_data": [payload, ...]} and returns {"results": [...]} in input
+    order; an unreadable payload gets an {"error": ...} entry instead of
+    failing the batch.
+    """
+    data = request.get_json() or {}
+    payloads = data.get("qr_data")
+    if not isinstance(payloads, list) or not payloads:
+        return jsonify({"error": "qr_data must be a non-empty list"}), 400
+    if len(payloads) > current_app.config["SCAN_BATCH_MAX"]:
+        return jsonify({"error": f"At most {current_app.config['SCAN_BATCH_MAX']} scans per batch"}), 400
+
+    parsed = []
+    for payload in payloads:
+        try:
+            parsed.append(parse_qr(payload))
+        except ValueError as exc:
+            parsed.append(exc)
+    verdicts = iter(resolve_scans([qr for qr in parsed if isinstance(qr, dict)]))
+    results = [{"error": str(qr)} if isinstance(qr, ValueError) else next(verdicts) for qr in parsed]
+    return json_response({"results": results})
+
+
+@authorities_bp.route("/qr-keys", methods=["GET"])
+def qr_keys():
+    """Public keys for verifying signed QR codes offline."""
+    if not qr_codec.available():
+        return jsonify({"error": "Signed QR codes are not enabled"}), 404
+    return jsonify({"format": qr_codec.PREFIX, "keys": qr_codec.public_keys()})
+
+
+@authorities_bp.route("/snapshot", methods=["GET"])
+@require_role("authority")
+def snapshot():
+    """Offline verification data; pass ?since=<version> for a delta."""
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"error": "since must be an integer version"}), 400
+    db = current_app.officials_db
+    etag = f"{snapshot_version(db)}-{since if since is not None else 'full'}-{current_app.config['SNAPSHOT_SALT']}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = json_response(build_snapshot(db, since))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@authorities_bp.route("/scan-cache", methods=["GET"])
+@require_role("authority")
+def scan_cache_stats():
+    return json_response({"scan_cache": current_app.scan_cache.snapshot()})
+
+
 @authorities_bp.route("/levy-penalty", methods=["POST"])
 @require_role("authority")
 def levy_penalty():
@@ -143,9 +284,17 @@ def levy_penalty():
         "authority_id": session.get("authority_id"),
         "levied_at": now_iso(),
     }
+    # Optional client key makes retries of the same penalty harmless.
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        penalty_record["idempotency_key"] = idempotency_key
     
     # Store in database
-    current_app.officials_db.penalties.insert_one(penalty_record)
+    try:
+        current_app.officials_db.penalties.insert_one(penalty_record)
+        publish("penalty_levied", ["authority"], aadhar=aadhar)
+    except DuplicateKeyError:
+        pass  # already recorded by an earlier attempt
     
     return jsonify({
         "message": f"Penalty of ₹{penalty_amount} levied successfully",
@@ -157,6 +306,39 @@ def levy_penalty():
     })
 
 
+@authorities_bp.route("/sync", methods=["POST"])
+@require_role("authority")
+def sync():
+    """Replay scans and penalties queued on a device while offline.
+
+    Accepts {"events": [...]} or an NDJSON body with one event per line.
+    Every event needs a client-generated `key` and a `type` of "penalty" or
+    "scan". The response has one acknowledgement per event, in input order.
+    """
+    if request.mimetype == "application/x-ndjson":
+        try:
+            events = [decode_json(line) for line in request.get_data().splitlines() if line.strip()]
+        except json.JSONDecodeError:
+            return jsonify({"error": "Invalid NDJSON body"}), 400
+    else:
+        events = (request.get_json(silent=True) or {}).get("events")
+    if not isinstance(events, list) or not events:
+        return jsonify({"error": "events must be a non-empty list"}), 400
+    if len(events) > current_app.config["SYNC_MAX_EVENTS"]:
+        return jsonify({"error": f"At most {current_app.config['SYNC_MAX_EVENTS']} events per sync"}), 400
+
+    acks, counts = sync_events(current_app.officials_db, events, session.get("authority_id"))
+    if counts["stored"]:
+        publish("events_synced", ["authority"], **counts)
+    return json_response({"results": acks, **counts})
+
+
+@authorities_bp.route("/events", methods=["GET"])
+@require_role("authority")
+def events():
+    return event_response("authority")
+
+
 @authorities_bp.route("/logout", methods=["POST"])
 @require_role("authority")
 def logout():
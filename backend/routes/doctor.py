@@ -1,12 +1,23 @@
 import uuid
-from flask import Blueprint, current_app, jsonify, request, session, send_file
+from flask import Blueprint, current_app, jsonify, request, session
 from bson import ObjectId
+from bson.errors import InvalidId
 from config import Config, allowed_file
-from models import require_role, serialize_migrant, verify_card, send_email
+from events import event_response, publish
+from versions import bump, next_seq, conditional, PENDING_REVIEW, DOCTOR_APPROVED, DISAPPROVED
+from schemas import MIGRANT_FOR_DOCTOR
+from models import require_role, verify_card, send_email, page_args, paginate, page_response
+from blobs import send_upload
+from documents import withdraw_clearance
+from previews import queue_preview
+from review_queue import claim, held, release, reviewable_by
+from doctor_decisions import apply_decisions, traveler_record, rejection_body, REJECTION_SUBJECT
 
 
 doctor_bp = Blueprint("doctor", __name__)
 
+SEARCH_MODES = ("prefix", "last4")
+
 
 @doctor_bp.route("/login", methods=["POST"])
 def login():
@@ -37,25 +48,74 @@ def login():
 
 @doctor_bp.route("/migrants", methods=["GET"])
 @require_role("doctor")
+@conditional(PENDING_REVIEW)
 def list_migrants():
     aadhar_search = request.args.get("aadhar", "").strip()
+    mode = request.args.get("mode", "prefix")
+    if mode not in SEARCH_MODES:
+        return jsonify({"error": "mode must be prefix or last4"}), 400
     query = {}
+    key = None
     if aadhar_search:
-        query["aadhar"] = {"$regex": aadhar_search, "$options": "i"}
-    # Only show PENDING applications
+        if not aadhar_search.isdigit() or len(aadhar_search) > 12:
+            return jsonify({"error": "Aadhar search accepts up to 12 digits"}), 400
+        if mode == "last4":
+            if len(aadhar_search) != 4:
+                return jsonify({"error": "Last-4 search needs exactly 4 digits"}), 400
+            query["aadhar_last4"] = aadhar_search
+        else:
+            # Anchored prefix as an index range: "1234" -> ["1234", "1235"),
+            # paged in (aadhar, _id) order so the index returns rows in order.
+            upper = aadhar_search[:-1] + chr(ord(aadhar_search[-1]) + 1)
+            query["aadhar"] = aadhar_search if len(aadhar_search) == 12 else {"$gte": aadhar_search, "$lt": upper}
+            key = "aadhar"
+    # Only show PENDING applications that another doctor is not reviewing
     query["doctor_approval"] = "PENDING"
-    docs = current_app.immigrants_db.immigrants.find(query)
-    migrants = [serialize_migrant(doc, include_sensitive=True) for doc in docs]
-    return jsonify({"migrants": migrants})
+    query.update(reviewable_by(session.get("doctor_id")))
+    try:
+        limit, after, with_total = page_args(keyed=key is not None)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    docs, next_cursor, total = paginate(
+        current_app.immigrants_db.immigrants, query, limit, after, with_total, MIGRANT_FOR_DOCTOR.projection, key
+    )
+    return page_response("migrants", MIGRANT_FOR_DOCTOR.dump_many(docs), next_cursor, total)
 
 
 @doctor_bp.route("/medical-report/<migrant_id>", methods=["GET"])
 @require_role("doctor")
 def download_report(migrant_id):
     doc = current_app.immigrants_db.immigrants.find_one({"_id": ObjectId(migrant_id)})
-    if not doc or not doc.get("medical_report_path"):
+    response = send_upload(doc, "medical_report") if doc else None
+    if response is None:
+        return jsonify({"error": "Report not found"}), 404
+    return response
+
+
+@doctor_bp.route("/medical-report/<migrant_id>/preview", methods=["GET"])
+@require_role("doctor")
+def report_preview(migrant_id):
+    """Thumbnail (image/jpeg) or first-page text (text/plain) of the report."""
+    doc = current_app.immigrants_db.immigrants.find_one(
+        {"_id": ObjectId(migrant_id)}, {"medical_report_blob": 1, "medical_report_name": 1}
+    )
+    digest = doc.get("medical_report_blob") if doc else None
+    if not digest:
         return jsonify({"error": "Report not found"}), 404
-    return send_file(doc["medical_report_path"], as_attachment=True)
+    preview = current_app.officials_db.report_previews.find_one({"_id": digest})
+    if preview is None or preview["status"] == "pending":
+        # Reports stored before previews existed are queued on first view.
+        queue_preview(current_app._get_current_object(), digest, doc.get("medical_report_name"))
+        return jsonify({"status": "pending"}), 202
+    if preview["status"] != "ready":
+        return jsonify({"status": preview["status"]}), 404
+    body = preview["data"] if preview["kind"] == "image" else preview["text"]
+    response = current_app.response_class(body, mimetype=preview["mimetype"])
+    # The preview belongs to the report's content, so the digest validates it.
+    response.set_etag(f"{digest}-preview")
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @doctor_bp.route("/decision/<migrant_id>", methods=["POST"])
@@ -69,43 +129,124 @@ def decide(migrant_id):
     doc = current_app.immigrants_db.immigrants.find_one({"_id": ObjectId(migrant_id)})
     if not doc:
         return jsonify({"error": "Migrant not found"}), 404
-    current_app.immigrants_db.immigrants.update_one(
-        {"_id": ObjectId(migrant_id)},
-        {"$set": {"doctor_approval": decision, "doctor_id": session.get("doctor_id")}},
+    written = current_app.immigrants_db.immigrants.update_one(
+        dict(reviewable_by(session.get("doctor_id")), _id=doc["_id"]),
+        {
+            "$set": {"doctor_approval": decision, "doctor_id": session.get("doctor_id")},
+            "$unset": {"claimed_by": "", "claim_until": "", "health_warning_id": ""},
+        },
     )
+    if written.matched_count == 0:
+        return jsonify({"error": "Application is being reviewed by another doctor"}), 409
+    # Overturning an approval changes the official's list and scan verdicts too.
+    approved = decision == "APPROVED" or doc.get("doctor_approval") == "APPROVED"
+    roles = ["doctor", "official", "migrant"] if approved else ["doctor", "migrant"]
+    scopes = [PENDING_REVIEW, DOCTOR_APPROVED] if approved else [PENDING_REVIEW]
     if decision == "REJECTED":
+        if doc.get("official_approval") == "APPROVED":
+            withdraw_clearance(current_app.immigrants_db.immigrants, current_app.officials_db, doc)
         # Check if health form data is provided
         health_data = data.get("health_data")
         if health_data:
             # Save health information for disapproved traveler
-            from models import now_iso
-            health_info = {
-                "migrant_id": str(doc["_id"]),
-                "name": health_data.get("name", doc.get("name")),
-                "age": health_data.get("age"),
-                "current_address": health_data.get("current_address"),
-                "email": health_data.get("email", doc.get("email")),
-                "phone_number": health_data.get("phone_number"),
-                "aadhar": doc.get("aadhar"),
-                "disease_name": health_data.get("disease_name"),
-                "tier": int(health_data.get("tier", 1)),
-                "expected_recovery_date": health_data.get("expected_recovery_date"),
-                "doctor_id": session.get("doctor_id"),
-                "created_at": now_iso(),
-                "qr_generated": False,
-            }
+            health_info = traveler_record(doc, health_data, session.get("doctor_id"), next_seq(current_app.officials_db))
             current_app.officials_db.disapproved_travelers.insert_one(health_info)
+            roles.extend(["health_admin", "authority"])
+            scopes.append(DISAPPROVED)
         
-        body = (
-            f"Dear {doc.get('name')},\n\n"
-            "Your application has been rejected by the medical reviewer.\n"
-            "Reason: medical fitness not approved.\n\n"
-            "Regards,\nAarogya Check"
-        )
-        send_email(doc.get("email"), "Aarogya Check - Doctor Rejection", body)
+        send_email(doc.get("email"), REJECTION_SUBJECT, rejection_body(doc))
+    bump(*scopes)
+    publish("doctor_decision", roles, migrant_id, decision=decision)
     return jsonify({"message": f"Migrant {decision.lower()}"})
 
 
+@doctor_bp.route("/decisions", methods=["POST"])
+@require_role("doctor")
+def decide_batch():
+    """Apply many decisions at once.
+
+    Takes {"decisions": [{migrant_id, decision, health_data?}, ...]} and
+    returns {"results": [...]} in input order; a bad item gets an
+    {"status": "error"} entry instead of failing the batch.
+    """
+    data = request.get_json() or {}
+    items = data.get("decisions")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "decisions must be a non-empty list"}), 400
+    if len(items) > current_app.config["DECISION_BATCH_MAX"]:
+        return jsonify({"error": f"At most {current_app.config['DECISION_BATCH_MAX']} decisions per batch"}), 400
+    results = apply_decisions(current_app._get_current_object(), items, session.get("doctor_id"))
+    failed = sum(1 for r in results if r["status"] == "error")
+    return jsonify({"results": results, "applied": len(results) - failed, "failed": failed})
+
+
+def _queue_response(docs, until=None):
+    body = {"migrants": MIGRANT_FOR_DOCTOR.dump_many(docs)}
+    if until is not None:
+        body["lease_expires_at"] = until.isoformat()
+    return jsonify(body)
+
+
+@doctor_bp.route("/queue", methods=["GET"])
+@require_role("doctor")
+def queue():
+    """Applications this doctor currently holds a review claim on."""
+    projection = dict(MIGRANT_FOR_DOCTOR.projection, claim_until=1)
+    docs = held(current_app.immigrants_db.immigrants, session.get("doctor_id"), projection)
+    return _queue_response(docs, min((doc["claim_until"] for doc in docs), default=None))
+
+
+@doctor_bp.route("/queue/claim", methods=["POST"])
+@require_role("doctor")
+def claim_work():
+    """Claim up to `count` pending applications for review.
+
+    Takes {"count": n, "source": ..., "destination": ...}; claims already
+    held count towards n and have their lease renewed. Leases run for
+    REVIEW_LEASE seconds, after which unreviewed applications return to the
+    pool.
+    """
+    data = request.get_json(silent=True) or {}
+    cfg = current_app.config
+    try:
+        count = int(data.get("count", cfg["QUEUE_CLAIM_DEFAULT"]))
+    except (TypeError, ValueError):
+        return jsonify({"error": "count must be an integer"}), 400
+    if not 1 <= count <= cfg["QUEUE_CLAIM_MAX"]:
+        return jsonify({"error": f"count must be between 1 and {cfg['QUEUE_CLAIM_MAX']}"}), 400
+    docs, until = claim(
+        current_app.immigrants_db.immigrants,
+        session.get("doctor_id"),
+        count,
+        cfg["REVIEW_LEASE"],
+        MIGRANT_FOR_DOCTOR.projection,
+        source=data.get("source") or None,
+        destination=data.get("destination") or None,
+    )
+    return _queue_response(docs, until)
+
+
+@doctor_bp.route("/queue/release", methods=["POST"])
+@require_role("doctor")
+def release_work():
+    """Return claims to the pool: all of them, or {"migrant_ids": [...]}."""
+    data = request.get_json(silent=True) or {}
+    ids = data.get("migrant_ids")
+    if ids is not None:
+        try:
+            ids = [ObjectId(i) for i in ids]
+        except (InvalidId, TypeError):
+            return jsonify({"error": "migrant_ids must be a list of ids"}), 400
+    released = release(current_app.immigrants_db.immigrants, session.get("doctor_id"), ids)
+    return jsonify({"released": released})
+
+
+@doctor_bp.route("/events", methods=["GET"])
+@require_role("doctor")
+def events():
+    return event_response("doctor")
+
+
 @doctor_bp.route("/logout", methods=["POST"])
 @require_role("doctor")
 def logout():
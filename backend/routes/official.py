@@ -1,8 +1,15 @@
-import uuid
-from flask import Blueprint, current_app, jsonify, request, session, send_file
+from flask import Blueprint, current_app, jsonify, request, session
 from bson import ObjectId
 from config import Config, allowed_file
-from models import require_role, serialize_migrant, send_email, now_iso, verify_card
+from outbox import queue_depth
+from documents import clearance_document, track_document, withdraw_clearance
+from blobs import store_upload, send_upload
+from official_approvals import approve_many, save_approvals, drop_approval, approval_body, APPROVAL_SUBJECT
+from intake import import_applications, read_rows
+from events import event_response, publish
+from versions import bump, conditional, DOCTOR_APPROVED
+from schemas import MIGRANT_FOR_OFFICIAL
+from models import require_role, send_email, now_iso, verify_card, page_args, paginate, page_response
 
 
 official_bp = Blueprint("official", __name__)
@@ -55,14 +62,21 @@ def create_doctor():
 
 @official_bp.route("/migrants", methods=["GET"])
 @require_role("official")
+@conditional(DOCTOR_APPROVED)
 def list_migrants():
-    docs = current_app.immigrants_db.immigrants.find({"doctor_approval": "APPROVED"})
-    sanitized = []
-    for doc in docs:
-        dto = serialize_migrant(doc, include_sensitive=False)
-        dto.pop("doctor_id", None)  # officials do not need doctor details
-        sanitized.append(dto)
-    return jsonify({"migrants": sanitized})
+    try:
+        limit, after, with_total = page_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    docs, next_cursor, total = paginate(
+        current_app.immigrants_db.immigrants,
+        {"doctor_approval": "APPROVED"},
+        limit,
+        after,
+        with_total,
+        MIGRANT_FOR_OFFICIAL.projection,
+    )
+    return page_response("migrants", MIGRANT_FOR_OFFICIAL.dump_many(docs), next_cursor, total)
 
 
 @official_bp.route("/decision/<migrant_id>", methods=["POST"])
@@ -79,46 +93,51 @@ def decide(migrant_id):
     if doc.get("doctor_approval") != "APPROVED":
         return jsonify({"error": "Doctor approval pending"}), 400
 
-    letter_path = None
     if decision == "APPROVED":
         if "approval_letter" not in request.files:
             return jsonify({"error": "Approval letter file required for approval"}), 400
         letter_file = request.files["approval_letter"]
         if letter_file.filename == "" or not allowed_file(letter_file.filename, Config.ALLOWED_LETTER_EXTENSIONS):
             return jsonify({"error": "Invalid approval letter format"}), 400
-        filename = f"{uuid.uuid4().hex}_{letter_file.filename}"
-        letter_path = f"{Config.APPROVAL_LETTER_FOLDER}/{filename}"
-        letter_file.save(letter_path)
-
-        current_app.officials_db.approved_migrants.insert_one(
-            {
-                "migrant_id": str(doc["_id"]),
-                "name": doc.get("name"),
-                "aadhar": doc.get("aadhar"),
-                "source": doc.get("source"),
-                "destination": doc.get("destination"),
-                "medium_of_travel": doc.get("medium_of_travel"),
-                "official_id": session.get("official_id"),
-                "approval_letter_path": letter_path,
-                "approved_at": now_iso(),
-            }
-        )
+        letter_blob = store_upload(letter_file)
+        letter_name = letter_file.filename
+
+        record = {
+            "migrant_id": str(doc["_id"]),
+            "name": doc.get("name"),
+            "aadhar": doc.get("aadhar"),
+            "source": doc.get("source"),
+            "destination": doc.get("destination"),
+            "medium_of_travel": doc.get("medium_of_travel"),
+            "official_id": session.get("official_id"),
+            "approval_letter_blob": letter_blob,
+            "approval_letter_name": letter_name,
+            "approved_at": now_iso(),
+        }
+        # A re-approval replaces the earlier letter rather than adding one.
+        save_approvals(current_app.officials_db, [record])
 
+    decided_at = now_iso()
     current_app.immigrants_db.immigrants.update_one(
         {"_id": ObjectId(migrant_id)},
-        {"$set": {"official_approval": decision}},
+        {"$set": {"official_approval": decision, "official_decided_at": decided_at}},
     )
+    doc.update(official_approval=decision, official_decided_at=decided_at)
+    if decision == "APPROVED":
+        # Render the clearance now so the migrant's download is a store hit.
+        key, _, _ = clearance_document(doc)
+        track_document(current_app.immigrants_db.immigrants, doc, "clearance_document", key)
+    else:
+        withdraw_clearance(current_app.immigrants_db.immigrants, current_app.officials_db, doc)
+        drop_approval(current_app.officials_db, str(doc["_id"]))
 
     if decision == "APPROVED":
-        body = (
-            f"Dear {doc.get('name')},\n\n"
-            "Your travel clearance has been approved by a Government Official.\n"
-            f"Issued by Official ID: {session.get('official_id')}\n\n"
-            "You can download your clearance PDF from the migrant dashboard.\n"
-            "Your official approval letter is attached with this email.\n\n"
-            "Regards,\nAarogya Check (Government Mailbox)"
+        send_email(
+            doc.get("email"),
+            APPROVAL_SUBJECT,
+            approval_body(doc, session.get("official_id")),
+            attachment=(letter_name, {"blob": letter_blob}),
         )
-        send_email(doc.get("email"), "Aarogya Check Approval Letter", body, letter_path)
     else:
         body = (
             f"Dear {doc.get('name')},\n\n"
@@ -128,16 +147,82 @@ def decide(migrant_id):
         )
         send_email(doc.get("email"), "Aarogya Check - Official Rejection", body)
 
+    bump(DOCTOR_APPROVED)
+    publish("official_decision", ["official", "migrant"], migrant_id, decision=decision)
     return jsonify({"message": f"Migrant {decision.lower()}"})
 
 
+@official_bp.route("/decisions", methods=["POST"])
+@require_role("official")
+def approve_batch():
+    """Approve many doctor-approved migrants in one request.
+
+    JSON {"migrant_ids": [...], "remarks": "..."} generates every approval
+    letter from the server template. Multipart requests may repeat
+    `migrant_ids` and attach `letter_<migrant_id>` files; migrants without
+    an uploaded letter get a generated one. Returns per-item results.
+    """
+    if request.is_json:
+        data = request.get_json() or {}
+        migrant_ids, remarks, letters = data.get("migrant_ids"), data.get("remarks") or "", {}
+    else:
+        migrant_ids = request.form.getlist("migrant_ids")
+        remarks = request.form.get("remarks") or ""
+        letters = {
+            name[len("letter_"):]: upload
+            for name, upload in request.files.items()
+            if name.startswith("letter_") and upload.filename
+        }
+    if not isinstance(migrant_ids, list) or not migrant_ids:
+        return jsonify({"error": "migrant_ids must be a non-empty list"}), 400
+    if len(migrant_ids) > current_app.config["DECISION_BATCH_MAX"]:
+        return jsonify({"error": f"At most {current_app.config['DECISION_BATCH_MAX']} approvals per batch"}), 400
+    if not isinstance(remarks, str) or len(remarks) > 200:
+        return jsonify({"error": "remarks must be a string of at most 200 characters"}), 400
+    results = approve_many(current_app._get_current_object(), migrant_ids, session.get("official_id"), letters, remarks)
+    failed = sum(1 for r in results if r["status"] == "error")
+    return jsonify({"results": results, "applied": len(results) - failed, "failed": failed})
+
+
+@official_bp.route("/applications/import", methods=["POST"])
+@require_role("official")
+def import_batch():
+    """Register applications in bulk from a CSV or NDJSON upload (`file`).
+
+    Rows are validated like /migrant/apply and upserted on (email, aadhar);
+    returns inserted/updated counts and the errors of rejected rows.
+    """
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "Import file required"}), 400
+    try:
+        rows = read_rows(upload.stream, upload.filename)
+        summary = import_applications(current_app._get_current_object(), rows)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(summary)
+
+
 @official_bp.route("/approval-letter/<migrant_id>", methods=["GET"])
 @require_role("official")
 def download_letter(migrant_id):
     record = current_app.officials_db.approved_migrants.find_one({"migrant_id": migrant_id})
-    if not record or not record.get("approval_letter_path"):
+    response = send_upload(record, "approval_letter") if record else None
+    if response is None:
         return jsonify({"error": "Approval letter not found"}), 404
-    return send_file(record["approval_letter_path"], as_attachment=True)
+    return response
+
+
+@official_bp.route("/outbox", methods=["GET"])
+@require_role("official")
+def outbox_status():
+    return jsonify({"outbox": queue_depth(current_app.officials_db)})
+
+
+@official_bp.route("/events", methods=["GET"])
+@require_role("official")
+def events():
+    return event_response("official")
 
 
 @official_bp.route("/logout", methods=["POST"])
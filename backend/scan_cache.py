@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from versions import versions, DOCTOR_APPROVED, DISAPPROVED
+
+
+# Any write that can change a scan verdict bumps one of these: doctor and
+# official decisions touching an approval, resubmissions, and new disapproved
+# travelers. New pending applications do not; an unknown Aadhar and a pending
+# one get the same verdict. Disapproved-traveler data only depends on
+# DISAPPROVED, so approvals never force the Aadhar set to reload.
+SCOPES = (DOCTOR_APPROVED, DISAPPROVED)
+
+TRAVELER_FIELDS = {"_id": 0, "name": 1, "aadhar": 1, "tier": 1, "disease_name": 1}
+MIGRANT_FIELDS = {"_id": 0, "name": 1, "email": 1, "source": 1, "destination": 1, "doctor_approval": 1, "official_approval": 1}
+
+
+class VerificationCache:
+    """In-memory lookups behind checkpoint QR verification.
+
+    Holds the set of disapproved Aadhar numbers, so scans of anyone not in it
+    skip the traveler lookup, and an LRU of the records fetched for recent
+    scans. Both are tagged with the scope versions they were read under and
+    dropped as soon as a write bumps one of them (see versions.py), so other
+    app processes pick up changes within VERSION_CACHE_TTL. Traveler data is
+    tagged with the DISAPPROVED version only, application records with both.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._records = OrderedDict()  # (kind, aadhar) -> (generation, record or None)
+        self._disapproved = (None, frozenset())
+        self.stats = {"hits": 0, "misses": 0, "set_hits": 0, "reloads": 0}
+
+    def _generation(self, scopes=SCOPES):
+        return tuple(versions(scopes))
+
+    def disapproved_aadhars(self, generation) -> tuple:
+        """(Aadhar set for `generation`, whether this call had to load it).
+
+        The load runs under the lock, so concurrent scans after a bump wait
+        for one reload instead of each reading the whole collection.
+        """
+        with self._lock:
+            loaded_for, aadhars = self._disapproved
+            if loaded_for == generation:
+                return aadhars, False
+            # A projected cursor, not distinct(), which fails past 16MB of results.
+            cursor = current_app.officials_db.disapproved_travelers.find({}, {"_id": 0, "aadhar": 1})
+            aadhars = frozenset(doc["aadhar"] for doc in cursor if doc.get("aadhar"))
+            self._disapproved = (generation, aadhars)
+            self.stats["reloads"] += 1
+        return aadhars, True
+
+    def _get(self, key, generation):
+        with self._lock:
+            entry = self._records.get(key)
+            if entry is not None and entry[0] == generation:
+                self._records.move_to_end(key)
+                self.stats["hits"] += 1
+                return True, entry[1]
+            self.stats["misses"] += 1
+        return False, None
+
+    def _put(self, key, generation, record):
+        with self._lock:
+            self._records[key] = (generation, record)
+            self._records.move_to_end(key)
+            while len(self._records) > self.size:
+                self._records.popitem(last=False)
+
+    def _lookup(self, kind, collection, fields, aadhars, generation, result):
+        """Fill `result` for `aadhars` from the LRU, fetching misses with one $in."""
+        wanted = []
+        for aadhar in aadhars:
+            found, record = self._get((kind, aadhar), generation)
+            if found:
+                result[aadhar] = record
+            else:
+                wanted.append(aadhar)
+        if not wanted:
+            return result
+        fetched = {}
+        for doc in collection.find({"aadhar": {"$in": wanted}}, dict(fields, aadhar=1)):
+            fetched.setdefault(doc["aadhar"], doc)  # first match, as find_one would
+        for aadhar in wanted:
+            record = fetched.get(aadhar)
+            self._put((kind, aadhar), generation, record)
+            result[aadhar] = record
+        return result
+
+    def travelers(self, aadhars) -> dict:
+        """Disapproved-traveler records by Aadhar; None where there is none."""
+        generation = self._generation((DISAPPROVED,))
+        known, reloaded = self.disapproved_aadhars(generation)
+        result = {}
+        listed = []
+        for aadhar in set(aadhars):
+            if aadhar in known:
+                listed.append(aadhar)
+            else:
+                result[aadhar] = None
+        with self._lock:
+            # Answers from a set loaded for this very call cost a full read.
+            self.stats["misses" if reloaded else "set_hits"] += len(result)
+        db = current_app.officials_db
+        return self._lookup("traveler", db.disapproved_travelers, TRAVELER_FIELDS, listed, generation, result)
+
+    def migrants(self, aadhars) -> dict:
+        """Application records by Aadhar; None where there is none."""
+        generation = self._generation()
+        db = current_app.immigrants_db
+        return self._lookup("migrant", db.immigrants, MIGRANT_FIELDS, set(aadhars), generation, {})
+
+    def traveler(self, aadhar: str):
+        return self.travelers([aadhar])[aadhar]
+
+    def migrant(self, aadhar: str):
+        return self.migrants([aadhar])[aadhar]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._records), disapproved=len(self._disapproved[1]))
+        lookups = stats["hits"] + stats["misses"] + stats["set_hits"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["set_hits"]) / lookups, 4) if lookups else None
+        return stats
@@ -0,0 +1,110 @@
+from functools import cached_property
+from previews import preview_url
+
+
+class Computed:
+    """Field source derived from other fields of the record."""
+
+    def __init__(self, func, *requires):
+        self.func = func
+        self.requires = requires
+
+
+class Schema:
+    """Declarative response shape for one role's view of a record.
+
+    Fields are output names, or (name, source, default) tuples where the
+    source is a field name or a Computed; "id" maps to the stringified
+    `_id`. The schema doubles as a Mongo projection so fields a role may not
+    see are never fetched.
+    """
+
+    def __init__(self, *fields):
+        self.fields = tuple((f, f, None) if isinstance(f, str) else f for f in fields)
+
+    @cached_property
+    def projection(self) -> dict:
+        # _id is always fetched: keyset pagination needs it for the cursor.
+        projection = {"_id": 1}
+        for name, source, _ in self.fields:
+            if isinstance(source, Computed):
+                projection.update(dict.fromkeys(source.requires, 1))
+            elif name != "id":
+                projection[source] = 1
+        return projection
+
+    def dump(self, doc: dict | None):
+        if not doc:
+            return None
+        out = {}
+        for name, source, default in self.fields:
+            if name == "id":
+                out[name] = str(doc["_id"])
+            elif isinstance(source, Computed):
+                out[name] = source.func(doc)
+            else:
+                out[name] = doc.get(source, default)
+        return out
+
+    def dump_many(self, docs) -> list:
+        return [self.dump(doc) for doc in docs]
+
+    def extend(self, *fields):
+        return Schema(*self.fields, *fields)
+
+    def without(self, *names):
+        return Schema(*(f for f in self.fields if f[0] not in names))
+
+
+MIGRANT = Schema(
+    "id",
+    "name",
+    "aadhar",
+    "source",
+    "destination",
+    "medium_of_travel",
+    "email",
+    "doctor_approval",
+    "official_approval",
+    "created_at",
+    "doctor_id",
+)
+
+
+def _health_warning_id(doc: dict):
+    # A later doctor decision supersedes the warning of an earlier rejection.
+    return doc.get("health_warning_id") if doc.get("doctor_approval") == "REJECTED" else None
+
+
+# What a migrant's status poll needs, in one projected read of the
+# application: `health_warning_id` is denormalized from disapproved_travelers
+# when the warning letter is issued.
+MIGRANT_STATUS = MIGRANT.extend(
+    ("has_health_warning", Computed(lambda doc: bool(_health_warning_id(doc)), "doctor_approval", "health_warning_id"), False),
+    ("health_warning_id", Computed(_health_warning_id, "doctor_approval", "health_warning_id"), None),
+)
+# Doctors review the medical report, triaging from its preview.
+MIGRANT_FOR_DOCTOR = MIGRANT.extend(
+    "medical_report_name", ("preview_url", Computed(preview_url, "medical_report_blob"), None)
+)
+# Officials do not need doctor details.
+MIGRANT_FOR_OFFICIAL = MIGRANT.without("doctor_id")
+
+TRAVELER_FOR_HEALTH_ADMIN = Schema("id", "name", "aadhar", "tier", "disease_name", ("qr_generated", "qr_generated", False))
+TRAVELER_DETAIL = Schema(
+    "id",
+    "name",
+    "age",
+    "current_address",
+    "email",
+    "phone_number",
+    "aadhar",
+    "disease_name",
+    "tier",
+    "expected_recovery_date",
+    "doctor_id",
+    "created_at",
+    ("qr_generated", "qr_generated", False),
+)
+# Authorities only see NAME, AADHAR, and Tier.
+TRAVELER_FOR_AUTHORITY = Schema("name", "aadhar", "tier")
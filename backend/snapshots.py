@@ -0,0 +1,55 @@
+import hashlib
+from config import Config
+from versions import SNAPSHOT_SEQ
+import qr_codec
+
+
+HASH_SCHEME = "sha256-128"  # first 16 bytes of sha256(salt + ":" + aadhar), hex
+
+
+def aadhar_hash(aadhar: str, salt: str) -> str:
+    return hashlib.sha256(f"{salt}:{aadhar}".encode()).digest()[:16].hex()
+
+
+def snapshot_version(db) -> int:
+    doc = db.collection_versions.find_one({"_id": SNAPSHOT_SEQ})
+    return doc["v"] if doc else 0
+
+
+def build_snapshot(db, since: int | None = None) -> dict:
+    """Verdict data a checkpoint device needs to verify scans offline.
+
+    `disapproved` is a sorted [hash, tier] array (highest tier per Aadhar),
+    `revoked` lists [subject, issued-before ms] for signed QR codes. With
+    `since`, only records stamped after that version are included; devices
+    merge them into the copy they hold and store the returned version.
+    """
+    version = snapshot_version(db)
+    if since is not None and since > version:
+        since = None  # the counter was reset; the device must start over
+    seq_filter = {} if since is None else {"seq": {"$gt": since}}
+    salt = Config.SNAPSHOT_SALT
+
+    tiers = {}
+    for doc in db.disapproved_travelers.find(seq_filter, {"_id": 0, "aadhar": 1, "tier": 1}):
+        if not doc.get("aadhar"):
+            continue
+        digest = aadhar_hash(doc["aadhar"], salt)
+        tiers[digest] = max(tiers.get(digest, 0), doc.get("tier") or 1)
+    revoked = sorted(
+        [doc["_id"], doc["before"]] for doc in db.qr_revocations.find(seq_filter, {"before": 1})
+    )
+
+    snapshot = {
+        "version": version,
+        "full": since is None,
+        "salt": salt,
+        "hash": HASH_SCHEME,
+        "disapproved": [[digest, tier] for digest, tier in sorted(tiers.items())],
+        "revoked": revoked,
+    }
+    if since is not None:
+        snapshot["since"] = since
+    elif qr_codec.available():
+        snapshot["keys"] = qr_codec.public_keys()
+    return snapshot
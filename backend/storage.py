@@ -0,0 +1,247 @@
+import io
+import os
+import shutil
+from pathlib import Path
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # optional; only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+from gridfs import GridFSBucket
+from gridfs.errors import NoFile
+from config import get_mongo_client
+
+
+CHUNK_SIZE = 256 * 1024
+
+
+class LocalStorage:
+    """Files under a local (or shared network) directory."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def put_file(self, key: str, source: str):
+        """Move the finished file at `source` into place."""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(source, path)
+        except OSError:  # temp folder on another filesystem
+            shutil.move(source, path)
+
+    def open(self, key: str):
+        """A seekable binary file, or None if `key` is not stored."""
+        try:
+            return open(self.path(key), "rb")
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str):
+        self.path(key).unlink(missing_ok=True)
+
+
+class GridFSStorage:
+    """Files in a GridFS bucket, named by key, shared by every app node.
+
+    Each upload gets its own file _id, so two nodes storing the same new
+    key never collide on the chunks; the oldest complete copy wins and the
+    others are deleted.
+    """
+
+    def __init__(self, db, bucket: str):
+        self.db = db
+        self.bucket = GridFSBucket(db, bucket_name=bucket, chunk_size_bytes=CHUNK_SIZE)
+        self.files = db[f"{bucket}.files"]
+
+    def _copies(self, key: str) -> list:
+        return [doc["_id"] for doc in self.files.find({"filename": key}, {"_id": 1}).sort([("uploadDate", 1), ("_id", 1)])]
+
+    def exists(self, key: str) -> bool:
+        return self.files.count_documents({"filename": key}, limit=1) > 0
+
+    def put_file(self, key: str, source: str):
+        if not self.exists(key):
+            # A failed upload removes its own chunks (GridIn.abort).
+            with open(source, "rb") as fh:
+                file_id = self.bucket.upload_from_stream(key, fh)
+            copies = self._copies(key)
+            if copies[0] != file_id:
+                # Another node stored the same content first; keep theirs.
+                self.bucket.delete(file_id)
+        os.remove(source)
+
+    def open(self, key: str):
+        """A GridOut, which is seekable and reads one chunk at a time."""
+        try:
+            return self.bucket.open_download_stream_by_name(key, revision=0)
+        except NoFile:
+            return None
+
+    def delete(self, key: str):
+        for file_id in self._copies(key):
+            try:
+                self.bucket.delete(file_id)
+            except NoFile:
+                pass
+
+
+def _missing(exc) -> bool:
+    return exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+class S3Reader(io.RawIOBase):
+    """Seekable reader over an S3 object.
+
+    The object is fetched with a ranged GET from the current position on the
+    first read after a seek, so serving a byte range never downloads the part
+    of the object before it.
+    """
+
+    def __init__(self, client, bucket: str, key: str, size: int):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self._pos = 0
+        self._body = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset != self._pos:
+            self._drop_body()
+            self._pos = max(offset, 0)
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self.size:
+            return 0
+        if self._body is None:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={self._pos}-")
+            self._body = obj["Body"]
+        data = self._body.read(len(buffer))
+        buffer[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def _drop_body(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+    def close(self):
+        self._drop_body()
+        super().close()
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket (AWS S3, MinIO, ...)."""
+
+    def __init__(self, cfg):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3")
+        self.bucket = cfg["S3_BUCKET"]
+        self.prefix = cfg["S3_PREFIX"]
+        # Unset credentials fall through to boto3's usual lookup chain.
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=cfg["S3_ENDPOINT_URL"] or None,
+            region_name=cfg["S3_REGION"] or None,
+            aws_access_key_id=cfg["S3_ACCESS_KEY_ID"] or None,
+            aws_secret_access_key=cfg["S3_SECRET_ACCESS_KEY"] or None,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key[:2]}/{key}"
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as exc:
+            if _missing(exc):
+                return False
+            raise
+        return True
+
+    def put_file(self, key: str, source: str):
+        # upload_file switches to a streamed multipart upload for large files.
+        self.client.upload_file(source, self.bucket, self._key(key))
+        os.remove(source)
+
+    def open(self, key: str):
+        """An S3Reader; reads stream straight off the socket."""
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as exc:
+            if _missing(exc):
+                return None
+            raise
+        return S3Reader(self.client, self.bucket, self._key(key), head["ContentLength"])
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+# Everything a pool process needs to open the upload store on its own.
+STORAGE_SETTINGS = (
+    "STORAGE_BACKEND",
+    "BLOB_FOLDER",
+    "MONGO_URI",
+    "OFFICIALS_DB_NAME",
+    "GRIDFS_BUCKET",
+    "S3_BUCKET",
+    "S3_PREFIX",
+    "S3_ENDPOINT_URL",
+    "S3_REGION",
+    "S3_ACCESS_KEY_ID",
+    "S3_SECRET_ACCESS_KEY",
+)
+
+
+def storage_settings(cfg) -> dict:
+    """The picklable subset of config that open_storage() needs."""
+    return {name: cfg[name] for name in STORAGE_SETTINGS}
+
+
+def open_storage(settings, db=None):
+    """The upload store selected by STORAGE_BACKEND (local, gridfs or s3).
+
+    `db` is the officials database for gridfs; without one (e.g. in a pool
+    process) a client is opened from MONGO_URI.
+    """
+    backend = settings["STORAGE_BACKEND"]
+    if backend == "local":
+        return LocalStorage(settings["BLOB_FOLDER"])
+    if backend == "gridfs":
+        if db is None:
+            db = get_mongo_client(settings["MONGO_URI"])[settings["OFFICIALS_DB_NAME"]]
+        return GridFSStorage(db, settings["GRIDFS_BUCKET"])
+    if backend == "s3":
+        return S3Storage(settings)
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {backend!r}")
+
+
+def make_storage(app):
+    """The app's upload store, sharing its Mongo client for gridfs."""
+    return open_storage(app.config, app.officials_db)
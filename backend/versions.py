@@ -0,0 +1,95 @@
+import hashlib
+import time
+from functools import wraps
+from flask import current_app, request
+from pymongo import ReturnDocument
+
+
+# Scopes name the list views a write can change, not raw collections, so a
+# bump only invalidates the dashboards that actually show the record.
+PENDING_REVIEW = "pending_review"  # doctor list: applications awaiting a doctor
+DOCTOR_APPROVED = "doctor_approved"  # official list
+DISAPPROVED = "disapproved_travelers"  # health admin and authority lists
+# Sequence stamped on disapproved travelers and QR revocations so checkpoint
+# snapshots can ship only what changed (see snapshots.py).
+SNAPSHOT_SEQ = "snapshot_seq"
+
+_cache = {}  # scope -> (version, expires at)
+
+
+def bump(*scopes):
+    """Advance the version of every scope touched by a write."""
+    counters = current_app.officials_db.collection_versions
+    ttl = current_app.config["VERSION_CACHE_TTL"]
+    for scope in scopes:
+        doc = counters.find_one_and_update(
+            {"_id": scope}, {"$inc": {"v": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        _cache[scope] = (doc["v"], time.monotonic() + ttl)
+
+
+def next_seq(db) -> int:
+    doc = db.collection_versions.find_one_and_update(
+        {"_id": SNAPSHOT_SEQ}, {"$inc": {"v": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["v"]
+
+
+def next_seqs(db, count: int) -> range:
+    """Reserve `count` consecutive sequence numbers with one update."""
+    doc = db.collection_versions.find_one_and_update(
+        {"_id": SNAPSHOT_SEQ}, {"$inc": {"v": count}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return range(doc["v"] - count + 1, doc["v"] + 1)
+
+
+def versions(scopes) -> list:
+    """Current versions of `scopes`.
+
+    Served from memory for VERSION_CACHE_TTL seconds. Bumps made by this
+    process are seen at once; bumps from other processes after at most the TTL.
+    """
+    now = time.monotonic()
+    stale = [s for s in scopes if s not in _cache or _cache[s][1] <= now]
+    if stale:
+        ttl = current_app.config["VERSION_CACHE_TTL"]
+        found = {doc["_id"]: doc["v"] for doc in current_app.officials_db.collection_versions.find({"_id": {"$in": stale}})}
+        for scope in stale:
+            _cache[scope] = (found.get(scope, 0), now + ttl)
+    return [_cache[s][0] for s in scopes]
+
+
+def list_etag(scopes) -> str:
+    counters = "-".join(str(v) for v in versions(scopes))
+    # The query string picks the page and filter, and Accept may pick the
+    # streamed format, so both are part of the tag.
+    material = f"{request.full_path}|{request.headers.get('Accept', '')}"
+    digest = hashlib.sha1(material.encode()).hexdigest()[:16]
+    return f"{counters}-{digest}"
+
+
+def conditional(*scopes):
+    """Answer If-None-Match on a list endpoint from the scope versions alone.
+
+    The versions are read before the handler runs, so a write that lands
+    mid-request at worst costs the client one extra full response.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            etag = list_etag(scopes)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.add("Accept")
+            return response
+
+        return wrapper
+
+    return decorator
@@ -3,6 +3,7 @@ const toast = document.getElementById("authorities-message");
 const scanBtn = document.getElementById("scan-btn");
 const qrInput = document.getElementById("qr-input");
 const scanResult = document.getElementById("scan-result");
+const pager = createPager(document.getElementById("travelers-pager"), fetchTravelers);
 
 document.getElementById("logout-btn")?.addEventListener("click", async () => {
   await fetch("/authorities/logout", { method: "POST" });
@@ -168,9 +169,10 @@ async function levyPenalty(aadhar, amount) {
   }
 }
 
-async function fetchTravelers() {
+async function fetchTravelers(options = {}) {
   try {
-    const res = await fetch("/authorities/disapproved-travelers");
+    const res = await fetchIfChanged(`/authorities/disapproved-travelers?${pager.query()}`, options);
+    if (!res) return;
     const data = await res.json();
     if (!res.ok) {
       toast.textContent = "✗ " + (data.error || "Failed to load travelers");
@@ -178,6 +180,7 @@ async function fetchTravelers() {
       return;
     }
     renderTravelers(data.travelers || []);
+    pager.update(data, (data.travelers || []).length);
   } catch (err) {
     toast.textContent = "✗ Network error. Please refresh.";
     toast.classList.add("error");
@@ -216,4 +219,4 @@ function renderTravelers(list) {
 }
 
 fetchTravelers();
-setInterval(fetchTravelers, 15000);
+subscribeToChanges("/authorities/events", fetchTravelers);
@@ -1,35 +1,73 @@
 const container = document.getElementById("doctor-cards");
 const toast = document.getElementById("doctor-message");
 const searchInput = document.getElementById("aadhar-search");
+const searchMode = document.getElementById("aadhar-search-mode");
 const clearBtn = document.getElementById("clear-search");
 let expandedCard = null;
 let allMigrants = [];
+let searchTimer = null;
+const selected = new Set();
+const selectAll = document.getElementById("select-all");
+const approveSelectedBtn = document.getElementById("approve-selected");
+const pager = createPager(document.getElementById("doctor-pager"), fetchMigrants);
+const viewMode = document.getElementById("view-mode");
+const pagerBox = document.getElementById("doctor-pager");
+const leaseInfo = document.getElementById("lease-info");
 
 document.getElementById("logout-btn")?.addEventListener("click", async () => {
   await fetch("/doctor/logout", { method: "POST" });
   window.location.href = "/";
 });
 
-searchInput?.addEventListener("input", () => {
+function searchParams() {
+  const searchTerm = searchInput?.value.trim() || "";
+  const mode = searchMode?.value || "prefix";
+  // Last-4 lookups only make sense once all four digits are typed.
+  if (!searchTerm || (mode === "last4" && searchTerm.length !== 4)) return {};
+  return { aadhar: searchTerm, mode };
+}
+
+function onSearchChange() {
   const searchTerm = searchInput.value.trim();
+  // The queue holds only claimed work; searching looks across everything.
+  if (searchTerm && viewMode.value === "queue") viewMode.value = "all";
   if (searchTerm) {
-    const filtered = allMigrants.filter(m => m.aadhar.includes(searchTerm));
+    const last4 = searchMode?.value === "last4";
+    const filtered = allMigrants.filter(m => last4 ? m.aadhar.endsWith(searchTerm) : m.aadhar.startsWith(searchTerm));
     renderCards(filtered);
   } else {
     renderCards(allMigrants);
   }
-});
+  // Search runs server-side so it covers every page, not just the one loaded.
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(() => {
+    pager.reset();
+    fetchMigrants();
+  }, 300);
+}
+
+searchInput?.addEventListener("input", onSearchChange);
+searchMode?.addEventListener("change", onSearchChange);
 
 clearBtn?.addEventListener("click", () => {
   searchInput.value = "";
-  renderCards(allMigrants);
+  pager.reset();
+  fetchMigrants();
 });
 
-async function fetchMigrants() {
+function showLease(expiresAt) {
+  leaseInfo.textContent = expiresAt
+    ? `Claims held until ${new Date(expiresAt + "Z").toLocaleTimeString()}`
+    : "";
+}
+
+async function fetchMigrants(options = {}) {
   try {
-    const searchTerm = searchInput?.value.trim() || "";
-    const url = searchTerm ? `/doctor/migrants?aadhar=${encodeURIComponent(searchTerm)}` : "/doctor/migrants";
-    const res = await fetch(url);
+    const inQueue = viewMode?.value === "queue";
+    pagerBox.style.display = inQueue ? "none" : "";
+    const url = inQueue ? "/doctor/queue" : `/doctor/migrants?${pager.query(searchParams())}`;
+    const res = await fetchIfChanged(url, options);
+    if (!res) return;
     const data = await res.json();
     if (!res.ok) {
       toast.textContent = "✗ " + (data.error || "Failed to load migrants");
@@ -38,7 +76,13 @@ async function fetchMigrants() {
       return;
     }
     allMigrants = data.migrants || [];
+    // Keep only selections still awaiting a decision on this page.
+    const pending = new Set(allMigrants.filter(m => m.doctor_approval === "PENDING").map(m => m.id));
+    [...selected].forEach(id => pending.has(id) || selected.delete(id));
+    updateSelection();
     renderCards(allMigrants);
+    if (inQueue) showLease(data.lease_expires_at);
+    else pager.update(data, allMigrants.length);
   } catch (err) {
     toast.textContent = "✗ Network error. Please refresh.";
     toast.classList.add("error");
@@ -51,7 +95,9 @@ function renderCards(list) {
     container.innerHTML = `
       <div class="card" style="grid-column: 1 / -1; text-align: center; padding: 60px 20px;">
         <h2 style="margin-bottom: 12px;">📋 No Applications</h2>
-        <p class="muted">No migrant applications found. Check back later.</p>
+        <p class="muted">${viewMode?.value === "queue"
+          ? "Your review queue is empty. Claim the next applications to start reviewing."
+          : "No migrant applications found. Check back later."}</p>
       </div>
     `;
     return;
@@ -65,6 +111,11 @@ function renderCards(list) {
     const statusClass = m.doctor_approval.toLowerCase();
     
     card.innerHTML = `
+      ${m.doctor_approval === "PENDING" ? `
+        <label style="float: right; margin: 0;" title="Select for bulk approval">
+          <input type="checkbox" class="select-migrant" data-id="${m.id}" ${selected.has(m.id) ? "checked" : ""} style="width: auto;">
+        </label>
+      ` : ''}
       <h3>👤 ${m.name}</h3>
       <p><strong>🆔 Aadhar:</strong> ${m.aadhar}</p>
       <p><strong>📍 Route:</strong> ${m.source} ➜ ${m.destination}</p>
@@ -79,6 +130,7 @@ function renderCards(list) {
             <strong>Application ID:</strong> ${m.id}<br>
             <strong>Created:</strong> ${m.created_at ? new Date(m.created_at).toLocaleString() : "N/A"}
           </p>
+          ${m.preview_url ? `<div class="report-preview muted" style="font-size: 0.85rem;">Loading report preview...</div>` : ''}
         </div>
       ` : ''}
       <div class="actions">
@@ -96,15 +148,23 @@ function renderCards(list) {
     
     if (isExpanded) {
       card.classList.add("expanded");
+      const previewBox = card.querySelector(".report-preview");
+      if (previewBox) loadPreview(previewBox, m.preview_url);
     }
     
     card.addEventListener("click", (e) => {
-      if (!e.target.closest("button") && !e.target.closest("a")) {
+      if (!e.target.closest("button") && !e.target.closest("a") && !e.target.closest("label")) {
         expandedCard = expandedCard === m.id ? null : m.id;
         renderCards(list);
       }
     });
     
+    card.querySelector(".select-migrant")?.addEventListener("change", (e) => {
+      if (e.target.checked) selected.add(m.id);
+      else selected.delete(m.id);
+      updateSelection();
+    });
+
     card.querySelectorAll("button[data-id]").forEach((btn) => {
       btn.addEventListener("click", async (e) => {
         e.stopPropagation();
@@ -125,6 +185,132 @@ function renderCards(list) {
   });
 }
 
+// Triage from a thumbnail or the first page's text instead of the full report.
+async function loadPreview(box, url, attempt = 0) {
+  try {
+    const res = await fetch(url);
+    if (res.status === 202 && attempt < 5) {
+      box.textContent = "Preview is being prepared...";
+      setTimeout(() => loadPreview(box, url, attempt + 1), 2000);
+      return;
+    }
+    if (!res.ok) {
+      box.textContent = "No preview available; download the report to review it.";
+      return;
+    }
+    if ((res.headers.get("Content-Type") || "").startsWith("image/")) {
+      const img = document.createElement("img");
+      img.src = URL.createObjectURL(await res.blob());
+      img.alt = "Medical report preview";
+      img.style.cssText = "max-width: 100%; border: 1px solid var(--border); border-radius: 6px;";
+      box.replaceChildren(img);
+    } else {
+      const text = document.createElement("pre");
+      text.textContent = await res.text();
+      text.style.cssText = "white-space: pre-wrap; max-height: 200px; overflow-y: auto;";
+      box.replaceChildren(text);
+    }
+  } catch (err) {
+    box.textContent = "Preview unavailable.";
+  }
+}
+
+async function queueAction(url, body, button) {
+  button.disabled = true;
+  try {
+    const res = await fetch(url, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body),
+    });
+    const data = await res.json();
+    if (!res.ok) {
+      toast.textContent = "✗ " + (data.error || "Queue update failed");
+      toast.classList.remove("success");
+      toast.classList.add("error");
+      return;
+    }
+    viewMode.value = "queue";
+    await fetchMigrants({ fresh: true });
+  } catch (err) {
+    toast.textContent = "✗ Network error. Please try again.";
+    toast.classList.add("error");
+  } finally {
+    button.disabled = false;
+  }
+}
+
+const claimBtn = document.getElementById("claim-next");
+claimBtn?.addEventListener("click", () => {
+  queueAction("/doctor/queue/claim", {
+    count: Number(document.getElementById("claim-count").value) || 10,
+    source: document.getElementById("claim-source").value.trim(),
+    destination: document.getElementById("claim-destination").value.trim(),
+  }, claimBtn);
+});
+
+const releaseBtn = document.getElementById("release-all");
+releaseBtn?.addEventListener("click", () => {
+  if (confirm("Return all your claimed applications to the shared queue?")) {
+    queueAction("/doctor/queue/release", {}, releaseBtn);
+  }
+});
+
+viewMode?.addEventListener("change", () => {
+  showLease(null);
+  pager.reset();
+  fetchMigrants({ fresh: true });
+});
+
+function updateSelection() {
+  approveSelectedBtn.disabled = selected.size === 0;
+  approveSelectedBtn.textContent = `✓ Approve selected (${selected.size})`;
+  const pendingCount = allMigrants.filter(m => m.doctor_approval === "PENDING").length;
+  selectAll.checked = pendingCount > 0 && selected.size === pendingCount;
+}
+
+selectAll?.addEventListener("change", () => {
+  selected.clear();
+  if (selectAll.checked) {
+    allMigrants.filter(m => m.doctor_approval === "PENDING").forEach(m => selected.add(m.id));
+  }
+  updateSelection();
+  renderCards(allMigrants);
+});
+
+approveSelectedBtn?.addEventListener("click", async () => {
+  const ids = [...selected];
+  if (!ids.length || !confirm(`Approve medical clearance for ${ids.length} selected migrant(s)?`)) return;
+  approveSelectedBtn.disabled = true;
+  approveSelectedBtn.innerHTML = '<span class="loading"></span> Processing...';
+  try {
+    const res = await fetch("/doctor/decisions", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ decisions: ids.map(id => ({ migrant_id: id, decision: "APPROVED" })) }),
+    });
+    const data = await res.json();
+    if (res.ok) {
+      (data.results || []).forEach(r => r.status === "approved" && selected.delete(r.migrant_id));
+      toast.textContent = data.failed
+        ? `✗ ${data.applied} approved, ${data.failed} failed`
+        : `✓ ${data.applied} migrant(s) approved`;
+      toast.classList.toggle("error", data.failed > 0);
+      toast.classList.toggle("success", !data.failed);
+    } else {
+      toast.textContent = "✗ " + (data.error || "Bulk approval failed");
+      toast.classList.remove("success");
+      toast.classList.add("error");
+    }
+    await fetchMigrants();
+  } catch (err) {
+    toast.textContent = "✗ Network error. Please try again.";
+    toast.classList.add("error");
+  } finally {
+    updateSelection();
+  }
+});
+
 function showHealthForm(migrant, migrantId) {
   // Create modal
   const modal = document.createElement("div");
@@ -254,4 +440,4 @@ async function decide(id, decision, healthData = null) {
 }
 
 fetchMigrants();
-setInterval(fetchMigrants, 8000);
+subscribeToChanges("/doctor/events", fetchMigrants);
@@ -3,6 +3,7 @@ const toast = document.getElementById("health-admin-message");
 const modal = document.getElementById("traveler-modal");
 const closeModalBtn = document.getElementById("close-modal");
 let selectedTravelerId = null;
+const pager = createPager(document.getElementById("travelers-pager"), fetchTravelers);
 
 document.getElementById("logout-btn")?.addEventListener("click", async () => {
   await fetch("/health-admin/logout", { method: "POST" });
@@ -13,9 +14,10 @@ closeModalBtn?.addEventListener("click", () => {
   modal.style.display = "none";
 });
 
-async function fetchTravelers() {
+async function fetchTravelers(options = {}) {
   try {
-    const res = await fetch("/health-admin/disapproved-travelers");
+    const res = await fetchIfChanged(`/health-admin/disapproved-travelers?${pager.query()}`, options);
+    if (!res) return;
     const data = await res.json();
     if (!res.ok) {
       toast.textContent = "✗ " + (data.error || "Failed to load travelers");
@@ -24,6 +26,7 @@ async function fetchTravelers() {
       return;
     }
     renderTravelers(data.travelers || []);
+    pager.update(data, (data.travelers || []).length);
   } catch (err) {
     toast.textContent = "✗ Network error. Please refresh.";
     toast.classList.add("error");
@@ -180,5 +183,72 @@ async function downloadWarningLetter(travelerId) {
   }
 }
 
+const bulkForm = document.getElementById("bulk-issue-form");
+const bulkProgress = document.getElementById("bulk-issue-progress");
+
+bulkForm?.addEventListener("submit", async (e) => {
+  e.preventDefault();
+  const tiers = [...bulkForm.querySelectorAll('input[name="tier"]:checked')].map(el => Number(el.value));
+  if (!tiers.length) {
+    toast.textContent = "✗ Select at least one tier";
+    toast.classList.add("error");
+    return;
+  }
+  if (!confirm(`Issue health warning letters to all tier ${tiers.join(", ")} travelers without one?`)) return;
+
+  const btn = bulkForm.querySelector('button[type="submit"]');
+  const originalText = btn.textContent;
+  btn.disabled = true;
+  btn.innerHTML = '<span class="loading"></span> Issuing...';
+  let progressTimer = null;
+
+  try {
+    const res = await fetch("/health-admin/bulk-issue", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ tier: tiers }),
+    });
+    if (!res.ok) {
+      const data = await res.json();
+      toast.textContent = "✗ " + (data.error || "Bulk issuance failed");
+      toast.classList.add("error");
+      return;
+    }
+    // The ZIP streams while letters render; poll the job for a progress line.
+    const jobId = res.headers.get("X-Bulk-Job");
+    progressTimer = setInterval(async () => {
+      const pr = await fetch(`/health-admin/bulk-issue/${jobId}`);
+      if (!pr.ok) return;
+      const { job } = await pr.json();
+      bulkProgress.textContent = `${job.rendered} / ${job.total} letters rendered`;
+    }, 1000);
+
+    const blob = await res.blob();
+    const url = window.URL.createObjectURL(blob);
+    const a = document.createElement("a");
+    a.href = url;
+    a.download = `health_warnings_${jobId}.zip`;
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+    window.URL.revokeObjectURL(url);
+
+    const pr = await fetch(`/health-admin/bulk-issue/${jobId}`);
+    const { job } = await pr.json();
+    bulkProgress.textContent = `${job.marked ?? 0} letters issued, ${job.emails_queued ?? 0} emails queued`;
+    toast.textContent = "✓ Bulk issuance complete";
+    toast.classList.remove("error");
+    toast.classList.add("success");
+    await fetchTravelers();
+  } catch (err) {
+    toast.textContent = "✗ Network error. Please try again.";
+    toast.classList.add("error");
+  } finally {
+    clearInterval(progressTimer);
+    btn.disabled = false;
+    btn.textContent = originalText;
+  }
+});
+
 fetchTravelers();
-setInterval(fetchTravelers, 10000);
+subscribeToChanges("/health-admin/events", fetchTravelers);
@@ -0,0 +1,54 @@
+// Push updates for the dashboards. The backend streams an event whenever
+// something relevant to this role changes; bursts of events are coalesced
+// into a single refresh, called as onChange({ fresh: true }). If the stream
+// is unavailable we fall back to slow polling until it reconnects.
+function subscribeToChanges(url, onChange, { fallbackMs = 60000, settleMs = 250 } = {}) {
+  let pending = null;
+  let pollTimer = null;
+
+  function refresh() {
+    if (pending) return;
+    pending = setTimeout(() => {
+      pending = null;
+      onChange({ fresh: true });
+    }, settleMs);
+  }
+
+  function startPolling() {
+    if (!pollTimer) pollTimer = setInterval(onChange, fallbackMs);
+  }
+
+  if (!window.EventSource) {
+    startPolling();
+    return null;
+  }
+
+  const source = new EventSource(url);
+  source.onmessage = refresh;
+  source.onopen = () => {
+    if (pollTimer) {
+      clearInterval(pollTimer);
+      pollTimer = null;
+      // We may have missed changes while disconnected.
+      refresh();
+    }
+  };
+  source.onerror = startPolling;
+  return source;
+}
+
+// Conditional GET for list endpoints. Remembers the ETag per URL and resolves
+// to null when the server answers 304, so callers can keep what they render.
+// `fresh` skips the validator: after a pushed change the list has most likely
+// moved on, and another app process may not have seen the new version yet.
+const listValidators = new Map();
+
+async function fetchIfChanged(url, { fresh = false } = {}) {
+  const headers = {};
+  const etag = listValidators.get(url);
+  if (etag && !fresh) headers["If-None-Match"] = etag;
+  const res = await fetch(url, { headers, cache: "no-store" });
+  if (res.status === 304) return null;
+  if (res.ok && res.headers.get("ETag")) listValidators.set(url, res.headers.get("ETag"));
+  return res;
+}
@@ -42,7 +42,7 @@ form?.addEventListener("submit", async (e) => {
       applyMessage.textContent = "✓ " + (data.message || "Application submitted successfully!");
       applyMessage.classList.remove("error");
       applyMessage.classList.add("success");
-      loadStatus();
+      loadStatus({ fresh: true });
       form.reset();
     } else {
       applyMessage.textContent = "✗ " + (data.error || "Failed to submit");
@@ -100,9 +100,11 @@ downloadBtn?.addEventListener("click", async () => {
   }
 });
 
-async function loadStatus() {
+// Fallback polls may reuse the briefly cached status; pushed changes and our
+// own submissions revalidate.
+async function loadStatus({ fresh = false } = {}) {
   try {
-    const res = await fetch("/migrant/status");
+    const res = await fetch("/migrant/status", { cache: fresh ? "no-cache" : "default" });
     const data = await res.json();
     if (!res.ok || !data.migrant) {
       statusPanel.innerHTML = `<p class="muted">Not logged in for status. Submit an application (or login) to see your own status.</p>`;
@@ -192,6 +194,6 @@ async function loadStatus() {
 
 (async () => {
   await startFreshIfRequested();
-  await loadStatus();
-  setInterval(loadStatus, 8000);
+  await loadStatus({ fresh: true });
+  subscribeToChanges("/migrant/events", loadStatus);
 })();
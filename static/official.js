@@ -2,15 +2,22 @@ const container = document.getElementById("official-cards");
 const toast = document.getElementById("official-message");
 const createForm = document.getElementById("create-doctor-form");
 const createMsg = document.getElementById("create-doctor-msg");
+const pager = createPager(document.getElementById("official-pager"), fetchMigrants);
+const selectAll = document.getElementById("select-all");
+const approveSelectedBtn = document.getElementById("approve-selected");
+const bulkRemarks = document.getElementById("bulk-remarks");
+const selected = new Set();
+let currentMigrants = [];
 
 document.getElementById("logout-btn")?.addEventListener("click", async () => {
   await fetch("/official/logout", { method: "POST" });
   window.location.href = "/";
 });
 
-async function fetchMigrants() {
+async function fetchMigrants(options = {}) {
   try {
-    const res = await fetch("/official/migrants");
+    const res = await fetchIfChanged(`/official/migrants?${pager.query()}`, options);
+    if (!res) return;
     const data = await res.json();
     if (!res.ok) {
       toast.textContent = "✗ " + (data.error || "Failed to load migrants");
@@ -18,7 +25,13 @@ async function fetchMigrants() {
       toast.classList.remove("success");
       return;
     }
-    renderCards(data.migrants || []);
+    currentMigrants = data.migrants || [];
+    // Keep only selections still awaiting approval on this page.
+    const pending = new Set(currentMigrants.filter(m => m.official_approval !== "APPROVED").map(m => m.id));
+    [...selected].forEach(id => pending.has(id) || selected.delete(id));
+    updateSelection();
+    renderCards(currentMigrants);
+    pager.update(data, currentMigrants.length);
   } catch (err) {
     toast.textContent = "✗ Network error. Please refresh.";
     toast.classList.add("error");
@@ -45,6 +58,11 @@ function renderCards(list) {
     const officialStatus = m.official_approval.toLowerCase();
     
     card.innerHTML = `
+      ${m.official_approval !== "APPROVED" ? `
+        <label style="float: right; margin: 0;" title="Select for bulk approval">
+          <input type="checkbox" class="select-migrant" ${selected.has(m.id) ? "checked" : ""} style="width: auto;">
+        </label>
+      ` : ''}
       <h3>👤 ${m.name}</h3>
       <p><strong>🆔 Aadhar:</strong> ${m.aadhar}</p>
       <p><strong>📍 Route:</strong> ${m.source} ➜ ${m.destination}</p>
@@ -69,6 +87,12 @@ function renderCards(list) {
     
     const form = card.querySelector("form");
     const submitBtn = form.querySelector('button[type="submit"]');
+
+    card.querySelector(".select-migrant")?.addEventListener("change", (e) => {
+      if (e.target.checked) selected.add(m.id);
+      else selected.delete(m.id);
+      updateSelection();
+    });
     
     form.addEventListener("submit", async (e) => {
       e.preventDefault();
@@ -122,8 +146,61 @@ async function submitDecision(id, decision, formData) {
   }
 }
 
+function updateSelection() {
+  approveSelectedBtn.disabled = selected.size === 0;
+  approveSelectedBtn.textContent = `✓ Approve selected (${selected.size})`;
+  const pendingCount = currentMigrants.filter(m => m.official_approval !== "APPROVED").length;
+  selectAll.checked = pendingCount > 0 && selected.size === pendingCount;
+}
+
+selectAll?.addEventListener("change", () => {
+  selected.clear();
+  if (selectAll.checked) {
+    currentMigrants.filter(m => m.official_approval !== "APPROVED").forEach(m => selected.add(m.id));
+  }
+  updateSelection();
+  renderCards(currentMigrants);
+});
+
+approveSelectedBtn?.addEventListener("click", async () => {
+  const ids = [...selected];
+  if (!ids.length || !confirm(`Approve ${ids.length} selected migrant(s) and send their approval letters?`)) return;
+  // Letters picked on a card are sent along; the rest are generated server-side.
+  const formData = new FormData();
+  formData.append("remarks", bulkRemarks.value.trim());
+  ids.forEach(id => {
+    formData.append("migrant_ids", id);
+    const file = container.querySelector(`form[data-id="${id}"] input[type="file"]`)?.files[0];
+    if (file) formData.append(`letter_${id}`, file);
+  });
+  approveSelectedBtn.disabled = true;
+  approveSelectedBtn.innerHTML = '<span class="loading"></span> Processing...';
+  try {
+    const res = await fetch("/official/decisions", { method: "POST", body: formData });
+    const data = await res.json();
+    if (res.ok) {
+      (data.results || []).forEach(r => r.status === "approved" && selected.delete(r.migrant_id));
+      toast.textContent = data.failed
+        ? `✗ ${data.applied} approved, ${data.failed} failed`
+        : `✓ ${data.applied} migrant(s) approved`;
+      toast.classList.toggle("error", data.failed > 0);
+      toast.classList.toggle("success", !data.failed);
+    } else {
+      toast.textContent = "✗ " + (data.error || "Bulk approval failed");
+      toast.classList.remove("success");
+      toast.classList.add("error");
+    }
+    await fetchMigrants();
+  } catch (err) {
+    toast.textContent = "✗ Network error. Please try again.";
+    toast.classList.add("error");
+  } finally {
+    updateSelection();
+  }
+});
+
 fetchMigrants();
-setInterval(fetchMigrants, 8000);
+subscribeToChanges("/official/events", fetchMigrants);
 
 if (createForm) {
   createForm.addEventListener("submit", async (e) => {
@@ -161,3 +238,38 @@ if (createForm) {
     }
   });
 }
+
+const importForm = document.getElementById("import-form");
+const importMsg = document.getElementById("import-msg");
+
+importForm?.addEventListener("submit", async (e) => {
+  e.preventDefault();
+  const submitBtn = importForm.querySelector('button[type="submit"]');
+  const originalText = submitBtn.textContent;
+  submitBtn.disabled = true;
+  submitBtn.innerHTML = '<span class="loading"></span> Importing...';
+  try {
+    const res = await fetch("/official/applications/import", { method: "POST", body: new FormData(importForm) });
+    const data = await res.json();
+    if (res.ok) {
+      const errors = data.errors || [];
+      importMsg.textContent = `${errors.length ? "✗" : "✓"} ${data.inserted} new, ${data.updated} resubmitted, ${errors.length} rejected`
+        + errors.slice(0, 10).map(err => `\nRow ${err.row}: ${err.error}`).join("")
+        + (errors.length > 10 ? `\n…and ${errors.length - 10} more` : "");
+      importMsg.style.whiteSpace = "pre-line";
+      importMsg.classList.toggle("error", errors.length > 0);
+      importMsg.classList.toggle("success", !errors.length);
+      importForm.reset();
+    } else {
+      importMsg.textContent = "✗ " + (data.error || "Import failed");
+      importMsg.classList.remove("success");
+      importMsg.classList.add("error");
+    }
+  } catch (err) {
+    importMsg.textContent = "✗ Network error. Please try again.";
+    importMsg.classList.add("error");
+  } finally {
+    submitBtn.disabled = false;
+    submitBtn.textContent = originalText;
+  }
+});
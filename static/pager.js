@@ -0,0 +1,72 @@
+// Keyset pager shared by the dashboards. The backend hands back an opaque
+// `next` cursor; we keep the cursors of pages already visited so "Previous"
+// works and periodic refreshes reload only the page on screen.
+// Counting matches is the expensive part of a list request, so the total is
+// asked for only on the first load (or after reset) and when the user clicks
+// the record count; refreshes and page turns keep the total already shown.
+function createPager(element, onChange, limit = 50) {
+  const cursors = [""];
+  let next = null;
+  let total = null;
+  let wantTotal = true;
+
+  function render() {
+    if (!element) return;
+    const page = cursors.length;
+    const pages = total !== null ? Math.max(1, Math.ceil(total / limit)) : null;
+    element.innerHTML = `
+      <button type="button" class="secondary" data-page="prev" ${page === 1 ? "disabled" : ""}>◀ Previous</button>
+      <span class="muted">Page ${page}${pages ? ` of ${pages}` : ""}</span>
+      <button type="button" class="secondary" data-page="count" title="Count matching records">${total !== null ? `${total} records ↻` : "Count records"}</button>
+      <button type="button" class="secondary" data-page="next" ${next ? "" : "disabled"}>Next ▶</button>
+    `;
+    element.querySelector('[data-page="prev"]').addEventListener("click", () => {
+      if (cursors.length > 1) {
+        cursors.pop();
+        onChange();
+      }
+    });
+    element.querySelector('[data-page="count"]').addEventListener("click", () => {
+      wantTotal = true;
+      onChange({ fresh: true });
+    });
+    element.querySelector('[data-page="next"]').addEventListener("click", () => {
+      if (next) {
+        cursors.push(next);
+        onChange();
+      }
+    });
+  }
+
+  return {
+    // Query string for the page currently on screen.
+    query(extra = {}) {
+      const params = new URLSearchParams({ limit: String(limit), ...extra });
+      if (wantTotal) params.set("count", "1");
+      const cursor = cursors[cursors.length - 1];
+      if (cursor) params.set("cursor", cursor);
+      return params.toString();
+    },
+    // `rows` is how many records the page holds.
+    update(data, rows) {
+      next = data.next || null;
+      if (typeof data.total === "number") {
+        total = data.total;
+        wantTotal = false;
+      }
+      // The page we were on can disappear when records move out of the list.
+      if (cursors.length > 1 && rows === 0) {
+        cursors.pop();
+        wantTotal = true;
+        onChange();
+        return;
+      }
+      render();
+    },
+    reset() {
+      cursors.length = 1;
+      next = null;
+      wantTotal = true;
+    },
+  };
+}
@@ -0,0 +1,38 @@
+import base64
+import sys
+import types
+from pathlib import Path
+
+import mongomock
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import app as app_module  # noqa: E402
+import config  # noqa: E402
+import qr_codec  # noqa: E402
+
+
+def mongo_client():
+    client = mongomock.MongoClient()
+    # GridFSBucket reads client.options.timeout, which mongomock lacks.
+    client.options = types.SimpleNamespace(timeout=None)
+    return client
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The Flask app on mongomock, with every upload folder under tmp_path."""
+    for name in dir(config.Config):
+        if name.endswith("_FOLDER"):
+            monkeypatch.setattr(config.Config, name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(config.Config, "OUTBOX_WORKER_ENABLED", False)
+    monkeypatch.setattr(config.Config, "QR_SIGNING_KEY", base64.b64encode(bytes(32)).decode())
+    monkeypatch.setattr(qr_codec, "_keys", None)
+    client = mongo_client()
+    monkeypatch.setattr(app_module, "get_mongo_client", lambda uri: client)
+    # The event log is a capped collection, which mongomock cannot create.
+    monkeypatch.setattr(app_module, "ensure_event_log", lambda db, size: None)
+    flask_app = app_module.create_app()
+    flask_app.config["TESTING"] = True
+    return flask_app
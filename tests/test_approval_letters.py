@@ -0,0 +1,58 @@
+import io
+
+from bson import ObjectId
+
+from blobs import store_blob
+from official_approvals import save_approvals
+
+
+def _official(app):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s.update(role="official", official_id="O1")
+    return client
+
+
+def _decide(client, migrant_id, decision, letter=None):
+    data = {"decision": decision}
+    if letter is not None:
+        data["approval_letter"] = (io.BytesIO(letter), "letter.pdf")
+    return client.post(f"/official/decision/{migrant_id}", data=data, content_type="multipart/form-data")
+
+
+def test_reapproval_replaces_the_letter_and_rejection_drops_it(app):
+    migrant_id = ObjectId()
+    app.immigrants_db.immigrants.insert_one(
+        {"_id": migrant_id, "name": "Asha", "aadhar": "123456789012", "email": "a@x", "doctor_approval": "APPROVED"}
+    )
+    client = _official(app)
+    blobs, rows = app.officials_db.blobs, app.officials_db.approved_migrants
+
+    assert _decide(client, migrant_id, "APPROVED", b"%PDF first letter").status_code == 200
+    first = rows.find_one()["approval_letter_blob"]
+    assert _decide(client, migrant_id, "APPROVED", b"%PDF second letter").status_code == 200
+    assert rows.count_documents({}) == 1
+    second = rows.find_one()["approval_letter_blob"]
+    assert blobs.find_one({"_id": first}) is None
+    assert not app.storage.exists(first)
+    assert blobs.find_one({"_id": second})["refs"] == 1
+
+    download = client.get(f"/official/approval-letter/{migrant_id}")
+    assert download.get_data() == b"%PDF second letter"
+
+    assert _decide(client, migrant_id, "REJECTED").status_code == 200
+    assert rows.count_documents({}) == 0
+    assert blobs.find_one({"_id": second}) is None
+    assert client.get(f"/official/approval-letter/{migrant_id}").status_code == 404
+
+
+def test_saving_approvals_clears_duplicate_rows(app):
+    with app.test_request_context():
+        old = [store_blob(io.BytesIO(f"%PDF old {i}".encode()), "old.pdf") for i in range(2)]
+        app.officials_db.approved_migrants.insert_many(
+            [{"migrant_id": "m1", "approval_letter_blob": digest} for digest in old]
+        )
+        new = store_blob(io.BytesIO(b"%PDF new"), "new.pdf")
+        save_approvals(app.officials_db, [{"migrant_id": "m1", "approval_letter_blob": new}, {"migrant_id": "m2"}])
+    assert sorted(r["migrant_id"] for r in app.officials_db.approved_migrants.find()) == ["m1", "m2"]
+    assert app.officials_db.blobs.count_documents({"_id": {"$in": old}}) == 0
@@ -0,0 +1,65 @@
+import io
+import threading
+from datetime import datetime, timedelta
+
+import blobs
+from blobs import release_blob, store_blob
+
+
+def _store(data=b"report", name="report.pdf"):
+    return store_blob(io.BytesIO(data), name)
+
+
+def test_duplicate_uploads_share_one_blob(app):
+    with app.test_request_context():
+        first, second = _store(), _store()
+        assert first == second
+        assert app.officials_db.blobs.find_one({"_id": first})["refs"] == 2
+        release_blob(first)
+        assert app.storage.exists(first)
+        release_blob(first)
+        assert not app.storage.exists(first)
+        assert app.officials_db.blobs.find_one({"_id": first}) is None
+
+
+def test_store_during_release_keeps_the_file(app, monkeypatch):
+    """A store racing the last release must end with the file present."""
+    with app.test_request_context():
+        digest = _store()
+    storage = app.storage
+    deleting, stored = threading.Event(), threading.Event()
+    real_delete = storage.delete
+
+    def slow_delete(key):
+        deleting.set()
+        stored.wait(0.5)  # the store runs while the file is being deleted
+        real_delete(key)
+
+    monkeypatch.setattr(storage, "delete", slow_delete)
+
+    def release():
+        with app.test_request_context():
+            release_blob(digest)
+
+    releaser = threading.Thread(target=release)
+    releaser.start()
+    deleting.wait(1)
+    with app.test_request_context():
+        assert _store() == digest
+    stored.set()
+    releaser.join()
+    doc = app.officials_db.blobs.find_one({"_id": digest})
+    assert doc["refs"] == 1 and "deleting" not in doc
+    assert storage.exists(digest)
+
+
+def test_abandoned_release_is_taken_over(app):
+    with app.test_request_context():
+        digest = _store()
+        # A release that crashed after marking the blob and deleting the file.
+        stale = datetime.utcnow() - timedelta(seconds=blobs.DELETE_TIMEOUT + 1)
+        app.officials_db.blobs.update_one({"_id": digest}, {"$set": {"refs": 0, "deleting": stale}})
+        app.storage.delete(digest)
+        assert _store() == digest
+    assert app.storage.exists(digest)
+    assert app.officials_db.blobs.find_one({"_id": digest})["refs"] == 1
@@ -0,0 +1,52 @@
+from bson import ObjectId
+
+
+def _doctor(app):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s.update(role="doctor", doctor_id="D1")
+    return client
+
+
+def _seed(app, aadhars):
+    app.immigrants_db.immigrants.insert_many(
+        [
+            {"_id": ObjectId(), "name": f"M{i}", "aadhar": a, "aadhar_last4": a[-4:], "email": f"{i}@x", "doctor_approval": "PENDING"}
+            for i, a in enumerate(aadhars)
+        ]
+    )
+
+
+def _pages(client, **params):
+    seen, cursor = [], None
+    while True:
+        args = dict(params, limit=2, **({"cursor": cursor} if cursor else {}))
+        body = client.get("/doctor/migrants", query_string=args).get_json()
+        seen.append([m["aadhar"] for m in body["migrants"]])
+        cursor = body.get("next")
+        if not cursor:
+            return seen
+
+
+def test_prefix_search_pages_in_aadhar_order(app):
+    # Inserted out of Aadhar order, with a shared Aadhar across two emails.
+    _seed(app, ["123499999999", "123400000001", "999900000000", "123455555555", "123400000001", "123300000000"])
+    pages = _pages(_doctor(app), aadhar="1234")
+    assert pages == [["123400000001", "123400000001"], ["123455555555", "123499999999"]]
+
+
+def test_full_aadhar_and_last4_search(app):
+    _seed(app, ["123400000001", "555500000001", "123400000001"])
+    client = _doctor(app)
+    assert _pages(client, aadhar="123400000001") == [["123400000001", "123400000001"]]
+    assert _pages(client, aadhar="0001", mode="last4") == [["123400000001", "555500000001"], ["123400000001"]]
+
+
+def test_bad_mode_and_mismatched_cursor(app):
+    _seed(app, ["123400000001", "123400000002", "123400000003"])
+    client = _doctor(app)
+    assert client.get("/doctor/migrants", query_string={"aadhar": "1234", "mode": "suffix"}).status_code == 400
+    plain = client.get("/doctor/migrants", query_string={"limit": 1}).get_json()["next"]
+    assert client.get("/doctor/migrants", query_string={"aadhar": "1234", "cursor": plain}).status_code == 400
+    keyed = client.get("/doctor/migrants", query_string={"aadhar": "1234", "limit": 1}).get_json()["next"]
+    assert client.get("/doctor/migrants", query_string={"cursor": keyed}).status_code == 400
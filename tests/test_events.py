@@ -0,0 +1,114 @@
+from bson import ObjectId
+
+from events import EventHub, Subscription, _event
+
+
+def _login(client, role, **session):
+    with client.session_transaction() as s:
+        s["role"] = role
+        s.update(session)
+
+
+def test_streams_share_one_hub(app, monkeypatch):
+    # mongomock cannot tail; feed the hub by hand instead of the tailer.
+    monkeypatch.setattr(EventHub, "_run", lambda self: None)
+    app.config.update(SSE_MAX_DURATION=1, SSE_HEARTBEAT=1)
+    log = app.officials_db.events
+    before = ObjectId()
+    missed = log.insert_one(_event("application_submitted", ["doctor"], "m1", {})).inserted_id
+    log.insert_one(_event("official_decision", ["official"], "m1", {}))
+
+    doctor = app.test_client()
+    _login(doctor, "doctor", doctor_id="D1")
+    response = doctor.get("/doctor/events", headers={"Last-Event-ID": str(before)})
+    hub = app.event_hub
+    assert len(hub._subscribers) == 1
+
+    hub.dispatch(log.find_one({"_id": missed}))  # also in the backlog
+    live = _event("doctor_decision", ["doctor", "migrant"], "m2", {"decision": "APPROVED"})
+    live["_id"] = ObjectId()
+    hub.dispatch(live)
+    hub.dispatch(dict(_event("warning_issued", ["migrant"], "m2", {}), _id=ObjectId()))
+
+    body = response.get_data(as_text=True)
+    response.close()
+    ids = [line[4:] for line in body.splitlines() if line.startswith("id: ")]
+    assert ids == [str(missed), str(live["_id"])]
+    assert not hub._subscribers
+
+
+def _doc(kind, roles, migrant_id):
+    return dict(_event(kind, roles, migrant_id, {}), _id=ObjectId())
+
+
+def test_migrant_subscription_only_gets_own_events():
+    hub = EventHub(db=None, logger=None)
+    subscription = Subscription("migrant", "m1", 10)
+    hub._subscribers.add(subscription)
+    hub.dispatch(_doc("warning_issued", ["migrant"], "m2"))
+    hub.dispatch(_doc("warning_issued", ["migrant"], "m1"))
+    hub.dispatch(_doc("warnings_issued", ["health_admin"], None))
+    assert subscription.queue.qsize() == 1
+    assert subscription.queue.get()["migrant_id"] == "m1"
+
+
+def test_stalled_subscription_overflows():
+    subscription = Subscription("doctor", None, 2)
+    for _ in range(3):
+        subscription.put(_doc("application_submitted", ["doctor"], None))
+    assert subscription.overflowed
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.alive = True
+
+    def max_await_time_ms(self, ms):
+        return self
+
+    def try_next(self):
+        if not self.docs:
+            self.alive = False
+            return None
+        return self.docs.pop(0)
+
+    def close(self):
+        self.alive = False
+
+
+class _Stop(Exception):
+    pass
+
+
+class _Log:
+    """Capped-collection stand-in: scripted cursors, one per find()."""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.filters = []
+
+    def find(self, query, cursor_type=None):
+        self.filters.append(query)
+        if not self.batches:
+            raise _Stop
+        return _Cursor(self.batches.pop(0))
+
+
+def test_tailer_delivers_the_first_event_and_resumes_after_the_last(monkeypatch):
+    monkeypatch.setattr("events.time.sleep", lambda seconds: None)
+    first, second = _doc("application_submitted", ["doctor"], "m1"), _doc("doctor_decision", ["doctor"], "m1")
+    # Empty log (the cursor dies at once), then the first event, then a restart.
+    log = _Log([[], [first], [second]])
+    hub = EventHub(db=type("Db", (), {"events": log})(), logger=None)
+    subscription = Subscription("doctor", None, 10)
+    hub._subscribers.add(subscription)
+    started = ObjectId()
+    try:
+        hub._run()
+    except _Stop:
+        pass
+    assert [subscription.queue.get_nowait()["_id"] for _ in range(2)] == [first["_id"], second["_id"]]
+    seeds = [f["_id"]["$gt"] for f in log.filters]
+    assert seeds[0] >= started and seeds[0] == seeds[1]
+    assert seeds[2:] == [first["_id"], second["_id"]]
@@ -0,0 +1,111 @@
+import logging
+import socket
+from datetime import datetime, timedelta
+from email import message_from_bytes
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from models import send_email
+from outbox import OutboxWorker
+
+
+class Sink:
+    """SMTP handler that keeps what it receives, or rejects with a 451."""
+
+    def __init__(self):
+        self.messages = []
+        self.reject = False
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reject:
+            return "451 Try again later"
+        self.messages.append(message_from_bytes(envelope.content))
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def sink(app):
+    handler = Sink()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    app.config.update(
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=controller.port,
+        SMTP_USE_SSL=False,
+        SMTP_AUTH=False,
+        SMTP_SENDER="noreply@example.org",
+        SMTP_TIMEOUT=5,
+    )
+    yield handler
+    controller.stop()
+
+
+def _worker(app):
+    return OutboxWorker(app.officials_db, app.config, logging.getLogger("outbox-test"), app.storage)
+
+
+def test_batch_delivers_with_attachment(app, sink):
+    with app.app_context():
+        assert send_email("a@example.org", "Clearance", "Attached.", attachment=("letter.pdf", b"%PDF-1.4 letter"))
+        assert send_email("b@example.org", "Status", "No attachment.")
+    worker = _worker(app)
+    assert worker.drain_once() == 2
+    worker.session.close()
+
+    assert [m["To"] for m in sink.messages] == ["a@example.org", "b@example.org"]
+    (part,) = [p for p in sink.messages[0].walk() if p.get_filename()]
+    assert part.get_filename() == "letter.pdf"
+    assert part.get_payload(decode=True) == b"%PDF-1.4 letter"
+    sent = list(app.officials_db.email_outbox.find())
+    assert {doc["status"] for doc in sent} == {"sent"}
+    assert not any("attachment" in doc for doc in sent)
+
+
+def test_rejected_message_backs_off_then_sends(app, sink):
+    app.config.update(OUTBOX_RETRY_BASE=30, OUTBOX_RETRY_MAX=3600)
+    outbox = app.officials_db.email_outbox
+    with app.app_context():
+        send_email("a@example.org", "Clearance", "Body")
+    worker = _worker(app)
+
+    sink.reject = True
+    before = datetime.utcnow()
+    assert worker.drain_once() == 1
+    doc = outbox.find_one()
+    assert (doc["status"], doc["attempts"]) == ("queued", 1)
+    assert "451" in doc["last_error"]
+    assert doc["next_attempt_at"] >= before + timedelta(seconds=30)
+    # Not due yet, so the next batch leaves it alone.
+    assert worker.drain_once() == 0
+
+    outbox.update_one({}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+    assert worker.drain_once() == 1
+    doc = outbox.find_one()
+    assert (doc["status"], doc["attempts"]) == ("queued", 2)
+    assert doc["next_attempt_at"] >= datetime.utcnow() + timedelta(seconds=59)
+
+    sink.reject = False
+    outbox.update_one({}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+    assert worker.drain_once() == 1
+    worker.session.close()
+    assert outbox.find_one()["status"] == "sent"
+    assert [m["Subject"] for m in sink.messages] == ["Clearance"]
+
+
+def test_gives_up_after_max_attempts(app, sink):
+    app.config.update(OUTBOX_MAX_ATTEMPTS=1)
+    sink.reject = True
+    with app.app_context():
+        send_email("a@example.org", "Clearance", "Body")
+    worker = _worker(app)
+    worker.drain_once()
+    worker.session.close()
+    doc = app.officials_db.email_outbox.find_one()
+    assert (doc["status"], doc["attempts"]) == ("failed", 1)
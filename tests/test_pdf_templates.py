@@ -0,0 +1,45 @@
+from io import BytesIO
+
+from pypdf import PdfReader
+
+from pdf_templates import APPROVAL_LETTER, CLEARANCE, HEALTH_WARNING
+
+RECORD = {
+    "name": "Asha Verma",
+    "aadhar": "123456789012",
+    "source": "Pune",
+    "destination": "Goa",
+    "medium_of_travel": "bus",
+    "doctor_approval": "APPROVED",
+    "official_approval": "APPROVED",
+    "created_at": "2026-10-18",
+}
+
+
+def _text(pdf: bytes) -> str:
+    reader = PdfReader(BytesIO(pdf))
+    assert len(reader.pages) == 1
+    return reader.pages[0].extract_text()
+
+
+def test_clearance_has_static_and_variable_text():
+    text = _text(CLEARANCE.render(RECORD, "AC1:TEST"))
+    for static in ("Aarogya Check - Travel Clearance", "Verification QR Code", "Medical details are intentionally omitted."):
+        assert static in text
+    for variable in ("Name: Asha Verma", "Aadhar: 123456789012", "Destination: Goa", "Approved On: 2026-10-18"):
+        assert variable in text
+
+
+def test_static_lines_are_a_form_xobject():
+    page = PdfReader(BytesIO(CLEARANCE.render(RECORD, "AC1:TEST"))).pages[0]
+    forms = [x for x in page["/Resources"]["/XObject"].values() if x.get_object()["/Subtype"] == "/Form"]
+    assert len(forms) == 1
+    assert b"Travel Clearance" in forms[0].get_object().get_data()
+    assert b"Asha Verma" not in forms[0].get_object().get_data()
+
+
+def test_every_template_renders_missing_fields_as_none():
+    text = _text(APPROVAL_LETTER.render({"name": "Asha"}, "AC1:TEST"))
+    assert "Scan the QR code to verify this approval." in text and "To: Asha" in text and "Issued by Official ID: None" in text
+    text = _text(HEALTH_WARNING.render({"name": "Asha", "tier": 2}, "AC1:TEST"))
+    assert "HEALTH WARNING NOTICE" in text and "Tier: 2" in text and "Disease: None" in text
@@ -0,0 +1,70 @@
+import io
+import pickle
+from concurrent.futures import Future
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+import previews
+from storage import open_storage, storage_settings
+
+S3_SETTINGS = {
+    "STORAGE_BACKEND": "s3",
+    "S3_BUCKET": "uploads-test",
+    "S3_PREFIX": "blobs/",
+    "S3_ENDPOINT_URL": "",
+    "S3_REGION": "us-east-1",
+    "S3_ACCESS_KEY_ID": "test",
+    "S3_SECRET_ACCESS_KEY": "test",
+}
+
+
+class RecordingPool:
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args):
+        self.calls.append((fn, args))
+        return Future()
+
+
+@pytest.fixture(autouse=True)
+def fresh_worker_storage(monkeypatch):
+    monkeypatch.setattr(previews, "_storage", None)
+
+
+def _png(tmp_path):
+    path = tmp_path / "report.png"
+    Image.new("RGB", (800, 600), "white").save(path)
+    return path
+
+
+def test_queue_preview_hands_the_worker_a_digest(app, monkeypatch):
+    app.officials_db.blobs.insert_one({"_id": "ab" * 32, "size": 10})
+    pool = RecordingPool()
+    monkeypatch.setattr(previews, "preview_pool", lambda workers: pool)
+    monkeypatch.setattr(app.storage, "open", lambda key: pytest.fail("read in the request thread"))
+    previews.queue_preview(app, "ab" * 32, "report.png")
+    (fn, args), = pool.calls
+    assert fn is previews.build_preview
+    assert args[:2] == ("ab" * 32, "report.png")
+    assert args[2] == storage_settings(app.config)
+    pickle.dumps(args)
+
+
+def test_worker_reads_the_blob_from_s3(tmp_path):
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="uploads-test")
+        open_storage(S3_SETTINGS).put_file("cd" * 32, str(_png(tmp_path)))
+        preview = previews.build_preview("cd" * 32, "report.png", S3_SETTINGS, 200, 100)
+    assert preview["kind"] == "image"
+    assert Image.open(io.BytesIO(preview["data"])).size == (200, 150)
+
+
+def test_worker_fails_on_a_missing_blob():
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="uploads-test")
+        with pytest.raises(FileNotFoundError):
+            previews.build_preview("ef" * 32, "report.png", S3_SETTINGS, 200, 100)
@@ -0,0 +1,138 @@
+import base64
+import time
+
+import pytest
+from bson import ObjectId
+
+import config
+import qr_codec
+from documents import clearance_qr
+from models import now_iso
+
+DAY_MS = 86_400_000
+
+
+@pytest.fixture
+def signing_key(monkeypatch):
+    monkeypatch.setattr(config.Config, "QR_SIGNING_KEY", base64.b64encode(bytes(range(32))).decode())
+    monkeypatch.setattr(config.Config, "QR_TRUSTED_KEYS", [])
+    monkeypatch.setattr(qr_codec, "_keys", None)
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def test_sign_and_verify_round_trip(signing_key):
+    subject = ObjectId()
+    issued = _now_ms()
+    code = qr_codec.sign(subject, "DISAPPROVED", "123456789012", "Asha", issued, 30, tier=2)
+    assert qr_codec.is_signed(code)
+    claims = qr_codec.verify(code)
+    assert claims == {
+        "subject": str(subject),
+        "status": "DISAPPROVED",
+        "aadhar": "123456789012",
+        "name": "Asha",
+        "tier": 2,
+        "issued": issued,
+        "expires": issued + 30 * DAY_MS,
+        "signed": True,
+    }
+    # Same record, same code: stored PDFs stay reusable.
+    assert qr_codec.sign(subject, "DISAPPROVED", "123456789012", "Asha", issued, 30, tier=2) == code
+
+
+def test_verify_rejects_tampering_and_unknown_keys(signing_key, monkeypatch):
+    code = qr_codec.sign(ObjectId(), "APPROVED", "123456789012", "Asha", _now_ms(), 30)
+    tampered = code[:-6] + ("0" if code[-6] != "0" else "1") + code[-5:]
+    with pytest.raises(ValueError):
+        qr_codec.verify(tampered)
+    with pytest.raises(ValueError, match="format"):
+        qr_codec.verify(qr_codec.PREFIX + "not base45!")
+
+    monkeypatch.setattr(config.Config, "QR_SIGNING_KEY", base64.b64encode(bytes(32)).decode())
+    monkeypatch.setattr(qr_codec, "_keys", None)
+    with pytest.raises(ValueError):
+        qr_codec.verify(code)
+
+
+def test_rotated_key_stays_trusted(signing_key, monkeypatch):
+    code = qr_codec.sign(ObjectId(), "APPROVED", "123456789012", "Asha", _now_ms(), 30)
+    old_public = qr_codec.public_keys()
+    monkeypatch.setattr(config.Config, "QR_SIGNING_KEY", base64.b64encode(bytes(32)).decode())
+    monkeypatch.setattr(config.Config, "QR_TRUSTED_KEYS", list(old_public.values()))
+    monkeypatch.setattr(qr_codec, "_keys", None)
+    assert qr_codec.verify(code)["status"] == "APPROVED"
+
+
+def test_expiry(signing_key):
+    fresh = qr_codec.verify(qr_codec.sign(ObjectId(), "APPROVED", "123456789012", None, _now_ms(), 1))
+    old = qr_codec.verify(qr_codec.sign(ObjectId(), "APPROVED", "123456789012", None, _now_ms() - 2 * DAY_MS, 1))
+    assert not qr_codec.expired(fresh)
+    assert qr_codec.expired(old)
+
+
+def test_revoke_covers_codes_issued_before(app, signing_key):
+    db = app.officials_db
+    subject = ObjectId()
+    issued = _now_ms() - 1000
+    before = qr_codec.verify(qr_codec.sign(subject, "APPROVED", "123456789012", None, issued, 30))
+    other = qr_codec.verify(qr_codec.sign(ObjectId(), "APPROVED", "223456789012", None, issued, 30))
+    assert qr_codec.revoked(db, [before, other]) == set()
+
+    with app.app_context():
+        qr_codec.revoke(db, subject)
+    after = qr_codec.verify(qr_codec.sign(subject, "APPROVED", "123456789012", None, _now_ms() + 1000, 30))
+    assert qr_codec.revoked(db, [before, other, after]) == {(str(subject), issued)}
+    # An earlier cutoff never narrows an existing revocation.
+    with app.app_context():
+        qr_codec.revoke(db, subject, before_ms=0)
+    assert qr_codec.revoked(db, [before]) == {(str(subject), issued)}
+
+
+def _approved_migrant(app):
+    doc = {
+        "_id": ObjectId(),
+        "name": "Asha",
+        "aadhar": "123456789012",
+        "email": "a@example.org",
+        "doctor_approval": "APPROVED",
+        "official_approval": "APPROVED",
+        "official_decided_at": now_iso(),
+        "created_at": now_iso(),
+        "clearance_document": "ab" * 32,
+    }
+    app.immigrants_db.immigrants.insert_one(doc)
+    return doc
+
+
+def _client(app, **session):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s.update(session)
+    return client
+
+
+def _scan(app, code):
+    return _client(app, role="authority").post("/authorities/scan-qr", json={"qr_data": code}).get_json()
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_doctor_rejection_revokes_an_issued_clearance(app, batch):
+    doc = _approved_migrant(app)
+    with app.app_context():
+        code = clearance_qr(doc)
+    assert _scan(app, code)["flag"] == "GREEN"
+
+    doctor = _client(app, role="doctor", doctor_id="D1")
+    if batch:
+        body = {"decisions": [{"migrant_id": str(doc["_id"]), "decision": "REJECTED"}]}
+        assert doctor.post("/doctor/decisions", json=body).get_json()["applied"] == 1
+    else:
+        assert doctor.post(f"/doctor/decision/{doc['_id']}", json={"decision": "REJECTED"}).status_code == 200
+
+    verdict = _scan(app, code)
+    assert verdict["flag"] != "GREEN"
+    assert verdict["token"] == "revoked"
+    assert "clearance_document" not in app.immigrants_db.immigrants.find_one({"_id": doc["_id"]})
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+
+def _doctor(app, doctor_id):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s.update(role="doctor", doctor_id=doctor_id)
+    return client
+
+
+def _seed(app, **claims):
+    """One pending application per name; claims maps name -> (doctor, minutes left)."""
+    now = datetime.utcnow()
+    ids = {}
+    for i, name in enumerate(["free", "mine", "theirs", "lapsed"]):
+        doc = {"_id": ObjectId(), "name": name, "aadhar": f"12340000000{i}", "email": f"{name}@x", "doctor_approval": "PENDING"}
+        if name in claims:
+            holder, minutes = claims[name]
+            doc.update(claimed_by=holder, claim_until=now + timedelta(minutes=minutes))
+        app.immigrants_db.immigrants.insert_one(doc)
+        ids[name] = str(doc["_id"])
+    return ids
+
+
+CLAIMS = {"mine": ("D1", 5), "theirs": ("D2", 5), "lapsed": ("D2", -5)}
+
+
+def test_list_hides_other_doctors_live_claims(app):
+    _seed(app, **CLAIMS)
+    for params in ({}, {"aadhar": "1234"}):
+        body = _doctor(app, "D1").get("/doctor/migrants", query_string=params).get_json()
+        assert sorted(m["name"] for m in body["migrants"]) == ["free", "lapsed", "mine"]
+
+
+def test_single_decision_respects_claims(app):
+    ids = _seed(app, **CLAIMS)
+    client = _doctor(app, "D1")
+    for name in ("free", "mine", "lapsed"):
+        assert client.post(f"/doctor/decision/{ids[name]}", json={"decision": "APPROVED"}).status_code == 200
+    assert client.post(f"/doctor/decision/{ids['theirs']}", json={"decision": "APPROVED"}).status_code == 409
+    doc = app.immigrants_db.immigrants.find_one({"name": "theirs"})
+    assert (doc["doctor_approval"], doc["claimed_by"]) == ("PENDING", "D2")
+
+
+def test_batch_decisions_respect_claims(app):
+    ids = _seed(app, **CLAIMS)
+    items = [{"migrant_id": ids[name], "decision": "APPROVED"} for name in ("free", "theirs", "mine", "lapsed")]
+    body = _doctor(app, "D1").post("/doctor/decisions", json={"decisions": items}).get_json()
+    assert [r["status"] for r in body["results"]] == ["approved", "error", "approved", "approved"]
+    assert body["results"][1]["error"] == "Application is being reviewed by another doctor"
+    assert app.immigrants_db.immigrants.find_one({"name": "theirs"})["doctor_approval"] == "PENDING"
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from versions import bump, DOCTOR_APPROVED
+
+APPLICATION = {"name": "A", "source": "Pune", "destination": "Goa", "medium_of_travel": "bus"}
+
+
+def _apply(client, aadhar, email):
+    return client.post("/migrant/apply", data=dict(APPLICATION, aadhar=aadhar, email=email)).get_json()["migrant_id"]
+
+
+def test_new_applications_keep_the_cache(app):
+    client = app.test_client()
+    app.officials_db.disapproved_travelers.insert_one({"aadhar": "999999999999", "tier": 1})
+    with app.test_request_context():
+        cache = app.scan_cache
+        assert cache.traveler("999999999999")["tier"] == 1
+        assert cache.migrant("123456789012") is None
+    _apply(client, "223456789012", "b@x")
+    with app.test_request_context():
+        cache.traveler("999999999999")
+        cache.migrant("123456789012")
+    assert cache.stats["reloads"] == 1
+    assert cache.stats["hits"] == 2
+
+
+def test_overturned_approval_refreshes_the_cache(app):
+    migrant_id = _apply(app.test_client(), "123456789012", "a@x")
+    app.immigrants_db.immigrants.update_one({}, {"$set": {"doctor_approval": "APPROVED", "official_approval": "APPROVED"}})
+    doctor = app.test_client()
+    with doctor.session_transaction() as s:
+        s.update(role="doctor", doctor_id="D1")
+    with app.test_request_context():
+        doctor.post(f"/doctor/decision/{migrant_id}", json={"decision": "APPROVED"})
+        assert app.scan_cache.migrant("123456789012")["doctor_approval"] == "APPROVED"
+    doctor.post(f"/doctor/decision/{migrant_id}", json={"decision": "REJECTED"})
+    with app.test_request_context():
+        assert app.scan_cache.migrant("123456789012")["doctor_approval"] == "REJECTED"
+
+
+def test_disapproved_set_is_built_without_distinct(app, monkeypatch):
+    travelers = app.officials_db.disapproved_travelers
+    travelers.insert_many([{"aadhar": f"99999999999{i}"} for i in range(3)] + [{"name": "no aadhar"}])
+    monkeypatch.setattr(type(travelers), "distinct", None)
+    with app.test_request_context():
+        assert app.scan_cache.disapproved_aadhars(("g",))[0] == {f"99999999999{i}" for i in range(3)}
+
+
+def test_approvals_keep_the_disapproved_set(app):
+    app.officials_db.disapproved_travelers.insert_many([{"aadhar": f"{i:012d}"} for i in range(1000)])
+    with app.test_request_context():
+        cache = app.scan_cache
+        cache.traveler("999999999999")
+        for _ in range(5):
+            bump(DOCTOR_APPROVED)
+            assert cache.traveler("999999999999") is None
+    assert cache.stats["reloads"] == 1
+    # The first scan paid for the load; the rest were answered by the set.
+    assert (cache.stats["misses"], cache.stats["set_hits"]) == (1, 5)
+
+
+def test_concurrent_scans_reload_the_set_once(app, monkeypatch):
+    travelers = app.officials_db.disapproved_travelers
+    travelers.insert_one({"aadhar": "999999999999"})
+    slow_find = type(travelers).find
+
+    def find(self, *args, **kwargs):
+        time.sleep(0.05)
+        return slow_find(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(travelers), "find", find)
+    cache = app.scan_cache
+
+    def scan():
+        with app.test_request_context():
+            cache.traveler("123456789012")
+
+    threads = [threading.Thread(target=scan) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats["reloads"] == 1
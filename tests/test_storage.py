@@ -0,0 +1,91 @@
+import boto3
+import mongomock.gridfs
+import pytest
+from moto import mock_aws
+
+from conftest import mongo_client
+from storage import GridFSStorage, S3Storage
+
+mongomock.gridfs.enable_gridfs_integration()
+
+DATA = bytes(range(256)) * 4096  # 1 MiB, several GridFS chunks
+
+
+def _source(tmp_path, name="upload.tmp", data=DATA):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def gridfs_storage():
+    return GridFSStorage(mongo_client()["officials"], "uploads")
+
+
+@pytest.fixture
+def s3_storage():
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="uploads-test")
+        yield S3Storage(
+            {
+                "S3_BUCKET": "uploads-test",
+                "S3_PREFIX": "blobs/",
+                "S3_ENDPOINT_URL": "",
+                "S3_REGION": "us-east-1",
+                "S3_ACCESS_KEY_ID": "test",
+                "S3_SECRET_ACCESS_KEY": "test",
+            }
+        )
+
+
+@pytest.fixture(params=["gridfs", "s3"])
+def storage(request):
+    return request.getfixturevalue(f"{request.param}_storage")
+
+
+def test_round_trip(storage, tmp_path):
+    source = _source(tmp_path)
+    assert not storage.exists("ab12")
+    assert storage.open("ab12") is None
+    storage.put_file("ab12", source)
+    assert storage.exists("ab12")
+    assert not (tmp_path / "upload.tmp").exists()
+    with storage.open("ab12") as fh:
+        assert fh.read() == DATA
+
+
+def test_ranged_read(storage, tmp_path):
+    storage.put_file("ab12", _source(tmp_path))
+    with storage.open("ab12") as fh:
+        fh.seek(300_000)
+        assert fh.read(1000) == DATA[300_000:301_000]
+        fh.seek(-10, 2)
+        assert fh.read() == DATA[-10:]
+
+
+def test_delete(storage, tmp_path):
+    storage.put_file("ab12", _source(tmp_path))
+    storage.delete("ab12")
+    assert not storage.exists("ab12")
+    assert storage.open("ab12") is None
+    storage.delete("ab12")  # deleting a missing key is not an error
+
+
+def test_gridfs_existing_file_is_success(gridfs_storage, tmp_path):
+    gridfs_storage.put_file("ab12", _source(tmp_path, "a.tmp"))
+    gridfs_storage.put_file("ab12", _source(tmp_path, "b.tmp"))
+    assert gridfs_storage.files.count_documents({"filename": "ab12"}) == 1
+    assert not (tmp_path / "b.tmp").exists()
+
+
+def test_gridfs_concurrent_store_keeps_one_copy(gridfs_storage, tmp_path, monkeypatch):
+    # Both nodes checked exists() before either finished uploading.
+    gridfs_storage.put_file("ab12", _source(tmp_path, "a.tmp"))
+    monkeypatch.setattr(gridfs_storage, "exists", lambda key: False)
+    gridfs_storage.put_file("ab12", _source(tmp_path, "b.tmp"))
+    files = list(gridfs_storage.files.find({"filename": "ab12"}))
+    assert len(files) == 1
+    chunks = gridfs_storage.db["uploads.chunks"]
+    assert chunks.count_documents({}) == chunks.count_documents({"files_id": files[0]["_id"]}) > 0
+    with gridfs_storage.open("ab12") as fh:
+        assert fh.read() == DATA